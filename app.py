@@ -1,33 +1,41 @@
 from flask import Flask, render_template, jsonify, Response, send_from_directory, request
 import sqlite3
-import csv
-import io
-import os
+import json
 import os
+import random
 import transcriber
+import batch_transcriber
+import clip_recorder
+import ingest
+import validator
+from vocab_index import vocab
+from events import hub
+from repository import (pool, query_transcripts, add_validated_words, learned_words,
+                        random_validated_words, save_context_sample, list_unknown_words, unknown_word_counts,
+                        transcript_texts, stored_translations, save_translations)
+from exports import EXPORT_FORMATS, SUBTITLE_FORMATS, export_stream, gzip_stream
+from recognizer_pool import HUNTER_WORDS
+from translator import translator, backfill
+from metrics import metrics
+from profiler import PROFILER_ENABLED, profiler
 
 app = Flask(__name__)
 
+# WebSocket audio ingestion is optional (pip install flask-sock); HTTP uploads always work
+try:
+    from flask_sock import Sock
+    sock = Sock(app)
+except ImportError:
+    sock = None
+
 # Start background transcriber
 transcriber.start_transcriber()
 
-DB_FILE = "transcriptions.db"
 AUDIO_DIR = "audio_clips"
 
-def get_transcripts(limit=None, lang=None):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    if lang and lang != "all":
-        query = "SELECT timestamp, language, text, audio_file FROM transcripts WHERE language=? ORDER BY id DESC"
-        params = (lang,)
-    else:
-        query = "SELECT timestamp, language, text, audio_file FROM transcripts ORDER BY id DESC"
-        params = ()
-    if limit:
-        query += f" LIMIT {limit}"
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    return [{"timestamp": r[0], "language": r[1], "text": r[2], "audio_file": r[3]} for r in rows]
+def get_transcripts(limit=20, lang=None, before_id=None, session=None):
+    with pool.read() as conn:
+        return query_transcripts(conn, lang=lang, session=session, before_id=before_id, limit=limit)[0]
 
 @app.route("/")
 def index():
@@ -45,65 +53,80 @@ def learning_page():
 def hunter_page():
     return render_template("hunter.html")
 
+@app.route("/translator")
+def translator_page():
+    return render_template("translator.html")
+
 @app.route("/api/hunter/target")
 def hunter_target():
     # Return a random word to hunt for.
     # We can pick from specific tough words or validated words.
     # For fun, let's have a curated list of 'Tech' words + some random validated ones.
-    hard_words = ["algorithm", "heuristic", "neural", "latency", "recursion", "compile", "syntax", "variable", "function", "array"]
-    
-    conn = sqlite3.connect(DB_FILE)
+    # (The "hunter" grammar knows all of these.)
     try:
         # Mix in some validated words
-        cursor = conn.execute("SELECT word FROM validated_words ORDER BY RANDOM() LIMIT 5")
-        db_words = [row[0] for row in cursor.fetchall()]
-        candidates = list(set(hard_words + db_words))
-    except:
-        candidates = hard_words
-        
-    import random
+        with pool.read() as conn:
+            db_words = random_validated_words(conn, 5)
+        candidates = list(set(HUNTER_WORDS + db_words))
+    except sqlite3.Error:
+        candidates = HUNTER_WORDS
+
     word = random.choice(candidates)
     return jsonify({"word": word})
 
 @app.route("/api/hunter/success", methods=["POST"])
 def hunter_success():
+    # Client-side detection only: hits of the keyword spotter are saved by the transcriber
     data = request.json or {}
     word = data.get("word")
     sentence = data.get("text")
     
     if word and sentence:
-        conn = sqlite3.connect(DB_FILE)
-        ts = "N/A" # Should import time if needed, or rely on DB default? using simple string
-        # Let's import time properly at top or just use simple format
-        import time # Just in case
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        conn.execute("INSERT INTO context_samples (target_word, full_sentence, timestamp) VALUES (?, ?, ?)", (word, sentence, ts))
-        conn.commit()
-        
-        # Also increment frequency if it exists in validated
-        conn.execute("UPDATE validated_words SET frequency_count = frequency_count + 1 WHERE word = ?", (word,))
-        conn.commit()
-        
+        with pool.write() as conn:
+            save_context_sample(conn, word, sentence)
         return jsonify({"status": "captured"})
     return jsonify({"status": "error"})
 
 @app.route("/data")
 def data():
     lang = request.args.get("lang", "all")
-    return jsonify(get_transcripts(limit=20, lang=lang))
+    return jsonify(get_transcripts(limit=20, lang=lang, before_id=request.args.get("cursor", type=int),
+                                   session=request.args.get("session")))
+
+@app.route("/api/transcripts/search")
+def search_transcripts():
+    # ?q=word "exact phrase" prefix*  &lang=en  &since=2024-05-01  &until=2024-05-31
+    # &min_conf=0.8  &max_conf=  &limit=50  &cursor=<next_cursor from the previous page>
+    args = request.args
+    try:
+        with pool.read() as conn:
+            items, next_cursor = query_transcripts(
+                conn, q=args.get("q"), lang=args.get("lang"),
+                since=args.get("since"), until=args.get("until"),
+                min_conf=args.get("min_conf", type=float), max_conf=args.get("max_conf", type=float),
+                session=args.get("session"), before_id=args.get("cursor", type=int), limit=args.get("limit", 50, type=int)
+            )
+    except sqlite3.OperationalError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@app.route("/events")
+def events():
+    # Server-Sent Events: transcripts / unknown words pushed straight from the transcriber.
+    # Optional ?kinds=transcript,unknown_word filter; browsers resume via Last-Event-ID.
+    kinds = set(filter(None, request.args.get("kinds", "").split(","))) or None
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    return Response(hub.stream(last_id, kinds),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route("/get_learned_words")
 def get_learned_words():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    # Check if table exists (handled in init_db but connection might be fresh)
     try:
-        cursor.execute("SELECT * FROM validated_words ORDER BY frequency_count DESC")
-        rows = cursor.fetchall()
-        # id, word, category, frequency_count
-        return jsonify([{"id": r[0], "word": r[1], "category": r[2], "count": r[3]} for r in rows])
-    except:
+        with pool.read() as conn:
+            return jsonify(learned_words(conn))
+    except sqlite3.Error:
         return jsonify([])
 
 @app.route("/validate_word", methods=["POST"])
@@ -113,10 +136,10 @@ def validate_word_manual():
     word = data.get("word")
     if word:
         # Save to DB
-        conn = sqlite3.connect(DB_FILE)
         try:
-            conn.execute("INSERT OR IGNORE INTO validated_words (word, category) VALUES (?, ?)", (word, 'manual'))
-            conn.commit()
+            with pool.write() as conn:
+                add_validated_words(conn, [word], 'manual')
+            vocab.add(word)
             return jsonify({"status": "success"})
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)})
@@ -126,86 +149,329 @@ def validate_word_manual():
 def start_recording_route():
     # Helper to get the lang from the request
     # Expect JSON: { "lang": "en" } or { "lang": "auto" }
+    # Optional: { "partials": true } streams live hypotheses to /events
+    # Optional: { "session": "room-2", "source": "mic", "device": 3 } - one session per stream;
+    #           "source": "push" sessions get their audio from a client instead of a local device
+    # Optional: { "grammar": "hunter" | "learning" } decodes only the drill words (omit = full vocabulary)
+    # Optional: { "keywords": ["algorithm"], "keyword_lang": "en" } spots these words as they are said
+    #           ("keyword" events, context_samples rows) next to the normal decode
     data = request.json or {}
     lang = data.get("lang", "auto")
-    
-    transcriber.set_target_language(lang)
-    transcriber.set_recording_state(True)
-    return jsonify({"status": "recording_started", "focus_mode": lang})
+    try:
+        session = transcriber.sessions.open(data.get("session", transcriber.DEFAULT_SESSION),
+                                            source=data.get("source", "mic"), device=data.get("device"))
+        session.set_grammar(data.get("grammar"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+
+    session.set_target_language(lang)
+    try:
+        session.set_keywords(data.get("keywords"), data.get("keyword_lang"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if "partials" in data:
+        session.set_partial_streaming(data["partials"])
+    session.set_recording_state(True)
+    return jsonify({"status": "recording_started", "session": session.id, "focus_mode": lang,
+                    "partials": session.partials_enabled, "grammar": session.grammar,
+                    "keywords": session.keywords[0]})
 
 @app.route("/record/stop", methods=["POST"])
 def stop_recording_route():
-    transcriber.set_recording_state(False)
-    return jsonify({"status": "recording_stopped"})
+    data = request.get_json(silent=True) or {}
+    session_id = data.get("session") or request.args.get("session") or transcriber.DEFAULT_SESSION
+    session = transcriber.sessions.get(session_id)
+    if session is None:
+        return jsonify({"status": "error", "message": f"No session {session_id}"}), 404
+    session.set_recording_state(False)
+    return jsonify({"status": "recording_stopped", "session": session_id})
+
+@app.route("/api/sessions")
+def list_sessions():
+    return jsonify(transcriber.sessions.list())
+
+@app.route("/api/sessions/<session_id>", methods=["DELETE"])
+def close_session(session_id):
+    # Finalizes what is queued, then frees the device and the session's decode workers
+    if not transcriber.sessions.close(session_id):
+        return jsonify({"status": "error", "message": f"No session {session_id}"}), 404
+    return jsonify({"status": "closed", "session": session_id})
+
+def push_session(session_id):
+    """(session, error_response) for audio pushed by a client."""
+    session = transcriber.sessions.get(session_id)
+    if session is None:
+        return None, (jsonify({"status": "error", "message": f"No session {session_id} (POST /record/start with \"source\": \"push\")"}), 404)
+    if session.source != "push":
+        return None, (jsonify({"status": "error", "message": f"Session {session_id} records a local device"}), 409)
+    if not session.recording_active:
+        return None, (jsonify({"status": "error", "message": "Session is not recording"}), 409)
+    return session, None
+
+@app.route("/api/sessions/<session_id>/audio", methods=["POST"])
+def push_audio_route(session_id):
+    # Body: audio bytes - one small frame per request, or one long (chunked) upload.
+    # ?rate=48000&format=s16le|f32le|wav&channels=2 (default: 16 kHz s16le mono)
+    session, error = push_session(session_id)
+    if error:
+        return error
+    args = request.args
+    try:
+        accepted, complete = ingest.push_audio(
+            session, ingest.read_body(request.stream),
+            rate=args.get("rate", ingest.TARGET_RATE, type=int), fmt=args.get("format", "s16le"),
+            channels=args.get("channels", 1, type=int)
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    body = {"accepted_bytes": accepted, "queued_sec": round(session.queued_sec(), 2)}
+    if not complete:
+        # Decoder is too far behind: the client should resend the rest a bit later
+        return jsonify(dict(body, status="busy")), 429, {"Retry-After": "1"}
+    return jsonify(dict(body, status="ok"))
+
+if sock is not None:
+    @sock.route("/ws/sessions/<session_id>/audio")
+    def push_audio_ws(ws, session_id):
+        # Optional first text message: {"rate": 48000, "format": "f32le", "channels": 1}
+        # then binary audio frames; every frame is acked with {"queued_sec": ...}.
+        # A slow decoder simply stops us reading, which backs the client up over TCP.
+        session = transcriber.sessions.get(session_id)
+        if session is None or session.source != "push":
+            ws.send(json.dumps({"status": "error", "message": f"No push session {session_id}"}))
+            return
+        rate, fmt, channels = ingest.TARGET_RATE, "s16le", 1
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            try:
+                if isinstance(message, str):
+                    rate, fmt, channels = ingest.ws_config(message)
+                    ws.send(json.dumps({"status": "configured", "rate": rate, "format": fmt, "channels": channels}))
+                    continue
+                _, complete = ingest.push_audio(session, [message], rate, fmt, channels,
+                                                timeout=float("inf"))
+            except ValueError as e:
+                ws.send(json.dumps({"status": "error", "message": str(e)}))
+                break
+            ws.send(json.dumps({"status": "ok", "queued_sec": round(session.queued_sec(), 2)}))
+
+@app.route("/api/decode/stats")
+def decode_stats():
+    # Per-language decode latency from the worker pool (avg/max ms, real-time factor)
+    # ?session=<id> (default: the local microphone session)
+    return jsonify(transcriber.get_decode_stats(request.args.get("session")))
+
+# 🔹 Monitoring: Prometheus scrape target + on-demand sampling profiler
+@app.route("/metrics")
+def metrics_route():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+def profiler_disabled():
+    if PROFILER_ENABLED:
+        return None
+    return jsonify({"status": "error", "message": "Profiler is off (start the server with SCRIBE_PROFILER=1)"}), 403
+
+@app.route("/api/profiler/start", methods=["POST"])
+def profiler_start():
+    # Expect JSON: { "hz": 100, "seconds": 60 }
+    denied = profiler_disabled()
+    if denied:
+        return denied
+    data = request.json or {}
+    try:
+        started = profiler.start(data.get("hz", 100), data.get("seconds", 600))
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not started:
+        return jsonify({"status": "error", "message": "Profiler already running"}), 409
+    return jsonify({"status": "profiling", "hz": profiler.hz})
+
+@app.route("/api/profiler/stop", methods=["POST"])
+def profiler_stop():
+    denied = profiler_disabled()
+    if denied:
+        return denied
+    profiler.stop()
+    return jsonify(dict(profiler.report(limit=request.args.get("limit", 30, type=int)), status="stopped"))
+
+@app.route("/api/profiler")
+def profiler_report():
+    # ?format=collapsed for flamegraph.pl / speedscope, ?thread=<name prefix> to narrow the table
+    denied = profiler_disabled()
+    if denied:
+        return denied
+    if request.args.get("format") == "collapsed":
+        return Response(profiler.collapsed(), mimetype="text/plain")
+    return jsonify(profiler.report(limit=request.args.get("limit", 30, type=int),
+                                   thread=request.args.get("thread")))
+
+# 🔹 Dictionary translation
+MAX_TRANSLATE_BATCH = 1000
+
+@app.route("/api/translate", methods=["GET", "POST"])
+def translate_route():
+    # Expect JSON: { "text": "...", "target_lang": "es" }                    -> one translation
+    #              { "texts": ["...", ...], "target_lang": "es" }           -> many
+    #              { "ids": [transcript ids], "target_lang": "es" }         -> transcript rows (stored for next time)
+    # GET: dictionary size, cache hit ratio, backfill progress
+    if request.method == "GET":
+        return jsonify(translator.report())
+    data = request.json or {}
+    target = data.get("target_lang")
+    source = data.get("source_lang")
+    if not target:
+        return jsonify({"status": "error", "message": "target_lang is required"}), 400
+    if "ids" in data or "texts" in data:
+        batch = data.get("ids") if "ids" in data else data.get("texts")
+        if not isinstance(batch, list) or len(batch) > MAX_TRANSLATE_BATCH:
+            return jsonify({"status": "error", "message": f"Send a list of at most {MAX_TRANSLATE_BATCH}"}), 400
+    if "texts" in data:
+        items = [{"translated_text": t, "detected_lang": d}
+                 for t, d in translator.translate_many([str(x) for x in data["texts"]], target, source)]
+        return jsonify({"items": items})
+    if "ids" in data:
+        try:
+            ids = [int(i) for i in data["ids"]]
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "ids must be integers"}), 400
+        version = translator.version
+        with pool.read() as conn:
+            rows = transcript_texts(conn, ids)
+            stored = stored_translations(conn, rows, target, version)
+        fresh = [(i, target, translator.translate(rows[i][0] or "", target, rows[i][1]))
+                 for i in rows if i not in stored]
+        if fresh:
+            with pool.write() as conn:
+                save_translations(conn, fresh, version)
+            stored.update((i, text) for i, _, text in fresh)
+        items = [{"id": i, "language": rows[i][1], "text": rows[i][0], "translated_text": stored[i]}
+                 for i in ids if i in rows]
+        return jsonify({"items": items, "missing": [i for i in ids if i not in rows]})
+    translated, detected = translator.translate_detected(data.get("text", ""), target, source)
+    return jsonify({"translated_text": translated, "detected_lang": detected})
+
+@app.route("/api/translate/backfill", methods=["GET", "POST"])
+def translate_backfill():
+    # POST { "langs": ["es", "hi"] }: translate every transcript in the background
+    if request.method == "GET":
+        return jsonify(backfill.report())
+    langs = (request.json or {}).get("langs") or ["es", "hi"]
+    if not backfill.start(langs):
+        return jsonify(dict(backfill.report(), status="error", message="A backfill is already running")), 409
+    return jsonify(backfill.report())
 
 @app.route("/unknown_words")
+@app.route("/api/unknown_words")
 def unknown_words():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM unknown_words ORDER BY id DESC")
-    rows = cursor.fetchall()
-    # id, word, context, detected_lang, confidence, status, translation, timestamp
-    data = [
-        {
-            "id": r[0], "word": r[1], "context": r[2], "lang": r[3],
-            "conf": r[4], "status": r[5], "translation": r[6], "timestamp": r[7]
-        }
-        for r in rows
-    ]
-    return jsonify(data)
-
-@app.route("/validate_now")
+    # Most frequent first, one page at a time:
+    # ?status=new|validated|rejected &lang=en &limit=100 &cursor=<next_cursor> &counts=1 (words per status)
+    # /unknown_words (the old route) returns just the list of items
+    args = request.args
+    try:
+        with pool.read() as conn:
+            items, next_cursor = list_unknown_words(conn, status=args.get("status"), lang=args.get("lang"),
+                                                    cursor=args.get("cursor"), limit=args.get("limit", 100, type=int))
+            counts = unknown_word_counts(conn, args.get("lang")) if args.get("counts") == "1" else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if request.path == "/unknown_words":
+        return jsonify(items)
+    out = {"items": items, "next_cursor": next_cursor}
+    if counts is not None:
+        out["counts"] = counts
+    return jsonify(out)
+
+@app.route("/validate_now", methods=["GET", "POST"])
+@app.route("/api/validation", methods=["POST"])
 def validate_now():
-    # Simulate Online Validation
-    # In a real app, this would match 'unknown_words' against an API.
-    # Here we will just take all 'unknown_words' and approve them if they look valid (len > 2).
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Get pending unknown words
-    cursor.execute("SELECT word FROM unknown_words WHERE status='new'")
-    words = cursor.fetchall()
-    
-    count = 0
-    for w in words:
-        word_text = w[0]
-        # Fake Validation Logic: Accept if alphabetic and len > 2
-        if len(word_text) > 2 and word_text.isalpha():
-            cursor.execute("INSERT OR IGNORE INTO validated_words (word, category) VALUES (?, ?)", (word_text, 'auto_learned'))
-            cursor.execute("UPDATE unknown_words SET status='validated' WHERE word=?", (word_text,))
-            count += 1
-            
-    conn.commit()
-    return jsonify({"status": "success", "validated_count": count})
-
-# 🔹 Download TXT
-@app.route("/download/txt")
-def download_txt():
-    transcripts = get_transcripts()
-    output = io.StringIO()
-    for t in transcripts:
-        output.write(f"{t['timestamp']} [{t['language']}] - {t['text']}\n")
-    return Response(output.getvalue(),
-                    mimetype="text/plain",
-                    headers={"Content-Disposition": "attachment;filename=transcripts.txt"})
-
-# 🔹 Download CSV
-@app.route("/download/csv")
-def download_csv():
-    transcripts = get_transcripts()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Timestamp", "Language", "Transcript", "AudioFile"])
-    for t in transcripts:
-        writer.writerow([t['timestamp'], t['language'], t['text'], t['audio_file']])
-    return Response(output.getvalue(),
-                    mimetype="text/csv",
-                    headers={"Content-Disposition": "attachment;filename=transcripts.csv"})
+    # Validation runs in the background (validator.py); poll GET /api/validation for progress
+    started = validator.engine.start()
+    return jsonify(dict(validator.engine.report(), started=started)), 202 if started else 409
+
+@app.route("/api/validation")
+def validation_status():
+    return jsonify(validator.engine.report())
+
+# 🔹 Offline batch transcription
+@app.route("/api/batch/jobs", methods=["POST"])
+def batch_create():
+    # Expect JSON: { "paths": ["audio_clips", "audio_clips/x.wav"], "langs": ["en", "es"], "workers": 4 }
+    # Only what is inside audio_clips/ can be transcribed over HTTP
+    data = request.json or {}
+    paths = data.get("paths") or [AUDIO_DIR]
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        return jsonify({"status": "error", "message": "paths must be a list of paths"}), 400
+    outside = [p for p in paths if not batch_transcriber.within_dir(p, AUDIO_DIR)]
+    if outside:
+        return jsonify({"status": "error", "message": f"Not inside {AUDIO_DIR}/: {', '.join(outside)}"}), 403
+    with pool.write() as conn:
+        job_id = batch_transcriber.create_job(conn, paths, data.get("langs"), root=AUDIO_DIR)
+    batch_transcriber.launch_job(job_id, data.get("workers"))
+    return jsonify({"status": "started", "job_id": job_id})
+
+@app.route("/api/batch/jobs/<int:job_id>")
+def batch_status(job_id):
+    with pool.read() as conn:
+        status = batch_transcriber.job_status(conn, job_id)
+    if not status:
+        return jsonify({"status": "error", "message": "No such job"}), 404
+    return jsonify(status)
+
+@app.route("/api/batch/jobs/<int:job_id>/resume", methods=["POST"])
+def batch_resume(job_id):
+    data = request.get_json(silent=True) or {}
+    with pool.read() as conn:
+        if not batch_transcriber.job_status(conn, job_id):
+            return jsonify({"status": "error", "message": "No such job"}), 404
+    if batch_transcriber.launch_job(job_id, data.get("workers")) is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} is already running"}), 409
+    return jsonify({"status": "resumed", "job_id": job_id})
+
+# 🔹 Downloads: /download/txt | csv | jsonl | srt | vtt
+# Optional filters: ?lang=en&since=2024-05-01&until=2024-05-31&q=...&min_conf=0.8&audio_file=...&session=...
+# Newest first unless ?order=oldest. srt/vtt need session or audio_file (one timeline per file).
+# Streamed straight from the database (and gzipped on the fly if the client accepts it).
+@app.route("/download/<fmt>")
+def download_export(fmt):
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown format: {fmt}"}), 404
+    args = request.args
+    filters = {"lang": args.get("lang"), "since": args.get("since"), "until": args.get("until"),
+               "q": args.get("q"), "min_conf": args.get("min_conf", type=float),
+               "audio_file": args.get("audio_file"), "session": args.get("session")}
+    if fmt in SUBTITLE_FORMATS and not (filters["session"] or filters["audio_file"]):
+        return jsonify({"status": "error", "message": "Subtitles need ?session= or ?audio_file="}), 400
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    body = export_stream(fmt, oldest_first=args.get("order") == "oldest", **filters)
+    headers = {"Content-Disposition": f"attachment;filename=transcripts.{ext}"}
+    if "gzip" in request.headers.get("Accept-Encoding", "") and args.get("gzip") != "0":
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype=mimetype, headers=headers)
 
 # 🔹 Serve audio files
+MAX_CLIP_BYTES = 64 * 1024 * 1024
+
 @app.route("/audio_clips/<path:filename>")
 def download_audio(filename):
-    return send_from_directory(AUDIO_DIR, filename)
+    # ?offset=&length= -> just that utterance, as a standalone WAV.
+    # Without them the whole container is served (HTTP Range requests work for seeking).
+    offset = request.args.get("offset", type=int)
+    length = request.args.get("length", type=int)
+    if offset is None or length is None:
+        return send_from_directory(AUDIO_DIR, filename)
+
+    root = os.path.realpath(AUDIO_DIR)
+    path = os.path.realpath(os.path.join(root, filename))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    if offset < clip_recorder.HEADER_BYTES or length <= 0 or length > MAX_CLIP_BYTES:
+        return jsonify({"status": "error", "message": "Bad range"}), 400
+    return Response(clip_recorder.read_clip(path, offset, length), mimetype="audio/wav")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
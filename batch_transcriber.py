@@ -0,0 +1,312 @@
+import os, sys, json, time, wave, shutil, threading, subprocess, argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from models import MODEL_CANDIDATES, resolve_model_path
+from scoring import pick_winner
+from repository import DB_FILE, init_db, apply_write_batch, winner_items
+
+# Offline batch transcription.
+# Runs the same multi-language scoring as the live loop over existing recordings,
+# as fast as the CPU allows, with one file per pool worker at a time.
+# Every file is a checkpoint: its transcripts and its 'done' flag commit in ONE
+# transaction, so `--resume <job>` just picks up whatever isn't done yet.
+#
+#   python batch_transcriber.py audio_clips/ old_meeting.wav --langs en,es --workers 4
+#   python batch_transcriber.py --resume 3
+#   python batch_transcriber.py --status 3
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".m4a", ".webm")
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 8000          # same block size as the live stream
+PROGRESS_EVERY_SEC = 30.0    # audio seconds between progress updates from a worker
+AUDIO_DIR = "audio_clips"    # what the app serves at /audio_clips/...
+
+def within_dir(path, root):
+    """Does path (symlinks resolved) lie inside root?"""
+    real, root = os.path.realpath(path), os.path.realpath(root)
+    return real == root or real.startswith(root + os.sep)
+
+def served_path(path):
+    """audio_clips/... for files the app can serve (the dashboard plays them), else path as is."""
+    if within_dir(path, AUDIO_DIR):
+        rel = os.path.relpath(os.path.realpath(path), os.path.realpath(AUDIO_DIR))
+        return f"{AUDIO_DIR}/{rel.replace(os.sep, '/')}"
+    return path
+
+def collect_files(inputs):
+    """Expand directories (recursively) into audio files; keep explicit files as given."""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        files.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"⚠️ Skipping missing path: {path}")
+    return files
+
+def open_pcm(path):
+    """
+    Returns (sample_rate, chunk_iterator) of 16-bit mono PCM.
+    Plain 16-bit mono WAV is read directly (vosk resamples any rate itself);
+    everything else goes through ffmpeg if it is installed.
+    """
+    if path.lower().endswith(".wav"):
+        try:
+            wf = wave.open(path, "rb")
+        except (wave.Error, EOFError):
+            wf = None
+        if wf is not None:
+            if wf.getsampwidth() == 2 and wf.getnchannels() == 1:
+                def chunks():
+                    with wf:
+                        while True:
+                            data = wf.readframes(CHUNK_FRAMES)
+                            if not data:
+                                break
+                            yield data
+                return wf.getframerate(), chunks()
+            wf.close()
+
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("not 16-bit mono WAV and ffmpeg is not installed")
+
+    def ffmpeg_chunks():
+        proc = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "quiet", "-i", path, "-ar", str(SAMPLE_RATE), "-ac", "1", "-f", "s16le", "-"],
+            stdout=subprocess.PIPE
+        )
+        try:
+            while True:
+                data = proc.stdout.read(CHUNK_FRAMES * 2)
+                if not data:
+                    break
+                yield data
+        finally:
+            proc.stdout.close()
+            proc.wait()
+    return SAMPLE_RATE, ffmpeg_chunks()
+
+# --- Pool worker side ---
+_models = {}
+_progress_q = None
+
+def _init_worker(langs, progress_q):
+    global _progress_q
+    import vosk
+    vosk.SetLogLevel(-1)
+    _progress_q = progress_q
+    for lang in langs:
+        path = resolve_model_path(lang)
+        if path:
+            _models[lang] = vosk.Model(path)
+
+def transcribe_file(path):
+    """
+    Runs in a pool worker. Returns (path, duration_sec, winners) where winners are the
+    same candidate dicts the live loop commits.
+    """
+    import vosk
+    if not _models:
+        raise RuntimeError("no models loaded in worker")
+    rate, chunks = open_pcm(path)
+    recs = {}
+    for lang, model in _models.items():
+        rec = vosk.KaldiRecognizer(model, rate)
+        rec.SetWords(True)
+        recs[lang] = rec
+
+    winners = []
+    audio_sec = 0.0
+    next_report = PROGRESS_EVERY_SEC
+    for data in chunks:
+        results = {}
+        for lang, rec in recs.items():
+            if rec.AcceptWaveform(data):
+                results[lang] = (True, json.loads(rec.Result()))
+        winner = pick_winner(results, min_conf=0.6)
+        if winner:
+            winners.append(winner)
+
+        audio_sec += len(data) / 2 / rate
+        if _progress_q is not None and audio_sec >= next_report:
+            _progress_q.put((path, audio_sec))
+            next_report += PROGRESS_EVERY_SEC
+
+    # Flush whatever is left at the end of the file
+    winner = pick_winner({lang: (True, json.loads(rec.FinalResult())) for lang, rec in recs.items()})
+    if winner:
+        winners.append(winner)
+    return path, audio_sec, winners
+
+# --- Job control (main process) ---
+def available_languages():
+    return [lang for lang in MODEL_CANDIDATES if resolve_model_path(lang)]
+
+def create_job(conn, paths, langs=None, root=None):
+    """root: only files inside this directory are taken (HTTP callers)."""
+    langs = langs or available_languages()
+    # Absolute: the job may be resumed from another working directory
+    files = [os.path.abspath(f) for f in collect_files(paths) if root is None or within_dir(f, root)]
+    cursor = conn.execute(
+        "INSERT INTO batch_jobs (created, status, languages, total_files) VALUES (?, 'pending', ?, ?)",
+        (time.strftime("%Y-%m-%d %H:%M:%S"), ",".join(langs), len(files))
+    )
+    job_id = cursor.lastrowid
+    conn.executemany("INSERT OR IGNORE INTO batch_files (job_id, path) VALUES (?, ?)",
+                     [(job_id, f) for f in files])
+    conn.commit()
+    print(f"📦 Batch job {job_id}: {len(files)} files, languages {langs}")
+    return job_id
+
+def job_status(conn, job_id):
+    job = conn.execute("SELECT id, created, status, languages, total_files FROM batch_jobs WHERE id=?",
+                       (job_id,)).fetchone()
+    if not job:
+        return None
+    rows = conn.execute(
+        "SELECT path, status, progress_sec, duration_sec, segments, error, updated FROM batch_files WHERE job_id=? ORDER BY id",
+        (job_id,)
+    ).fetchall()
+    files = [{"path": r[0], "status": r[1], "progress_sec": r[2], "duration_sec": r[3],
+              "segments": r[4], "error": r[5], "updated": r[6]} for r in rows]
+    counts = {}
+    for f in files:
+        counts[f["status"]] = counts.get(f["status"], 0) + 1
+    return {"id": job[0], "created": job[1], "status": job[2], "languages": job[3].split(","),
+            "total_files": job[4], "counts": counts, "files": files}
+
+def run_job(job_id, workers=None, db_file=DB_FILE):
+    """Process every file of the job that isn't 'done' yet. Safe to call again to resume."""
+    conn = init_db(db_file)
+    row = conn.execute("SELECT languages FROM batch_jobs WHERE id=?", (job_id,)).fetchone()
+    if not row:
+        print(f"❌ No batch job {job_id}")
+        return False
+    langs = [l for l in row[0].split(",") if l]
+    pending = [r[0] for r in conn.execute(
+        "SELECT path FROM batch_files WHERE job_id=? AND status != 'done' ORDER BY id", (job_id,))]
+    if not pending:
+        conn.execute("UPDATE batch_jobs SET status='done' WHERE id=?", (job_id,))
+        conn.commit()
+        print(f"✅ Batch job {job_id}: nothing left to do")
+        return True
+
+    workers = workers or os.cpu_count() or 1
+    conn.execute("UPDATE batch_jobs SET status='running' WHERE id=?", (job_id,))
+    conn.execute("UPDATE batch_files SET status='queued', progress_sec=0 WHERE job_id=? AND status != 'done'", (job_id,))
+    conn.commit()
+    print(f"🚀 Batch job {job_id}: {len(pending)} files on {workers} workers ({langs})")
+
+    ctx = mp.get_context("spawn")
+    progress_q = ctx.Queue()
+    failed = 0
+    t0 = time.perf_counter()
+    total_audio = 0.0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(langs, progress_q)) as pool:
+        futures = {pool.submit(transcribe_file, path): path for path in pending}
+        while futures:
+            done, _ = wait(futures, timeout=1.0, return_when=FIRST_COMPLETED)
+
+            # Per-file progress from the workers
+            updates = {}
+            while not progress_q.empty():
+                path, sec = progress_q.get()
+                updates[path] = sec
+            if updates:
+                ts = time.strftime("%Y-%m-%d %H:%M:%S")
+                conn.executemany(
+                    "UPDATE batch_files SET status='running', progress_sec=?, updated=? WHERE job_id=? AND path=?",
+                    [(sec, ts, job_id, path) for path, sec in updates.items()]
+                )
+                conn.commit()
+
+            for fut in done:
+                path = futures.pop(fut)
+                try:
+                    _, duration, winners = fut.result()
+                except Exception as e:
+                    failed += 1
+                    conn.execute("UPDATE batch_files SET status='failed', error=?, updated=? WHERE job_id=? AND path=?",
+                                 (str(e), time.strftime("%Y-%m-%d %H:%M:%S"), job_id, path))
+                    conn.commit()
+                    print(f"⚠️ [{job_id}] {path} failed: {e}")
+                    continue
+
+                ts = time.strftime("%Y-%m-%d %H:%M:%S")
+                items = []
+                for winner in winners:
+                    items.extend(winner_items(winner, served_path(path), ts))
+                # Segments + checkpoint in one transaction
+                apply_write_batch(conn, [("batch_file", job_id, path, duration, items)])
+                conn.commit()
+                total_audio += duration
+                print(f"📝 [{job_id}] {path}: {len(winners)} segments, {duration:.1f}s audio")
+
+    elapsed = time.perf_counter() - t0
+    status = "failed" if failed else "done"
+    conn.execute("UPDATE batch_jobs SET status=? WHERE id=?", (status, job_id))
+    conn.commit()
+    conn.close()
+    speed = total_audio / elapsed if elapsed else 0.0
+    print(f"🏁 Batch job {job_id} {status}: {total_audio:.1f}s audio in {elapsed:.1f}s ({speed:.1f}x real time), {failed} failed")
+    return not failed
+
+_launched = {}  # job_id -> Popen, for jobs started by launch_job()
+_launch_lock = threading.Lock()
+
+def job_running(job_id):
+    proc = _launched.get(job_id)
+    return proc is not None and proc.poll() is None
+
+def launch_job(job_id, workers=None, db_file=DB_FILE):
+    """
+    Run a job in its own process (used by the HTTP endpoint): the pool workers must not
+    re-import app.py, and progress is read back from the database.
+    Returns None if this process already runs the job.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "--resume", str(job_id), "--db", os.path.abspath(db_file)]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    with _launch_lock:
+        if job_running(job_id):
+            return None
+        # Same working directory as the app, so models and audio_clips/ resolve the same way
+        proc = subprocess.Popen(cmd, env=dict(os.environ, SCRIBE_DB=os.path.abspath(db_file)))
+        _launched[job_id] = proc
+    # Reap the child when it exits (no zombies)
+    threading.Thread(target=proc.wait, name=f"batch-job-{job_id}", daemon=True).start()
+    return proc
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch transcription of audio files")
+    parser.add_argument("paths", nargs="*", help="audio files or directories")
+    parser.add_argument("--langs", help="comma separated languages (default: every installed model)")
+    parser.add_argument("--workers", type=int, help="pool size (default: CPU count)")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="continue an existing job")
+    parser.add_argument("--status", type=int, metavar="JOB_ID", help="print job progress as JSON")
+    parser.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    if args.status:
+        conn = init_db(args.db)
+        print(json.dumps(job_status(conn, args.status), indent=2, ensure_ascii=False))
+        return 0
+    if args.resume:
+        return 0 if run_job(args.resume, args.workers, args.db) else 1
+    if not args.paths:
+        parser.error("give files/directories to transcribe, or --resume / --status")
+
+    conn = init_db(args.db)
+    langs = args.langs.split(",") if args.langs else None
+    job_id = create_job(conn, args.paths, langs)
+    conn.close()
+    return 0 if run_job(job_id, args.workers, args.db) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
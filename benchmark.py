@@ -0,0 +1,492 @@
+import os, sys, json, math, time, wave, random, argparse, platform, tempfile, threading, subprocess, contextlib
+import urllib.request, urllib.error
+from array import array
+
+# Benchmarks for the decode -> score -> persist pipeline. Offline and reproducible:
+#
+#   python benchmark.py pipeline --wav a.wav b.wav     # replay WAVs through a push session: RTF per language + AUTO
+#   python benchmark.py postprocess                    # fuzzy fix / word counts / scoring vs. vocab size (100 -> 100k)
+#   python benchmark.py http --rows 1000000            # load-test the Flask endpoints on a big database
+#   python benchmark.py all --out run.json
+#   python benchmark.py compare base.json run.json     # what got faster / slower
+#
+# Everything runs against a scratch database and clip folder (--workdir), never against
+# transcriptions.db; `--db` keeps a populated database around between http runs.
+# Without a vosk model (or with --stub) a stub recognizer stands in: it "decodes" at
+# --stub-rtf (sleeping, like vosk outside the GIL) and finalizes a sentence every few
+# seconds, so VAD, preprocessing, scoring, clips and the DB writer all do their real work.
+# With no --wav, a synthetic speech-like fixture (voiced bursts and pauses) is generated.
+# Output: {"meta": {...}, "results": [{"suite", "name", <params>, "metrics": {...}}]}
+
+STUB_LANGS = ("en", "es", "hi")
+STUB_UTTERANCE_SEC = 3.0
+DEFAULT_VOCAB_SIZES = "100,1000,10000,100000"
+SENTENCES = 200
+SENTENCE_WORDS = 12
+
+# --- helpers ---
+def synthetic_words(n, seed=0):
+    """n distinct lowercase pseudo-words, 3-12 letters."""
+    rng = random.Random(seed)
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    weights = [26 - i for i in range(26)]
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(letters, weights, k=rng.randint(3, 12))))
+    return sorted(words)
+
+def near_miss(word, rng):
+    # One substitution: what a recognizer gets wrong and fuzzy fix should repair
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("aeiou" if word[i] not in "aeiou" else "rstln") + word[i + 1:]
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def timing_metrics(samples_sec, unit="us"):
+    scale = 1e6 if unit == "us" else 1e3
+    total = sum(samples_sec)
+    return {"calls": len(samples_sec),
+            f"mean_{unit}": round(total / len(samples_sec) * scale, 2) if samples_sec else 0.0,
+            f"p50_{unit}": round(percentile(samples_sec, 50) * scale, 2),
+            f"p95_{unit}": round(percentile(samples_sec, 95) * scale, 2),
+            f"max_{unit}": round(max(samples_sec, default=0.0) * scale, 2),
+            "ops_per_sec": round(len(samples_sec) / total, 1) if total else 0.0}
+
+def measure(fn, calls):
+    samples = []
+    with contextlib.redirect_stdout(open(os.devnull, "w")):  # fuzzy fix prints every replacement
+        for args in calls:
+            t0 = time.perf_counter()
+            fn(*args)
+            samples.append(time.perf_counter() - t0)
+    return timing_metrics(samples)
+
+def synth_speech(path, sec=30.0, rate=16000, seed=0):
+    """Speech-like test audio: 2.5 s voiced bursts (harmonics, syllable rhythm) and short pauses."""
+    rng = random.Random(seed)
+    samples = array("h")
+    t = 0
+    while len(samples) < sec * rate:
+        f0 = rng.uniform(110, 220)
+        for i in range(int(2.5 * rate)):
+            x = t / rate
+            env = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * x) # ~4 syllables a second
+            v = sum(math.sin(2 * math.pi * f0 * k * x) / k for k in range(1, 6))
+            samples.append(int(max(-32767, min(32767, 4000 * env * v + rng.gauss(0, 200)))))
+            t += 1
+        for i in range(int(0.7 * rate)):
+            samples.append(int(rng.gauss(0, 60)))
+            t += 1
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples[:int(sec * rate)].tobytes())
+    return path
+
+# --- stub recognizer ---
+class StubModel:
+    def __init__(self, path):
+        from scoring import COMMON_WORDS
+        self.lang = path.rsplit(":", 1)[-1]
+        self.words = sorted(COMMON_WORDS.get(self.lang, ())) + synthetic_words(200, seed=self.lang)
+
+class StubRecognizer:
+    """Stands in for vosk.KaldiRecognizer: same methods, word times never rewind on Reset()."""
+    rtf = 0.05
+
+    def __init__(self, model, rate, grammar=None):
+        self.words = [w for w in json.loads(grammar) if w != "[unk]"] if grammar else model.words
+        self.words = self.words or ["[unk]"]
+        self.rng = random.Random(model.lang)
+        self.rate = rate
+        self.t = 0.0
+        self.utt_start = 0.0
+
+    def SetWords(self, enabled):
+        pass
+
+    def SetPartialWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        sec = len(data) / 2 / self.rate
+        time.sleep(sec * self.rtf)
+        self.t += sec
+        return self.t - self.utt_start >= STUB_UTTERANCE_SEC
+
+    def _result(self):
+        span = self.t - self.utt_start
+        n = max(1, int(span * 2.5))
+        words = []
+        for i in range(n):
+            start = self.utt_start + span * i / n
+            words.append({"word": self.rng.choice(self.words), "start": round(start, 3),
+                          "end": round(start + span / n * 0.8, 3), "conf": round(self.rng.uniform(0.45, 1.0), 3)})
+        self.utt_start = self.t
+        return json.dumps({"text": " ".join(w["word"] for w in words), "result": words})
+
+    def Result(self):
+        return self._result()
+
+    def FinalResult(self):
+        if self.t - self.utt_start < 0.2:
+            self.utt_start = self.t
+            return json.dumps({"text": ""})
+        return self._result()
+
+    def PartialResult(self):
+        return json.dumps({"partial": ""})
+
+    def Reset(self):
+        self.utt_start = self.t
+
+def use_stub(rtf):
+    from models import registry
+    from recognizer_pool import recognizers
+    StubRecognizer.rtf = rtf
+    registry.loader = StubModel
+    recognizers.factory = StubRecognizer
+    with registry.lock:
+        registry.paths = {lang: f"stub:{lang}" for lang in STUB_LANGS}
+
+# --- suites ---
+def bench_pipeline(args, results):
+    import transcriber, ingest
+    from models import registry
+    from recognizer_pool import recognizers
+    from repository import pool
+
+    if transcriber.DECODE_MODE != "thread" and args.stub:
+        print("⚠️ The stub recognizer needs SCRIBE_DECODE_MODE=thread")
+        return
+    transcriber.AUDIO_DIR = os.path.join(args.workdir, "audio_clips")
+    os.makedirs(transcriber.AUDIO_DIR, exist_ok=True)
+    transcriber.db_writer.start()
+
+    wavs = args.wav or [synth_speech(os.path.join(args.workdir, "synthetic.wav"), args.synthetic_sec)]
+    langs = registry.available()
+    if transcriber.DECODE_MODE == "thread":
+        t0 = time.perf_counter()
+        recognizers.preload(langs, background=False)
+        results.append({"suite": "pipeline", "name": "model_load", "languages": langs,
+                        "metrics": {"sec": round(time.perf_counter() - t0, 3)}})
+
+    for path in wavs:
+        with wave.open(path, "rb") as wf:
+            rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+            pcm = wf.readframes(wf.getnframes())
+        if width != 2:
+            print(f"⚠️ Skipping {path}: only 16-bit WAV fixtures are supported")
+            continue
+        audio_sec = len(pcm) / 2 / channels / rate
+        for mode in langs + ["auto"]:
+            session_id = f"bench-{mode}-{int(time.time() * 1000) % 100000}"
+            session = transcriber.sessions.open(session_id, source="push")
+            session.catchup_sec = 0 # audio arrives faster than real time on purpose: measure full-quality decoding
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                session.set_target_language(mode)
+                session.set_recording_state(True)
+                step = rate * channels * 2 // 10 # 100 ms frames, like a live client
+                t0 = time.perf_counter()
+                ingest.push_audio(session, (pcm[i:i + step] for i in range(0, len(pcm), step)),
+                                  rate, "s16le", channels, timeout=float("inf"))
+                session.set_recording_state(False)
+                transcriber.sessions.close(session_id, timeout=None)
+                wall = time.perf_counter() - t0
+                transcriber.db_writer.flush()
+            report = session.report()
+            with pool.read() as conn:
+                segments = conn.execute("SELECT COUNT(*) FROM transcripts WHERE session = ?", (session_id,)).fetchone()[0]
+            metrics = {"audio_sec": round(audio_sec, 2), "wall_sec": round(wall, 3),
+                       "rtf": round(wall / audio_sec, 4) if audio_sec else 0.0, "segments": segments,
+                       "decode": report["languages"], "vad_skipped_ratio": report["vad"]["skipped_ratio"],
+                       "preprocess_avg_ms": report["preprocess"]["avg_ms"]}
+            results.append({"suite": "pipeline", "name": "replay", "fixture": os.path.basename(path),
+                            "mode": mode, "metrics": metrics})
+            print(f"⏱️ pipeline {os.path.basename(path)} [{mode}]: RTF {metrics['rtf']} ({segments} segments)")
+
+def bench_postprocess(args, results):
+    from vocab_index import vocab
+    from scoring import COMMON_WORDS, score_result, pick_winner
+    from repository import (DB_FILE, pool, add_validated_words, fuzzy_fix_text, validated_word_hits, winner_items,
+                            apply_write_batch, init_db)
+    from db_writer import open_wal_connection
+    init_db(DB_FILE).close()
+
+    rng = random.Random(1)
+    common = sorted(COMMON_WORDS["en"])
+    for size in [int(n) for n in args.vocab_sizes.split(",") if n]:
+        words = synthetic_words(size, seed=size)
+        with pool.write() as conn:
+            conn.execute("DELETE FROM validated_words")
+            add_validated_words(conn, words, "bench")
+        t0 = time.perf_counter()
+        with pool.read() as conn:
+            vocab.load_from_db(conn)
+        load_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+        # Sentences: 30% validated words, 20% near misses, 50% filler
+        sentences = []
+        for _ in range(SENTENCES):
+            tokens = []
+            for _ in range(SENTENCE_WORDS):
+                r = rng.random()
+                if r < 0.3:
+                    tokens.append(rng.choice(words))
+                elif r < 0.5:
+                    tokens.append(near_miss(rng.choice(words), rng))
+                else:
+                    tokens.append(rng.choice(common))
+            sentences.append(" ".join(tokens))
+        calls = [(s,) for s in sentences]
+
+        def record(name, metrics):
+            results.append({"suite": "postprocess", "name": name, "vocab": size, "metrics": metrics})
+
+        record("vocab_load", {"ms": load_ms})
+        vocab.match_cache = {}
+        cold = measure(fuzzy_fix_text, calls)
+        record("fuzzy_fix_cold", cold)
+        record("fuzzy_fix_warm", measure(fuzzy_fix_text, calls))
+        record("validated_word_hits", measure(validated_word_hits, calls))
+
+        def fake_result(sentence):
+            tokens = sentence.split()
+            return {"text": sentence, "result": [{"word": w, "start": i * 0.4, "end": i * 0.4 + 0.3,
+                                                  "conf": rng.uniform(0.4, 1.0)} for i, w in enumerate(tokens)]}
+        decoded = [{lang: (True, fake_result(s)) for lang in STUB_LANGS} for s in sentences]
+        record("score_result", measure(score_result, [("en", d["en"][1]) for d in decoded]))
+        record("pick_winner", measure(pick_winner, [(d, 0.6) for d in decoded]))
+        winners = [w for w in (pick_winner(d) for d in decoded) if w]
+        record("winner_items", measure(winner_items, [(w,) for w in winners]))
+        # What the DB writer does per utterance (transcript row, unknown words, frequency counts),
+        # rolled back so every size runs on the same table
+        conn = open_wal_connection(DB_FILE)
+        def write_batch(items):
+            apply_write_batch(conn, items)
+            conn.rollback()
+        record("write_batch", measure(write_batch, [(winner_items(w),) for w in winners]))
+        conn.close()
+        print(f"⏱️ postprocess vocab={size}: fuzzy fix {cold['mean_us']} us/sentence (cold)")
+
+    with pool.write() as conn:
+        conn.execute("DELETE FROM validated_words")
+    vocab.load([])
+
+def populate(db_file, rows):
+    """Top the transcripts table up to `rows` synthetic rows (spread over the last 90 days)."""
+    from repository import init_db
+    conn = init_db(db_file) # a fresh --workdir has no tables yet
+    have = conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+    if have >= rows:
+        conn.close()
+        return have
+    rng = random.Random(2)
+    vocab_words = synthetic_words(5000, seed=5000)
+    langs = STUB_LANGS
+    now = time.time()
+    t0 = time.perf_counter()
+    for start in range(have, rows, 50000):
+        batch = []
+        for i in range(start, min(rows, start + 50000)):
+            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now - 90 * 86400 * (rows - i) / rows))
+            text = " ".join(rng.choice(vocab_words) for _ in range(rng.randint(4, 16)))
+            batch.append((ts, langs[i % len(langs)], text, round(rng.uniform(0.4, 1.0), 3), f"load-{i % 8}"))
+        conn.executemany("INSERT INTO transcripts (timestamp, language, text, confidence, session) VALUES (?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        print(f"   ... {start + len(batch)} / {rows} rows ({time.perf_counter() - t0:.0f}s)")
+    conn.executemany("INSERT OR IGNORE INTO validated_words (word, category) VALUES (?, 'bench')",
+                     [(w,) for w in vocab_words[:500]])
+    conn.commit()
+    conn.close()
+    return rows
+
+def load_test(url, concurrency, duration):
+    latencies, errors, sizes = [], [0], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(n):
+        i = n
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url(i), timeout=30) as resp:
+                    size = len(resp.read())
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok, size = False, 0
+            elapsed = time.perf_counter() - t0
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                    sizes.append(size)
+                else:
+                    errors[0] += 1
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    metrics = timing_metrics(latencies, unit="ms")
+    metrics.pop("ops_per_sec")
+    metrics.pop("calls")
+    metrics.update(requests=len(latencies), errors=errors[0], rps=round(len(latencies) / wall, 1),
+                   avg_bytes=int(sum(sizes) / len(sizes)) if sizes else 0)
+    return metrics
+
+def bench_http(args, results):
+    from repository import DB_FILE
+    print(f"🗄️ Preparing {args.rows} rows in {DB_FILE} ...")
+    t0 = time.perf_counter()
+    rows = populate(DB_FILE, args.rows)
+    results.append({"suite": "http", "name": "populate", "rows": rows,
+                    "metrics": {"sec": round(time.perf_counter() - t0, 2)}})
+    try:
+        import app as webapp
+        from werkzeug.serving import make_server
+    except ImportError as e:
+        print(f"⚠️ Skipping the HTTP suite: {e}")
+        results.append({"suite": "http", "name": "skipped", "metrics": {"reason": str(e)}})
+        return
+
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    terms = synthetic_words(5000, seed=5000)[:200]
+    today = time.strftime("%Y-%m-%d")
+    endpoints = [
+        ("data", lambda i: f"{base}/data"),
+        ("data_lang", lambda i: f"{base}/data?lang=es"),
+        ("data_deep_page", lambda i: f"{base}/data?cursor={rows // 2 - i}"),
+        ("search_fts", lambda i: f"{base}/api/transcripts/search?q={terms[i % len(terms)]}"),
+        ("search_prefix", lambda i: f"{base}/api/transcripts/search?q={terms[i % len(terms)][:3]}*&lang=en"),
+        ("search_filters", lambda i: f"{base}/api/transcripts/search?lang=hi&min_conf=0.9&since={today}"),
+        ("export_today", lambda i: f"{base}/download/jsonl?since={today}&lang=en"),
+        ("learned_words", lambda i: f"{base}/get_learned_words"),
+        ("decode_stats", lambda i: f"{base}/api/decode/stats"),
+    ]
+    try:
+        for name, url in endpoints:
+            if args.endpoints and name not in args.endpoints.split(","):
+                continue
+            metrics = load_test(url, args.concurrency, args.duration)
+            results.append({"suite": "http", "name": name, "rows": rows, "concurrency": args.concurrency,
+                            "metrics": metrics})
+            print(f"⏱️ http {name}: p50 {metrics['p50_ms']} ms, p95 {metrics['p95_ms']} ms, "
+                  f"{metrics['rps']} req/s, {metrics['errors']} errors")
+    finally:
+        server.shutdown()
+
+SUITES = {"pipeline": bench_pipeline, "postprocess": bench_postprocess, "http": bench_http}
+
+# --- comparing runs ---
+COMPARE_METRICS = ("rtf", "wall_sec", "mean_us", "p95_us", "p50_ms", "p95_ms", "rps", "ms", "sec")
+HIGHER_IS_BETTER = ("rps",)
+
+def result_key(r):
+    return json.dumps({k: v for k, v in r.items() if k != "metrics"}, sort_keys=True)
+
+def compare(base_file, new_file):
+    with open(base_file) as f:
+        base = {result_key(r): r for r in json.load(f)["results"]}
+    with open(new_file) as f:
+        new = json.load(f)["results"]
+    for r in new:
+        old = base.get(result_key(r))
+        if old is None:
+            continue
+        label = " ".join(str(v) for k, v in r.items() if k != "metrics")
+        for metric in COMPARE_METRICS:
+            a, b = old["metrics"].get(metric), r["metrics"].get(metric)
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or not a:
+                continue
+            change = (b - a) / a * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            mark = "✅" if better and abs(change) >= 5 else "❌" if abs(change) >= 5 else "  "
+            print(f"{mark} {label:<55} {metric:<9} {a:>12} -> {b:<12} ({change:+.1f}%)")
+
+# --- main ---
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the transcription pipeline")
+    parser.add_argument("suite", choices=["all", "compare"] + list(SUITES))
+    parser.add_argument("files", nargs="*", help="compare: base.json new.json")
+    parser.add_argument("--out", help="write results as JSON here (default: stdout)")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--db", help="database to use/populate (default: <workdir>/bench.db)")
+    parser.add_argument("--stub", action="store_true", help="use the stub recognizer even if models are installed")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="stub decode time per audio second")
+    parser.add_argument("--wav", nargs="*", help="fixtures for the pipeline suite (default: synthetic)")
+    parser.add_argument("--synthetic-sec", type=float, default=30.0)
+    parser.add_argument("--vocab-sizes", default=DEFAULT_VOCAB_SIZES)
+    parser.add_argument("--rows", type=int, default=1000000, help="http: transcripts rows in the database")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="http: seconds per endpoint")
+    parser.add_argument("--endpoints", help="http: comma-separated subset")
+    args = parser.parse_args()
+
+    if args.suite == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs base.json and new.json")
+        compare(*args.files)
+        return 0
+
+    # Must be set before any project module is imported
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="scribe-bench-")
+    os.makedirs(args.workdir, exist_ok=True)
+    os.environ["SCRIBE_DB"] = os.path.abspath(args.db or os.path.join(args.workdir, "bench.db"))
+    os.environ["SCRIBE_MIC"] = "0"
+    os.environ.setdefault("SCRIBE_PRELOAD", "")
+
+    from models import registry
+    if args.stub or not registry.available():
+        args.stub = True
+        use_stub(args.stub_rtf)
+        print(f"🧪 Using the stub recognizer (RTF {args.stub_rtf}) for {list(STUB_LANGS)}")
+
+    meta = {"started": time.strftime("%Y-%m-%d %H:%M:%S"), "git": git_revision(),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "stub": args.stub, "stub_rtf": args.stub_rtf if args.stub else None,
+            "models": registry.paths, "db": os.environ["SCRIBE_DB"],
+            "env": {k: v for k, v in os.environ.items() if k.startswith("SCRIBE_")},
+            "args": {k: v for k, v in vars(args).items() if k not in ("files", "out")}}
+    try:
+        import numpy
+        meta["numpy"] = numpy.__version__
+    except ImportError:
+        meta["numpy"] = None
+
+    results = []
+    for name in (SUITES if args.suite == "all" else [args.suite]):
+        t0 = time.perf_counter()
+        SUITES[name](args, results)
+        print(f"✅ {name} done in {time.perf_counter() - t0:.1f}s")
+    meta["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    report = json.dumps({"meta": meta, "results": results}, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+        print(f"📄 Results written to {args.out}")
+    else:
+        print(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os, time, struct, itertools, threading, queue
+from collections import deque
+from metrics import metrics
+
+# Utterance-aligned audio storage.
+# The decode thread feeds every input block (with its position on the session timeline)
+# into a short in-memory ring. When a segment is committed we cut its exact span
+# (first word start -> last word end, plus a little padding) out of the ring and append
+# it to ONE growing WAV container per recording session. The byte offset is assigned
+# immediately, so the transcript row can store (file, offset, length) right away; the
+# actual disk write happens on a background thread.
+# The container's header is patched after every append, so it is always a valid WAV,
+# and a new container is started when one gets too big.
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+RING_SEC = 60.0                   # longest utterance we can recover in full
+PAD_SEC = 0.15                    # keep a little audio around the first/last word
+MAX_CONTAINER_BYTES = 512 * 1024 * 1024
+HEADER_BYTES = 44
+
+_session_seq = itertools.count(1)  # process-wide: two runs started in the same millisecond still differ
+
+WRITE_SECONDS = metrics.histogram("scribe_clip_write_seconds", "Time to append one segment to its WAV container")
+
+def wav_header(data_bytes, sample_rate=SAMPLE_RATE):
+    """Canonical 44-byte PCM16 mono header."""
+    byte_rate = sample_rate * SAMPLE_WIDTH
+    return struct.pack("<4sI4s4sIHHIIHH4sI",
+                       b"RIFF", 36 + data_bytes, b"WAVE",
+                       b"fmt ", 16, 1, 1, sample_rate, byte_rate, SAMPLE_WIDTH, 16,
+                       b"data", data_bytes)
+
+class ClipRecorder:
+    def __init__(self, audio_dir, sample_rate=SAMPLE_RATE):
+        self.audio_dir = audio_dir
+        self.sample_rate = sample_rate
+        self.ring = deque()          # (start_sec, pcm_bytes), oldest first
+        self.ring_bytes = 0
+        self.lock = threading.Lock()
+        self.session_name = None
+        self.part = 0
+        self.path = None
+        self.next_offset = HEADER_BYTES
+        self.q = queue.Queue()
+        self.thread = None
+        self.stats = {"segments": 0, "bytes": 0, "containers": 0, "truncated": 0}
+
+    # --- decode thread side ---
+    def feed(self, start_sec, data):
+        """Remember a raw input block that starts at start_sec on the session timeline."""
+        max_bytes = int(RING_SEC * self.sample_rate * SAMPLE_WIDTH)
+        with self.lock:
+            self.ring.append((start_sec, data))
+            self.ring_bytes += len(data)
+            while self.ring_bytes > max_bytes and len(self.ring) > 1:
+                _, old = self.ring.popleft()
+                self.ring_bytes -= len(old)
+
+    def _cut(self, start_sec, end_sec):
+        """PCM for [start_sec, end_sec) from the ring, plus the real start of what we got."""
+        bps = self.sample_rate * SAMPLE_WIDTH
+        with self.lock:
+            blocks = list(self.ring)
+            if blocks and start_sec < blocks[0][0]:
+                self.stats["truncated"] += 1
+        if not blocks:
+            return b"", start_sec
+        start_sec = max(start_sec, blocks[0][0])
+        pieces = []
+        for b_start, data in blocks:
+            b_end = b_start + len(data) / bps
+            if b_end <= start_sec or b_start >= end_sec:
+                continue
+            lo = max(0, int(round((start_sec - b_start) * self.sample_rate)) * SAMPLE_WIDTH)
+            hi = min(len(data), int(round((end_sec - b_start) * self.sample_rate)) * SAMPLE_WIDTH)
+            pieces.append(data[lo:hi])
+        return b"".join(pieces), start_sec
+
+    def save_segment(self, prefix, start_sec, end_sec):
+        """
+        Queue the audio of one segment. Returns (path, byte_offset, byte_length, clip_start_sec)
+        or None if there is nothing to store.
+        """
+        pcm, clip_start = self._cut(max(0.0, start_sec - PAD_SEC), end_sec + PAD_SEC)
+        if not pcm:
+            return None
+        with self.lock:
+            if self.session_name is None:
+                self._new_session(prefix)
+            if self.next_offset + len(pcm) > MAX_CONTAINER_BYTES:
+                self._roll()
+            path, offset = self.path, self.next_offset
+            self.next_offset += len(pcm)
+            self.stats["segments"] += 1
+            self.stats["bytes"] += len(pcm)
+        self._ensure_writer()
+        self.q.put(("append", path, offset, pcm))
+        return path, offset, len(pcm), round(clip_start, 3)
+
+    # --- session lifecycle ---
+    def _new_session(self, prefix):
+        # Every run gets its own containers: reusing a name would overwrite audio that
+        # stored transcripts still point into (stop/start within the same second)
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now * 1000) % 1000:03d}"
+        while True:
+            self.session_name = f"{prefix}_{stamp}_{next(_session_seq)}"
+            if not os.path.exists(os.path.join(self.audio_dir, f"{self.session_name}_001.wav")):
+                break
+        self.part = 0
+        self._roll()
+
+    def _roll(self):
+        self.part += 1
+        self.path = os.path.join(self.audio_dir, f"{self.session_name}_{self.part:03d}.wav")
+        self.next_offset = HEADER_BYTES
+        self.stats["containers"] += 1
+
+    def start_session(self, prefix="session"):
+        with self.lock:
+            self._new_session(prefix)
+            self.ring.clear()
+            self.ring_bytes = 0
+
+    def end_session(self):
+        with self.lock:
+            self.session_name = None
+            self.path = None
+        self.flush()
+
+    def flush(self, timeout=5.0):
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.q.put(("flush", done))
+        return done.wait(timeout)
+
+    # --- writer thread ---
+    def _ensure_writer(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="clip-writer", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        handles = {}
+        while True:
+            op = self.q.get()
+            if op[0] == "flush":
+                for f in handles.values():
+                    f.close()
+                handles = {}
+                op[1].set()
+                continue
+            _, path, offset, pcm = op
+            t0 = time.perf_counter()
+            try:
+                f = handles.get(path)
+                if f is None:
+                    # Close containers we rolled away from
+                    for old in handles.values():
+                        old.close()
+                    handles = {}
+                    mode = "r+b" if os.path.exists(path) else "w+b"
+                    f = handles[path] = open(path, mode)
+                    if mode == "w+b":
+                        f.write(wav_header(0, self.sample_rate))
+                f.seek(offset)
+                f.write(pcm)
+                # Patch the sizes so the file is playable while it grows
+                data_bytes = offset + len(pcm) - HEADER_BYTES
+                f.seek(0)
+                f.write(wav_header(data_bytes, self.sample_rate))
+                f.flush()
+                WRITE_SECONDS.observe(time.perf_counter() - t0)
+            except OSError as e:
+                print(f"⚠️ Clip write failed for {path}: {e}")
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+            s["ring_sec"] = round(self.ring_bytes / (self.sample_rate * SAMPLE_WIDTH), 2)
+            s["container"] = self.path
+        s["pending_writes"] = self.q.qsize()
+        return s
+
+def read_clip(path, offset, length, sample_rate=SAMPLE_RATE):
+    """A standalone WAV (header + exact byte range) for one stored segment."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        pcm = f.read(length)
+    return wav_header(len(pcm), sample_rate) + pcm
@@ -0,0 +1,200 @@
+import sqlite3, time, threading, queue, atexit
+from metrics import metrics, SIZE_BUCKETS
+
+# Background SQLite writer.
+# The decode loop only enqueues work; this thread owns its own WAL-mode connection and
+# applies everything that arrived in the last FLUSH_INTERVAL (or BATCH_SIZE items) in ONE
+# transaction, so a slow fsync can never stall audio consumption.
+
+FLUSH_INTERVAL = 0.3   # seconds between commits when traffic is light
+BATCH_SIZE = 200       # commit early once this many items are waiting
+QUEUE_SIZE = 5000      # bounded: if the disk is really stuck we drop instead of eating RAM
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_KB = 16 * 1024           # page cache per connection
+MMAP_BYTES = 256 * 1024 * 1024
+CACHED_STATEMENTS = 256        # compiled statements kept per connection (reused by SQL text)
+
+BATCH_ITEMS = metrics.histogram("scribe_db_batch_items", "Items committed per DB writer transaction", SIZE_BUCKETS)
+COMMIT_SECONDS = metrics.histogram("scribe_db_commit_seconds", "Time to apply and commit one DB writer batch")
+QUEUE_TO_COMMIT = metrics.histogram("scribe_db_queue_to_commit_seconds",
+                                    "From put() to committed, per item (kind=transcript: segment-to-commit latency)")
+
+def open_wal_connection(db_file, readonly=False):
+    conn = sqlite3.connect(db_file, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Wait for a competing writer instead of failing with "database is locked"
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    if readonly:
+        # Reader connections can never take the write lock by accident
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+class DBWriter:
+    """
+    apply_batch(conn, items) is called on the writer thread with a list of queued items;
+    it should only execute statements - the writer commits (or rolls back) the batch.
+    Whatever it returns is handed to on_commit() after a successful commit.
+    """
+    def __init__(self, db_file, apply_batch, on_commit=None, name="db-writer"):
+        self.db_file = db_file
+        self.apply_batch = apply_batch
+        self.on_commit = on_commit
+        self.name = name
+        self.q = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.stats = {"batches": 0, "items": 0, "last_batch_size": 0, "max_batch_size": 0,
+                      "last_commit_ms": 0.0, "dropped": 0, "errors": 0, "failed_items": 0}
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+        atexit.register(self.stop)
+
+    def put(self, item):
+        if not self.running:
+            self.start()
+        try:
+            # Never blocks: put() runs on the decode thread
+            self.q.put_nowait((item, time.monotonic()))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.stats["dropped"] += 1
+            print(f"⚠️ DB writer queue full, dropped: {item[0]}")
+            return False
+
+    def flush(self, timeout=5.0):
+        """Wait (at most timeout) until everything queued so far has been committed. False on timeout."""
+        if not self.running:
+            return True
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            # Bounded too: flush() is called from the decode thread, and the queue is full when the disk is stuck
+            self.q.put((("__flush__", done), None), timeout=timeout)
+        except queue.Full:
+            print(f"⚠️ DB writer queue still full after {timeout:.0f}s, not waiting for the flush")
+            return False
+        return done.wait(max(0.0, deadline - time.monotonic()))
+
+    def stop(self, timeout=5.0):
+        if not self.running:
+            return
+        self.flush(timeout)
+        try:
+            self.q.put((("__stop__", None), None), timeout=timeout)
+        except queue.Full:
+            print(f"⚠️ DB writer queue still full after {timeout:.0f}s, abandoning {self.pending()} items")
+            self.running = False
+            return
+        self.thread.join(timeout)
+        self.running = False
+
+    def pending(self):
+        return self.q.qsize()
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+        s["pending"] = self.pending()
+        return s
+
+    def _run(self):
+        conn = open_wal_connection(self.db_file)
+        stop = False
+        while not stop:
+            try:
+                first = self.q.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+
+            # Collect everything that arrives within the flush window (or up to BATCH_SIZE)
+            batch, queued_at, waiters = [], [], []
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            item, enqueued = first
+            while True:
+                kind = item[0]
+                if kind == "__flush__":
+                    waiters.append(item[1])
+                    break # commit right now
+                elif kind == "__stop__":
+                    stop = True
+                    break
+                else:
+                    batch.append(item)
+                    queued_at.append(enqueued)
+                if len(batch) >= BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item, enqueued = self.q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._commit(conn, batch, queued_at)
+            for w in waiters:
+                w.set()
+        conn.close()
+
+    def _apply(self, conn, items):
+        """(ok, result) - one transaction for items, rolled back if anything fails."""
+        try:
+            result = self.apply_batch(conn, items)
+            conn.commit()
+            return True, result
+        except Exception as e:
+            conn.rollback()
+            return False, e
+
+    def _commit(self, conn, batch, queued_at=()):
+        t0 = time.perf_counter()
+        ok, result = self._apply(conn, batch)
+        results = [result]
+        if not ok:
+            # One bad item must not take the whole batch down with it (those transcripts are
+            # already on the dashboards): retry them one by one and drop only what fails
+            with self.lock:
+                self.stats["errors"] += 1
+            print(f"⚠️ DB writer batch of {len(batch)} failed ({result}), retrying item by item")
+            results = []
+            for item in batch:
+                ok, result = self._apply(conn, [item])
+                if ok:
+                    results.append(result)
+                    continue
+                with self.lock:
+                    self.stats["failed_items"] += 1
+                print(f"⚠️ DB writer dropped a '{item[0]}' item: {result}")
+        elapsed = (time.perf_counter() - t0) * 1000
+        now = time.monotonic()
+        BATCH_ITEMS.observe(len(batch), writer=self.name)
+        COMMIT_SECONDS.observe(elapsed / 1000, writer=self.name)
+        for item, enqueued in zip(batch, queued_at):
+            QUEUE_TO_COMMIT.observe(now - enqueued, writer=self.name, kind=item[0])
+        with self.lock:
+            s = self.stats
+            s["batches"] += 1
+            s["items"] += len(batch)
+            s["last_batch_size"] = len(batch)
+            s["max_batch_size"] = max(s["max_batch_size"], len(batch))
+            s["last_commit_ms"] = round(elapsed, 2)
+        if self.on_commit:
+            for result in results:
+                try:
+                    self.on_commit(result)
+                except Exception as e:
+                    print(f"⚠️ DB writer on_commit failed: {e}")
@@ -0,0 +1,302 @@
+import os, sys, json, time, socket, threading, queue, secrets, subprocess
+from multiprocessing.connection import Listener, Client
+from metrics import metrics
+
+# Parallel decode stage for AUTO mode.
+# Every loaded language gets ONE long-lived worker that owns its recognizer.
+# A chunk is handed to all workers at the same time and we wait for all of them,
+# so a block costs max(decode) instead of sum(decode).
+#
+# Two worker flavours:
+#   - "thread":  recognizer lives in this process (vosk releases the GIL inside the decoder).
+#   - "process": each worker is a separate process with its own vosk.Model, so the
+#                Python side of the loop can't hold it back either. Costs one extra
+#                copy of every model in RAM.
+#                Workers are started as `python decode_pool.py --worker ...` and connect
+#                back over a local socket, so they never re-import app.py (which would
+#                load every model and open the microphone again in each child).
+
+WORKER_START_SEC = float(os.environ.get("SCRIBE_WORKER_START_SEC", "120")) # process worker: connect + load the model
+
+DECODE_SECONDS = metrics.histogram("scribe_decode_seconds", "AcceptWaveform time per input block")
+
+def _execute(rec, op, data):
+    """
+    Run one recognizer operation. Returns (is_final, result_json_str, elapsed_sec).
+    """
+    t0 = time.perf_counter()
+    if op in ("accept", "scan"):
+        # scan = accept, plus the partial hypothesis in the same round trip (keyword spotting)
+        if rec.AcceptWaveform(data):
+            return True, rec.Result(), time.perf_counter() - t0
+        return False, rec.PartialResult() if op == "scan" else None, time.perf_counter() - t0
+    if op == "partial":
+        return False, rec.PartialResult(), time.perf_counter() - t0
+    if op == "final":
+        return True, rec.FinalResult(), time.perf_counter() - t0
+    if op == "reset":
+        rec.Reset()
+        return False, None, time.perf_counter() - t0
+    raise ValueError(f"Unknown decode op: {op}")
+
+class _ThreadWorker:
+    def __init__(self, lang, rec):
+        self.lang = lang
+        self.rec = rec
+        self.inbox = queue.Queue()
+        self.outbox = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name=f"decode-{lang}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            op, data = self.inbox.get()
+            if op == "stop":
+                break
+            try:
+                self.outbox.put(_execute(self.rec, op, data))
+            except Exception as e:
+                print(f"⚠️ Decode worker [{self.lang}] failed on '{op}': {e}")
+                self.outbox.put((False, None, 0.0))
+
+    def send(self, op, data=None):
+        self.inbox.put((op, data))
+
+    def recv(self):
+        return self.outbox.get()
+
+    def close(self):
+        self.inbox.put(("stop", None))
+
+def _process_main(lang, model_path, conn):
+    # Runs inside the child process: load our own copy of the model once, then serve ops.
+    import vosk
+    model = vosk.Model(model_path)
+    rec = vosk.KaldiRecognizer(model, 16000)
+    rec.SetWords(True)
+    if hasattr(rec, "SetPartialWords"):
+        rec.SetPartialWords(True)
+    conn.send(("ready", None, 0.0))
+    while True:
+        try:
+            op, data = conn.recv()
+        except EOFError:
+            break
+        if op == "stop":
+            break
+        try:
+            conn.send(_execute(rec, op, data))
+        except Exception as e:
+            print(f"⚠️ Decode process [{lang}] failed on '{op}': {e}")
+            conn.send((False, None, 0.0))
+    conn.close()
+
+class _ProcessWorker:
+    def __init__(self, lang, model_path):
+        self.lang = lang
+        authkey = secrets.token_bytes(16)
+        listener = Listener(("127.0.0.1", 0), authkey=authkey)
+        host, port = listener.address
+        env = dict(os.environ, SCRIBE_WORKER_AUTHKEY=authkey.hex())
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", lang, model_path, host, str(port)],
+            env=env
+        )
+        self.started = time.monotonic()
+        try:
+            self.conn = self._accept(listener)
+            # Block until the child has its model loaded, so the first chunk isn't slow
+            while not self.conn.poll(1.0):
+                self._check_alive()
+            self.conn.recv()
+        except (EOFError, OSError, RuntimeError) as e:
+            self.proc.kill()
+            self.proc.wait()
+            raise RuntimeError(f"Decode process [{lang}] did not start: {str(e) or 'connection closed'}")
+        finally:
+            listener.close()
+
+    def _accept(self, listener):
+        # Listener.accept() has no timeout of its own: a child that dies before connecting
+        # (bad model path, vosk import error) would hang the session forever. So it runs on a
+        # helper thread, and we watch the child meanwhile.
+        result = {}
+        def run():
+            try:
+                result["conn"] = listener.accept()
+            except Exception as e:
+                result["error"] = e
+        thread = threading.Thread(target=run, name=f"decode-accept-{self.lang}", daemon=True)
+        thread.start()
+        try:
+            while thread.is_alive():
+                thread.join(1.0)
+                if thread.is_alive():
+                    self._check_alive()
+        except RuntimeError:
+            # Give up: wake the blocked accept() with a connection of our own (it fails the auth)
+            try:
+                socket.create_connection(listener.address, timeout=1.0).close()
+            except OSError:
+                pass
+            thread.join(5.0)
+            if "conn" in result:
+                result["conn"].close()
+            raise
+        if "error" in result:
+            raise RuntimeError(f"accept failed: {result['error']}")
+        return result["conn"]
+
+    def _check_alive(self):
+        code = self.proc.poll()
+        if code is not None:
+            raise RuntimeError(f"worker exited with code {code}")
+        if time.monotonic() - self.started > WORKER_START_SEC:
+            raise RuntimeError(f"no answer after {WORKER_START_SEC:.0f}s")
+
+    def send(self, op, data=None):
+        self.conn.send((op, data))
+
+    def recv(self):
+        return self.conn.recv()
+
+    def close(self):
+        try:
+            self.conn.send(("stop", None))
+        except (BrokenPipeError, OSError):
+            pass
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+class DecodePool:
+    """
+    One worker per language. Call accept()/partial()/finalize()/reset() with the
+    languages you want; results come back as {lang: (is_final, result_dict_or_None)}.
+    """
+    def __init__(self, mode="thread", sample_rate=16000):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown decode mode: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.workers = {}
+        self.stats = {}
+        # Audio seconds fed to each recognizer since it was created. Vosk word times keep
+        # counting from creation (Reset() doesn't rewind them), so this maps them to real time.
+        self.clocks = {}
+        self.lock = threading.Lock()
+
+    def add(self, lang, rec=None, model_path=None, clock=0.0):
+        # clock: audio the recognizer has already consumed (a recycled one from the recognizer pool)
+        if self.mode == "process":
+            self.workers[lang] = _ProcessWorker(lang, model_path)
+        else:
+            self.workers[lang] = _ThreadWorker(lang, rec)
+        self.stats[lang] = {"count": 0, "total_sec": 0.0, "max_sec": 0.0, "last_sec": 0.0, "audio_sec": 0.0}
+        self.clocks[lang] = clock
+
+    def remove(self, lang):
+        """
+        Stop lang's worker. Returns (rec, clock) so a thread-mode recognizer can go back
+        to the recognizer pool (rec is None for process workers).
+        """
+        worker = self.workers.pop(lang, None)
+        if worker is None:
+            return None, 0.0
+        worker.close()
+        if self.mode == "thread":
+            worker.thread.join() # the recognizer must be idle before anyone else uses it
+        with self.lock:
+            clock = self.clocks.pop(lang, 0.0)
+        return getattr(worker, "rec", None), clock
+
+    def languages(self):
+        return list(self.workers.keys())
+
+    def _run(self, op, langs, data=None, scan=()):
+        langs = [l for l in langs if l in self.workers]
+        dead = []
+        # Fan out first, then gather - this is what makes it parallel
+        for lang in langs:
+            try:
+                self.workers[lang].send("scan" if lang in scan else op, data)
+            except (EOFError, OSError):
+                dead.append(lang)
+
+        audio_sec = (len(data) / 2 / self.sample_rate) if data else 0.0
+        out = {}
+        for lang in langs:
+            if lang in dead:
+                continue
+            try:
+                is_final, res_str, elapsed = self.workers[lang].recv()
+            except (EOFError, OSError):
+                dead.append(lang)
+                continue
+            out[lang] = (is_final, json.loads(res_str) if res_str else None)
+            if op == "accept":
+                self._record(lang, elapsed, audio_sec)
+        for lang in dead:
+            # A decode process died: drop the language (the session adds it again on next use)
+            print(f"⚠️ Decode worker [{lang}] is gone, dropping it")
+            self.remove(lang)
+        return out
+
+    def _record(self, lang, elapsed, audio_sec):
+        DECODE_SECONDS.observe(elapsed, lang=lang, mode=self.mode)
+        with self.lock:
+            s = self.stats[lang]
+            s["count"] += 1
+            s["total_sec"] += elapsed
+            s["audio_sec"] += audio_sec
+            s["last_sec"] = elapsed
+            s["max_sec"] = max(s["max_sec"], elapsed)
+            self.clocks[lang] += audio_sec
+
+    def clock(self, lang):
+        """Recognizer time (sec) at the end of the last chunk it accepted."""
+        return self.clocks.get(lang, 0.0)
+
+    def accept(self, langs, data, scan=()):
+        """scan: languages (keys) that also return their partial result when not final."""
+        return self._run("accept", langs, data, scan)
+
+    def partial(self, langs):
+        return self._run("partial", langs)
+
+    def finalize(self, langs):
+        return self._run("final", langs)
+
+    def reset(self, langs):
+        return self._run("reset", langs)
+
+    def latency_report(self):
+        """
+        Per-language decode latency. 'rtf' is decode time / audio time:
+        0.25 means the worker is busy 25% of the time (75% headroom on its core).
+        """
+        report = {}
+        with self.lock:
+            for lang, s in self.stats.items():
+                count = s["count"]
+                report[lang] = {
+                    "chunks": count,
+                    "avg_ms": round(s["total_sec"] / count * 1000, 2) if count else 0.0,
+                    "max_ms": round(s["max_sec"] * 1000, 2),
+                    "last_ms": round(s["last_sec"] * 1000, 2),
+                    "rtf": round(s["total_sec"] / s["audio_sec"], 3) if s["audio_sec"] else 0.0,
+                }
+        return {"mode": self.mode, "languages": report}
+
+    def close(self):
+        for w in self.workers.values():
+            w.close()
+        self.workers = {}
+
+if __name__ == "__main__":
+    # Child side of a "process" worker: decode_pool.py --worker <lang> <model_path> <host> <port>
+    if len(sys.argv) == 6 and sys.argv[1] == "--worker":
+        _, _, lang, model_path, host, port = sys.argv
+        authkey = bytes.fromhex(os.environ["SCRIBE_WORKER_AUTHKEY"])
+        _process_main(lang, model_path, Client((host, int(port)), authkey=authkey))
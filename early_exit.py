@@ -0,0 +1,101 @@
+import threading
+
+# Adaptive early-exit for AUTO mode.
+# At the start of every utterance all languages decode in parallel. After each chunk we
+# peek at PartialResult from every recognizer; once one language clearly leads on
+# confidence AND stop-word hits, the others are paused until the next silence boundary
+# (= the leader returns a final result). Paused recognizers are reset at the boundary
+# because they missed part of the audio.
+
+PREPASS_WINDOW_SEC = 2.0   # Only try to lock during the first N seconds of an utterance
+PREPASS_MIN_SEC = 0.5      # Need at least this much audio before trusting partials
+LEAD_RATIO = 1.5           # Leader score must be >= ratio * runner-up score
+MIN_STOPWORD_HITS = 1      # Leader must have matched at least this many stop words
+
+def score_partial(lang, res, common_words):
+    """
+    Same idea as the final score (len * conf + 20 per stop word) but for a partial hypothesis.
+    Returns (score, stopword_hits).
+    """
+    text = res.get("partial", "").strip()
+    if not text:
+        return 0.0, 0
+    words = res.get("partial_result", [])
+    avg_conf = 1.0
+    if words:
+        avg_conf = sum(w.get("conf", 1.0) for w in words) / len(words)
+    hits = len(set(text.lower().split()).intersection(common_words.get(lang, set())))
+    return len(text) * avg_conf + hits * 20.0, hits
+
+class LanguageGate:
+    def __init__(self, common_words):
+        self.common_words = common_words
+        self.locked_lang = None
+        self.paused = []
+        self.utterance_sec = 0.0
+        self.deciding = True
+        self.lock = threading.Lock()
+        self.stats = {"locks": 0, "decodes_run": 0, "decodes_skipped": 0}
+
+    def langs_for_chunk(self, langs):
+        """Languages that should decode the next chunk."""
+        langs = list(langs)
+        if self.locked_lang and self.locked_lang in langs:
+            run = [self.locked_lang]
+        else:
+            run = langs
+        with self.lock:
+            self.stats["decodes_run"] += len(run)
+            self.stats["decodes_skipped"] += len(langs) - len(run)
+        return run
+
+    def wants_partials(self):
+        """Only pay for PartialResult while we are still inside the decision window."""
+        return self.locked_lang is None and self.deciding
+
+    def observe(self, partials, chunk_sec):
+        """
+        partials: {lang: partial_result_dict}. Returns the language we just locked onto, or None.
+        """
+        self.utterance_sec += chunk_sec
+        if not self.wants_partials() or len(partials) < 2:
+            return None
+        if self.utterance_sec < PREPASS_MIN_SEC:
+            return None
+        if self.utterance_sec > PREPASS_WINDOW_SEC:
+            # No clear leader early on - keep decoding everything until the boundary
+            self.deciding = False
+            return None
+
+        ranked = sorted(
+            ((lang,) + score_partial(lang, res or {}, self.common_words) for lang, res in partials.items()),
+            key=lambda x: x[1], reverse=True
+        )
+        leader, lead_score, lead_hits = ranked[0]
+        runner_up = ranked[1][1]
+        if lead_hits >= MIN_STOPWORD_HITS and lead_score > 0 and lead_score >= LEAD_RATIO * runner_up:
+            self.locked_lang = leader
+            self.paused = [lang for lang, _, _ in ranked[1:]]
+            with self.lock:
+                self.stats["locks"] += 1
+            return leader
+        return None
+
+    def end_utterance(self):
+        """
+        Silence boundary reached. Returns the languages that were paused (they need a reset).
+        """
+        paused = self.paused
+        self.locked_lang = None
+        self.paused = []
+        self.utterance_sec = 0.0
+        self.deciding = True
+        return paused
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+        total = s["decodes_run"] + s["decodes_skipped"]
+        s["skip_ratio"] = round(s["decodes_skipped"] / total, 3) if total else 0.0
+        s["locked_lang"] = self.locked_lang
+        return s
@@ -0,0 +1,85 @@
+import json, time, threading, queue
+from collections import deque
+
+# In-process push channel (Server-Sent Events).
+# The transcriber publishes as soon as a segment is decided; every connected dashboard
+# gets it from memory instead of polling SQLite. publish() is called from the audio /
+# writer threads, so it never blocks: each client has a bounded queue and a slow client
+# loses its oldest events instead of stalling the producer.
+
+HISTORY_SIZE = 200        # recent events kept for reconnecting clients (Last-Event-ID)
+CLIENT_QUEUE_SIZE = 500
+HEARTBEAT_SEC = 15.0
+
+class EventHub:
+    def __init__(self, history=HISTORY_SIZE):
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.history = deque(maxlen=history)
+        self.seq = 0
+        self.stats = {"published": 0, "dropped": 0}
+
+    def publish(self, kind, data):
+        with self.lock:
+            self.seq += 1
+            # Encode once, not once per client
+            event = (self.seq, kind, json.dumps(data, ensure_ascii=False))
+            self.history.append(event)
+            self.stats["published"] += 1
+            clients = list(self.clients)
+        for q in clients:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+                with self.lock:
+                    self.stats["dropped"] += 1
+        return event[0]
+
+    def subscribe(self, last_id=None):
+        q = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        with self.lock:
+            if last_id is not None:
+                # Replay what the client missed while reconnecting
+                for event in self.history:
+                    if event[0] > last_id:
+                        q.put_nowait(event)
+            self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.clients.discard(q)
+
+    def stream(self, last_id=None, kinds=None):
+        """Generator of SSE-formatted text for one client."""
+        q = self.subscribe(last_id)
+        try:
+            yield "retry: 2000\n\n"
+            last_write = time.monotonic()
+            while True:
+                try:
+                    seq, kind, payload = q.get(timeout=1.0)
+                except queue.Empty:
+                    # Heartbeat so dead connections are noticed (the write fails)
+                    if time.monotonic() - last_write > HEARTBEAT_SEC:
+                        last_write = time.monotonic()
+                        yield ": ping\n\n"
+                    continue
+                if kinds and kind not in kinds:
+                    continue
+                last_write = time.monotonic()
+                yield f"id: {seq}\nevent: {kind}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(q)
+
+    def report(self):
+        with self.lock:
+            return dict(self.stats, clients=len(self.clients), last_id=self.seq)
+
+# Singleton instance
+hub = EventHub()
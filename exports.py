@@ -0,0 +1,168 @@
+import io, csv, json, zlib
+from repository import pool, iter_transcripts
+from clip_recorder import HEADER_BYTES, SAMPLE_RATE, SAMPLE_WIDTH
+
+# Streaming transcript exports.
+# Rows are read from SQLite one page at a time (keyset, newest first like the old downloads,
+# ?order=oldest for the other way) and written out as they go, so a multi-month export needs
+# the same few hundred KB of RAM as a tiny one.
+#
+# Subtitles (SRT/VTT) are one timeline, so they need ?session= or ?audio_file= and always run
+# oldest first. They use the word timings when a row has them:
+#   - rows with a clip are timed on the session's containers played back to back (every run
+#     and every rolled-over part starts where the previous container ended), so
+#     `?audio_file=audio_clips/default_20240501_093000_123_1_001.wav` gives subtitles for that
+#     exact file and `?session=default` for all of them in one go;
+#   - batch rows are timed on their source file (filter with ?audio_file=<that file>);
+#   - rows without timings get their clip's span, or else a short cue right after the previous one.
+# Cues never go back in time. Long segments are split into cues of at most CUE_MAX_SEC / CUE_MAX_WORDS.
+
+EXPORT_FORMATS = {
+    # fmt: (mimetype, file extension)
+    "txt": ("text/plain", "txt"),
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "srt": ("application/x-subrip", "srt"),
+    "vtt": ("text/vtt", "vtt"),
+}
+CHUNK_ROWS = 500          # rows per database page
+FLUSH_BYTES = 64 * 1024   # yield in chunks of about this size, not once per row
+CUE_MAX_SEC = 6.0
+CUE_MAX_WORDS = 14
+MIN_CUE_SEC = 1.0
+SUBTITLE_FORMATS = ("srt", "vtt")
+
+def _txt(rows):
+    for t in rows:
+        yield f"{t['timestamp']} [{t['language']}] - {t['text']}\n"
+
+def _csv(rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["Timestamp", "Language", "Transcript", "AudioFile", "StartSec", "EndSec", "Confidence"])
+    for t in rows:
+        writer.writerow([t["timestamp"], t["language"], t["text"], t["audio_file"],
+                         t["start_sec"], t["end_sec"], t["confidence"]])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+def _jsonl(rows):
+    for t in rows:
+        yield json.dumps(t, ensure_ascii=False) + "\n"
+
+# --- Subtitles ---
+BYTES_PER_SEC = SAMPLE_RATE * SAMPLE_WIDTH
+
+class _Timeline:
+    """Where each container starts: the ones before it back to back, in row order."""
+    def __init__(self):
+        self.container = None
+        self.container_start = 0.0
+        self.container_sec = 0.0  # end of the last clip seen in the current container
+        self.last_end = 0.0       # end of the last cue written
+
+    def clip_start(self, t):
+        """Start of the row's clip on the timeline, or None if it has no clip."""
+        if t["audio_offset"] is None:
+            return None
+        if t["audio_file"] != self.container:
+            self.container_start += self.container_sec
+            self.container, self.container_sec = t["audio_file"], 0.0
+        start = (t["audio_offset"] - HEADER_BYTES) / BYTES_PER_SEC
+        self.container_sec = max(self.container_sec, start + (t["audio_length"] or 0) / BYTES_PER_SEC)
+        return self.container_start + start
+
+def _cues(t, timeline):
+    """[(start, end, text)] for one row on the subtitle timeline."""
+    cues = _row_cues(t, timeline.clip_start(t), timeline.last_end)
+    # Overlapping pads, or a row timed on another clock: never step back
+    shift = max(0.0, timeline.last_end - cues[0][0])
+    cues = [(start + shift, end + shift, text) for start, end, text in cues]
+    timeline.last_end = max(timeline.last_end, cues[-1][1])
+    return cues
+
+def _row_cues(t, clip_start, last_end):
+    words = t["words"]
+    tokens = t["text"].split()
+    if words:
+        # Word times are relative to the clip's first sample when the row has a clip
+        base = 0.0
+        if clip_start is not None and t["audio_start_sec"] is not None:
+            base = clip_start - t["audio_start_sec"]
+        # Fuzzy fixes replace word for word, so the stored text lines up with the timings
+        if len(tokens) != len(words):
+            tokens = [w["word"] for w in words]
+        cues, group = [], []
+        for token, w in zip(tokens, words):
+            if group and (len(group) >= CUE_MAX_WORDS or w["end"] - group[0][1]["start"] > CUE_MAX_SEC):
+                cues.append(group)
+                group = []
+            group.append((token, w))
+        if group:
+            cues.append(group)
+        return [(base + g[0][1]["start"], base + max(g[-1][1]["end"], g[0][1]["start"] + 0.2),
+                 " ".join(tok for tok, _ in g)) for g in cues]
+
+    # No timings: the clip's span, or right after the previous cue
+    if clip_start is not None and t["audio_length"]:
+        return [(clip_start, clip_start + t["audio_length"] / BYTES_PER_SEC, t["text"])]
+    return [(last_end, last_end + max(MIN_CUE_SEC, 0.4 * len(tokens)), t["text"])]
+
+def _clock(sec, sep):
+    ms = int(round(max(0.0, sec) * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+def _subtitles(rows, vtt=False):
+    sep = "." if vtt else ","
+    if vtt:
+        yield "WEBVTT\n\n"
+    n = 0
+    timeline = _Timeline()
+    for t in rows:
+        for start, end, text in _cues(t, timeline):
+            n += 1
+            head = "" if vtt else f"{n}\n"
+            yield f"{head}{_clock(start, sep)} --> {_clock(end, sep)}\n{text}\n\n"
+
+WRITERS = {
+    "txt": _txt,
+    "csv": _csv,
+    "jsonl": _jsonl,
+    "srt": _subtitles,
+    "vtt": lambda rows: _subtitles(rows, vtt=True),
+}
+
+def export_stream(fmt, oldest_first=False, **filters):
+    """
+    Generator of UTF-8 byte chunks for one export. Borrows a reader connection for as long
+    as the stream runs (Flask keeps iterating after the view has returned) and hands it
+    back when the stream ends or the client goes away.
+    """
+    if fmt in SUBTITLE_FORMATS:
+        if not filters.get("session") and not filters.get("audio_file"):
+            raise ValueError("Subtitles need a session or audio_file filter")
+        oldest_first = True
+    with pool.read() as conn:
+        rows = iter_transcripts(conn, chunk=CHUNK_ROWS, oldest_first=oldest_first, **filters)
+        buf, size = [], 0
+        for piece in WRITERS[fmt](rows):
+            buf.append(piece)
+            size += len(piece)
+            if size >= FLUSH_BYTES:
+                yield "".join(buf).encode("utf-8")
+                buf, size = [], 0
+        if buf:
+            yield "".join(buf).encode("utf-8")
+
+def gzip_stream(chunks, level=6):
+    """Compress a byte stream on the fly (gzip framing, usable as Content-Encoding)."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
@@ -0,0 +1,203 @@
+import json, time, struct
+from array import array
+
+try:
+    import numpy as np
+    from preprocess import PolyphaseResampler
+except ImportError:
+    np = None # Pure-Python path below keeps up with a few live streams
+
+# Audio from remote clients (HTTP uploads / WebSocket frames) into a "push" session.
+# Clients send whatever their sound card gives them - 16 kHz int16 mono is passed through,
+# anything else (other rates, float32, stereo, a WAV file) is converted on the fly
+# (polyphase resampling from preprocess.py with NumPy, linear interpolation without).
+# The converter is stateful, so a stream cut into small frames resamples exactly like one
+# long buffer (no clicks at frame edges).
+# Backpressure: when a session's queue is more than MAX_QUEUED_SEC behind, push_audio()
+# waits (which stalls the socket, so TCP slows the client down) and gives up after
+# PUSH_TIMEOUT, so HTTP clients can be told to retry.
+
+TARGET_RATE = 16000
+FORMATS = ("s16le", "f32le", "wav")
+MAX_QUEUED_SEC = 10.0
+PUSH_TIMEOUT = 5.0
+MAX_RATE = 192000
+MAX_CHANNELS = 8
+
+class StreamConverter:
+    def __init__(self, rate=TARGET_RATE, fmt="s16le", channels=1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown audio format: {fmt} (use one of {', '.join(FORMATS)})")
+        self.fmt = fmt
+        self.header = bytearray()  # WAV: bytes seen before the data chunk
+        self.leftover = b""        # partial sample frame carried to the next call
+        self.resampler = None      # NumPy: polyphase resampler for the client's rate
+        self.pos = 0.0             # pure Python: position of the next output sample in input samples
+        self.prev = None           # pure Python: last input sample of the previous call
+        self.tail = None           # pure Python: anti-alias filter history
+        self.configure(rate, "s16le" if fmt == "wav" else fmt, channels)
+        self.ready = fmt != "wav"
+
+    def configure(self, rate, sample_fmt, channels):
+        if not 1000 <= int(rate) <= MAX_RATE:
+            raise ValueError(f"Unsupported sample rate: {rate}")
+        if not 1 <= int(channels) <= MAX_CHANNELS:
+            raise ValueError(f"Unsupported channel count: {channels}")
+        self.rate = int(rate)
+        self.sample_fmt = sample_fmt
+        self.channels = int(channels)
+        self.frame_bytes = (2 if sample_fmt == "s16le" else 4) * self.channels
+        self.passthrough = self.rate == TARGET_RATE and self.channels == 1 and sample_fmt == "s16le"
+        self.resampler = None
+
+    def _parse_wav_header(self, data):
+        """Buffer until the WAV 'data' chunk starts; returns the PCM after it (or None)."""
+        self.header += data
+        buf = self.header
+        if len(buf) < 12:
+            return None
+        if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+            raise ValueError("Not a WAV stream")
+        offset = 12
+        while offset + 8 <= len(buf):
+            chunk_id, size = struct.unpack("<4sI", buf[offset:offset + 8])
+            if chunk_id == b"fmt ":
+                if offset + 8 + 16 > len(buf):
+                    return None
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", buf[offset + 8:offset + 24])
+                if (tag, bits) == (1, 16):
+                    sample_fmt = "s16le"
+                elif (tag, bits) == (3, 32):
+                    sample_fmt = "f32le"
+                else:
+                    raise ValueError(f"Unsupported WAV encoding (format {tag}, {bits} bit)")
+                self.configure(rate, sample_fmt, channels)
+            elif chunk_id == b"data":
+                self.ready = True
+                pcm = bytes(buf[offset + 8:])
+                self.header = bytearray()
+                return pcm
+            offset += 8 + size + (size & 1)
+        return None
+
+    def convert(self, data):
+        """Raw client bytes -> 16 kHz int16 mono PCM bytes (may be empty)."""
+        if not self.ready:
+            data = self._parse_wav_header(data)
+            if not data:
+                return b""
+        if self.leftover:
+            data = self.leftover + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self.leftover = data[usable:]
+        data = data[:usable]
+        if not data or self.passthrough:
+            return data
+        if np is not None:
+            return self._convert_numpy(data)
+        return self._convert_python(data)
+
+    def _convert_numpy(self, data):
+        dtype = np.int16 if self.sample_fmt == "s16le" else np.float32
+        x = np.frombuffer(data, dtype=dtype).astype(np.float32)
+        if self.sample_fmt == "f32le":
+            x *= 32767.0
+        if self.channels > 1:
+            x = x.reshape(-1, self.channels).mean(axis=1)
+        if self.rate != TARGET_RATE:
+            if self.resampler is None:
+                self.resampler = PolyphaseResampler(self.rate)
+            x = self.resampler.process(x)
+        return np.clip(np.rint(x), -32768, 32767).astype(np.int16).tobytes()
+
+    def _convert_python(self, data):
+        if self.sample_fmt == "s16le":
+            x = list(array("h", data))
+        else:
+            x = [v * 32767.0 for v in array("f", data)]
+        n = self.channels
+        if n > 1:
+            x = [sum(x[i:i + n]) / n for i in range(0, len(x), n)]
+        if self.rate != TARGET_RATE:
+            x = self._resample_python(self._smooth_python(x))
+        return array("h", [max(-32768, min(32767, int(round(v)))) for v in x]).tobytes()
+
+    def _smooth_python(self, x):
+        # Crude anti-aliasing before decimation: moving average over one output period.
+        # The window's history is carried over, so frame edges filter like the middle.
+        width = int(self.rate / TARGET_RATE)
+        if width < 2:
+            return x
+        if self.tail is None:
+            self.tail = [0.0] * (width - 1)
+        ext = self.tail + x
+        self.tail = ext[len(ext) - (width - 1):]
+        acc = sum(ext[:width - 1])
+        out = []
+        for i in range(width - 1, len(ext)):
+            acc += ext[i]
+            out.append(acc / width)
+            acc -= ext[i - width + 1]
+        return out
+
+    # Linear interpolation to TARGET_RATE. Index 0 of the working buffer is the last sample
+    # of the previous call, so the interpolation runs across frame edges; self.pos carries
+    # the fractional phase over.
+    def _resample_python(self, x):
+        step = self.rate / TARGET_RATE
+        pos = self.pos
+        if self.prev is not None:
+            x = [self.prev] + x
+            pos += 1.0
+        last = len(x) - 1
+        out = []
+        while pos < last:
+            i = int(pos)
+            out.append(x[i] + (x[i + 1] - x[i]) * (pos - i))
+            pos += step
+        self.prev = x[-1]
+        self.pos = pos - last - 1.0
+        return out
+
+def push_audio(session, chunks, rate=TARGET_RATE, fmt="s16le", channels=1, timeout=PUSH_TIMEOUT):
+    """
+    Convert and queue client audio for a push session. chunks: iterable of raw bytes.
+    Returns (accepted_input_bytes, complete). complete is False if the session stayed
+    backed up for longer than timeout (the caller should ask the client to retry).
+    Raises ValueError for a bad format.
+    """
+    conv = session.converter
+    # Raw streams keep their converter across requests/frames; every WAV upload has its own header
+    if fmt == "wav" or conv is None or (conv.fmt, conv.rate, conv.channels) != (fmt, int(rate), int(channels)):
+        conv = session.converter = StreamConverter(rate, fmt, channels)
+
+    accepted = 0
+    for data in chunks:
+        if not data:
+            continue
+        deadline = time.monotonic() + timeout
+        while session.queued_sec() > MAX_QUEUED_SEC:
+            if time.monotonic() > deadline:
+                return accepted, False
+            time.sleep(0.05)
+        pcm = conv.convert(data)
+        if pcm:
+            session.feed(pcm)
+        accepted += len(data)
+    return accepted, True
+
+def read_body(stream, chunk_bytes=32000):
+    """Iterate a (possibly chunked) request body as it arrives."""
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            return
+        yield data
+
+def ws_config(message):
+    """First WebSocket text message -> (rate, fmt, channels)."""
+    cfg = json.loads(message or "{}")
+    fmt = cfg.get("format", "s16le")
+    if fmt == "wav":
+        raise ValueError("Send raw s16le/f32le frames over the WebSocket (WAV files go to the HTTP endpoint)")
+    return int(cfg.get("rate", TARGET_RATE)), fmt, int(cfg.get("channels", 1))
@@ -0,0 +1,87 @@
+import os, math, queue, threading
+from collections import deque
+
+# Bounded buffer between the audio callback (or feed()) and a session's decode thread.
+# An unbounded queue hides overload: when decoding falls behind (three recognizers in AUTO
+# mode on a slow CPU) audio piles up in memory and every transcript comes later than the last.
+#   - The buffer holds at most INPUT_QUEUE_SEC of audio. When it is full the oldest block is
+#     dropped; put() never blocks, it runs inside the PortAudio callback.
+#   - Past CATCHUP_SEC of backlog the session switches to catch-up mode (transcriber.py) until
+#     the backlog is down to half of that. CATCHUP_POLICY says what it gives up meanwhile:
+#       leading      - AUTO decodes only the leading language
+#       skip_silence - silent blocks are dropped outright (VAD on, no kept pause)
+#       drop_oldest  - the backlog is cut back to CATCHUP_SEC / 2 at once (the utterance in
+#                      progress is finalized first, so no words are glued across the gap)
+
+INPUT_QUEUE_SEC = float(os.environ.get("SCRIBE_INPUT_QUEUE_SEC", "30"))
+CATCHUP_SEC = float(os.environ.get("SCRIBE_CATCHUP_SEC", "5"))   # 0 = never
+CATCHUP_POLICIES = ("leading", "skip_silence", "drop_oldest")
+
+def parse_policy(spec):
+    """"leading,skip_silence" -> {"leading", "skip_silence"}. Raises ValueError."""
+    policy = {p.strip() for p in spec.split(",") if p.strip()}
+    unknown = policy - set(CATCHUP_POLICIES)
+    if unknown:
+        raise ValueError(f"Unknown catch-up policy: {', '.join(sorted(unknown))} (use {', '.join(CATCHUP_POLICIES)})")
+    return policy
+
+CATCHUP_POLICY = parse_policy(os.environ.get("SCRIBE_CATCHUP_POLICY", "leading,skip_silence"))
+
+class InputBuffer:
+    """
+    queue.Queue look-alike for audio blocks of block_sec each, holding at most max_sec.
+    A full buffer drops its oldest block instead of blocking the producer.
+    """
+    def __init__(self, block_sec, max_sec=INPUT_QUEUE_SEC):
+        self.block_sec = block_sec
+        self.capacity = max(1, math.ceil(max_sec / block_sec))
+        self.blocks = deque()
+        self.cond = threading.Condition()
+        self.stats = {"blocks": 0, "overruns": 0, "trimmed": 0}
+
+    def put(self, data):
+        with self.cond:
+            if len(self.blocks) >= self.capacity:
+                self.blocks.popleft()
+                self.stats["overruns"] += 1
+            self.blocks.append(data)
+            self.stats["blocks"] += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.blocks, timeout):
+                raise queue.Empty
+            return self.blocks.popleft()
+
+    def qsize(self):
+        return len(self.blocks)
+
+    def empty(self):
+        return not self.blocks
+
+    def backlog_sec(self):
+        return len(self.blocks) * self.block_sec
+
+    def dropped(self):
+        """Blocks lost so far (overruns + trims); a change means there is a gap in the audio."""
+        with self.cond:
+            return self.stats["overruns"] + self.stats["trimmed"]
+
+    def trim(self, keep_sec):
+        """Drop the oldest blocks until at most keep_sec is left. Returns how many went."""
+        keep = int(keep_sec / self.block_sec)
+        with self.cond:
+            n = max(0, len(self.blocks) - keep)
+            for _ in range(n):
+                self.blocks.popleft()
+            self.stats["trimmed"] += n
+        return n
+
+    def report(self):
+        with self.cond:
+            s = dict(self.stats)
+            depth = len(self.blocks)
+        return dict(s, queued_blocks=depth, queued_sec=round(depth * self.block_sec, 2),
+                    capacity_sec=round(self.capacity * self.block_sec, 2),
+                    dropped_sec=round((s["overruns"] + s["trimmed"]) * self.block_sec, 2))
@@ -0,0 +1,125 @@
+import os, time, threading
+from recognizer_pool import keywords_grammar, recognizers
+from metrics import metrics
+
+# Keyword spotting for the Hunter drill.
+# A session can be given a few target words; they get their own grammar recognizer
+# (just the words plus [unk]) that decodes every block next to the main recognizers, in the
+# same decode pool fan-out. Its partial hypothesis comes back with every block, so a hit is
+# reported within one block of being spoken instead of after the utterance's final result
+# and a database round trip. A one-word grammar costs a fraction of full dictation.
+#   - a hit is published at once as a "keyword" event (word, time on the session timeline, conf)
+#   - it is written to context_samples when the main decoder commits the sentence it was in,
+#     so the sample holds the real transcript and not "[unk] algorithm [unk]"
+# Needs SCRIBE_DECODE_MODE=thread and a small model, like the drill grammars.
+
+MIN_CONF = float(os.environ.get("SCRIBE_KWS_MIN_CONF", "0.5"))
+MAX_KEYWORDS = 20
+SENTENCE_SLACK_SEC = 1.0  # a hit this far past the end of a committed sentence belongs to the next one
+
+KEYWORD_HITS = metrics.counter("scribe_keyword_hits_total", "Keyword spotter hits")
+
+def normalize_keywords(words):
+    """["Neural ", "neural", "sort  algorithm"] -> ["neural", "sort algorithm"]. Raises ValueError."""
+    if isinstance(words, str):
+        words = [words]
+    if not isinstance(words, (list, tuple)) or not all(isinstance(w, str) for w in words):
+        raise ValueError("keywords must be a list of words")
+    out = []
+    for w in words:
+        w = " ".join(w.lower().split())
+        if w and w not in out:
+            if "|" in w or "[" in w:
+                raise ValueError(f"Invalid keyword: {w}")
+            out.append(w)
+    if len(out) > MAX_KEYWORDS:
+        raise ValueError(f"Too many keywords (max {MAX_KEYWORDS})")
+    return out
+
+class KeywordSpotter:
+    """
+    The target words of one session, their checked-out recognizer and the hits that are
+    still waiting for their sentence. key is the spotter's name in the decode pool.
+    """
+    def __init__(self, words, lang, min_conf=MIN_CONF):
+        self.words = list(words)
+        self.lang = lang
+        self.min_conf = min_conf
+        self.grammar = keywords_grammar(self.words)
+        self.key = f"kws-{lang}"
+        self.phrases = [tuple(w.split()) for w in self.words]
+        self.rec_key = None
+        self.reported = {}  # phrase -> hits already reported in the current segment
+        self.pending = []   # hits waiting for the main decoder's sentence
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "blocks": 0, "written": 0, "delay_sec": 0.0, "max_delay_sec": 0.0}
+
+    def attach(self, decode_pool):
+        """Check a grammar recognizer out of the pool and add it to decode_pool. Raises."""
+        rec, age, self.rec_key = recognizers.checkout(self.lang, self.grammar)
+        decode_pool.add(self.key, rec=rec, clock=age)
+
+    def detach(self, decode_pool):
+        rec, clock = decode_pool.remove(self.key)
+        if rec is not None and self.rec_key is not None:
+            recognizers.checkin(self.rec_key, rec, clock)
+        self.rec_key = None
+
+    def scan(self, is_final, res, offset, now_sec):
+        """
+        New hits in one decode result (partial or final). offset maps recognizer times onto
+        the session timeline, now_sec is the end of the audio decoded so far.
+        Returns [{word, start, end, conf, delay_sec}].
+        """
+        self.stats["blocks"] += 1
+        res = res or {}
+        words = res.get("result") if is_final else res.get("partial_result")
+        if words is None:
+            # No word times (old vosk without SetPartialWords): the hit is "now"
+            text = res.get("text" if is_final else "partial", "")
+            words = [{"word": w, "start": now_sec - offset, "end": now_sec - offset} for w in text.split()]
+        toks = [w.get("word", "").lower() for w in words]
+        hits = []
+        for phrase in self.phrases:
+            n = len(phrase)
+            found = [i for i in range(len(toks) - n + 1) if tuple(toks[i:i + n]) == phrase]
+            # Partials are re-decoded every block: only occurrences past the ones already reported are new
+            for i in found[self.reported.get(phrase, 0):]:
+                conf = min(w.get("conf", 1.0) for w in words[i:i + n])
+                if conf < self.min_conf:
+                    continue
+                end = words[i + n - 1].get("end", 0.0) + offset
+                hits.append({"word": " ".join(phrase), "start": round(words[i].get("start", 0.0) + offset, 3),
+                             "end": round(end, 3), "conf": round(conf, 3), "delay_sec": round(max(0.0, now_sec - end), 3)})
+                self.reported[phrase] = self.reported.get(phrase, 0) + 1
+        if is_final:
+            self.reported = {}
+        if hits:
+            with self.lock:
+                self.pending += hits
+                self.stats["hits"] += len(hits)
+                for h in hits:
+                    self.stats["delay_sec"] += h["delay_sec"]
+                    self.stats["max_delay_sec"] = max(self.stats["max_delay_sec"], h["delay_sec"])
+            KEYWORD_HITS.inc(len(hits), lang=self.lang)
+        return hits
+
+    def take_pending(self, until_sec=None):
+        """Hits up to until_sec (None = all) whose sentence is now known."""
+        with self.lock:
+            if until_sec is None:
+                taken, self.pending = self.pending, []
+            else:
+                taken = [h for h in self.pending if h["start"] <= until_sec + SENTENCE_SLACK_SEC]
+                self.pending = [h for h in self.pending if h["start"] > until_sec + SENTENCE_SLACK_SEC]
+            self.stats["written"] += len(taken)
+        return taken
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+            pending = len(self.pending)
+        delay = s.pop("delay_sec")
+        s["avg_delay_ms"] = round(delay / s["hits"] * 1000, 1) if s["hits"] else 0.0
+        s["max_delay_ms"] = round(s.pop("max_delay_sec") * 1000, 1)
+        return dict(s, words=self.words, lang=self.lang, min_conf=self.min_conf, pending=pending)
@@ -0,0 +1,283 @@
+import os, re, sys, math, time, argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # Pure-Python scoring below: same model, same answers, a lot slower in bulk
+
+# Text language identification with character n-grams (no dictionaries, no network).
+# Every 1-, 2- and 3-gram of the lowercased, space-padded text is hashed into one of BUCKETS
+# slots; the model is one float32 row of log-probabilities per language. Scoring a text is a
+# gather + sum over its n-gram slots, and classify_many() does a whole batch with a handful of
+# NumPy calls (thousands of transcript rows per second).
+# The model is trained from the seed text below (enough to tell en / es / hi apart, accents
+# or not) and can be retrained with more text, e.g. the transcripts already in the database:
+#   python langid.py --train --db transcriptions.db    -> langid.npz, picked up on next start
+#   python langid.py "que tal el dia"                  -> es 1.00
+# More languages = another SEED_TEXT entry (or rows in the database).
+# A word or two is too little to go on ("hello" and "yes" read as Spanish to the seed model),
+# so detect() falls back to the script for texts under MIN_NGRAMS n-grams or below MIN_PROB:
+# Devanagari -> hi, Spanish accents / ¿¡ -> es, anything else -> en.
+
+MODEL_FILE = os.environ.get("SCRIBE_LANGID_MODEL", "langid.npz")
+ORDERS = (1, 2, 3)
+BITS = 14
+BUCKETS = 1 << BITS
+ALPHA = 0.1  # additive smoothing per bucket
+MIN_NGRAMS = 20  # about one 6-letter word
+MIN_PROB = 0.9
+
+SEED_TEXT = {
+    "en": """
+        the quick brown fox jumps over the lazy dog. how are you today? i am fine, thank you.
+        my name is john and i work in the city. what time is it? it is a good morning to start.
+        we are going to the store to buy some bread and milk. they have been waiting for a long time.
+        this is the first time that i have seen something like that. where do you live?
+        please open the window because it is very hot in here. can you help me with this problem?
+        i think that we should talk about it tomorrow. the weather is nice and the sun is shining.
+        she said that he would come back later with the children. there is nothing we can do now.
+        would you like a cup of coffee or tea? the meeting starts at nine o'clock in the morning.
+        let me know if you need anything else. thank you very much for your help and your time.
+        the algorithm runs in linear time and the function returns an array of values.
+        people who know what they want usually find a way to get it. which one of these is yours?
+    """,
+    "es": """
+        el rapido zorro marron salta sobre el perro perezoso. como estas hoy? estoy bien, gracias.
+        mi nombre es juan y trabajo en la ciudad. que hora es? es una buena manana para empezar.
+        vamos a la tienda a comprar pan y leche. ellos han estado esperando mucho tiempo.
+        esta es la primera vez que veo algo asi. donde vives? por favor abre la ventana porque
+        hace mucho calor aqui. puedes ayudarme con este problema? creo que deberiamos hablar de
+        eso manana. el tiempo esta agradable y el sol brilla. ella dijo que el volveria mas tarde
+        con los ninos. no hay nada que podamos hacer ahora. quieres una taza de cafe o de te?
+        la reunion empieza a las nueve de la manana. avisame si necesitas algo mas. muchas gracias
+        por tu ayuda y por tu tiempo. el algoritmo se ejecuta en tiempo lineal y la funcion
+        devuelve una lista de valores. las personas que saben lo que quieren suelen encontrar
+        la manera de conseguirlo. cual de estos es el tuyo? buenos dias, que tal, hasta luego.
+        él está aquí, mañana será otro día, ¿qué pasó?, ¡qué bien!, años, corazón, también.
+    """,
+    "hi": """
+        तेज़ भूरी लोमड़ी आलसी कुत्ते के ऊपर कूदती है। आप आज कैसे हैं? मैं ठीक हूँ, धन्यवाद।
+        मेरा नाम राम है और मैं शहर में काम करता हूँ। क्या समय हुआ है? शुरू करने के लिए यह अच्छी सुबह है।
+        हम रोटी और दूध खरीदने के लिए दुकान जा रहे हैं। वे बहुत देर से इंतज़ार कर रहे हैं।
+        यह पहली बार है कि मैंने ऐसा कुछ देखा है। आप कहाँ रहते हैं? कृपया खिड़की खोल दीजिए क्योंकि
+        यहाँ बहुत गर्मी है। क्या आप इस समस्या में मेरी मदद कर सकते हैं? मुझे लगता है कि हमें कल
+        इस बारे में बात करनी चाहिए। मौसम अच्छा है और धूप निकली है। उसने कहा कि वह बच्चों के साथ
+        बाद में वापस आएगा। अब हम कुछ नहीं कर सकते। क्या आप चाय या कॉफ़ी लेंगे? बैठक सुबह नौ बजे
+        शुरू होती है। अगर आपको कुछ और चाहिए तो मुझे बताइए। आपकी मदद और समय के लिए बहुत बहुत धन्यवाद।
+        जो लोग जानते हैं कि उन्हें क्या चाहिए वे अक्सर उसे पाने का रास्ता ढूंढ लेते हैं।
+    """,
+}
+
+CLEAN_RE = re.compile(r"[^\w\u0900-\u097F]+|[\d_]+")  # \w alone drops Devanagari vowel signs
+HINDI_RE = re.compile(r"[\u0900-\u097F]")
+SPANISH_RE = re.compile(r"[áéíóúñ¿¡]")
+MULT = 1000003
+MIX = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+def normalize(text):
+    text = CLEAN_RE.sub(" ", (text or "").lower()).strip()
+    return f" {text} " if text else ""
+
+def ngram_count(text):
+    """How many n-grams the model sees in text (without hashing them)."""
+    size = len(normalize(text))
+    return sum(max(0, size - n + 1) for n in ORDERS)
+
+def script_guess(text):
+    """The old character-range heuristic, for texts too short to score."""
+    if not normalize(text):
+        return "unknown"
+    if HINDI_RE.search(text):
+        return "hi"
+    if SPANISH_RE.search(text.lower()):
+        return "es"
+    return "en"
+
+def _slots_py(text):
+    """Hashed n-gram slots of one normalized text (pure Python; same hash as _slots_np)."""
+    codes = [ord(c) for c in text]
+    slots = []
+    for n in ORDERS:
+        for i in range(len(codes) - n + 1):
+            h = n
+            for c in codes[i:i + n]:
+                h = (h * MULT + c) & MASK64
+            slots.append(((h * MIX) & MASK64) >> (64 - BITS))
+    return slots
+
+def _slots_np(texts):
+    """(slots, text index) of every n-gram of a batch of normalized texts, in one go."""
+    joined = "\0".join(texts)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    sep = np.concatenate(([0], np.cumsum(codes == 0)))  # separators before each position
+    all_slots, all_owner = [], []
+    for n in ORDERS:
+        m = len(codes) - n + 1
+        if m <= 0:
+            continue
+        h = np.full(m, n, dtype=np.uint64)
+        for k in range(n):
+            h = h * np.uint64(MULT) + codes[k:k + m]
+        keep = sep[n:n + m] == sep[:m]  # no n-gram across two texts
+        all_slots.append(((h[keep] * np.uint64(MIX)) >> np.uint64(64 - BITS)).astype(np.intp))
+        all_owner.append(sep[:m][keep])
+    if not all_slots:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(all_slots), np.concatenate(all_owner).astype(np.intp)
+
+class LanguageIdentifier:
+    def __init__(self, langs=(), logp=None):
+        self.langs = list(langs)
+        self.logp = logp  # [lang][slot] log-probabilities (np.float32 array, or list of array('f'))
+
+    # --- training ---
+    @classmethod
+    def train(cls, samples, alpha=ALPHA):
+        """samples: {lang: [text, ...]} -> LanguageIdentifier."""
+        langs = sorted(samples)
+        if np is not None:
+            counts = np.zeros((len(langs), BUCKETS))
+            for i, lang in enumerate(langs):
+                texts = samples[lang]
+                for start in range(0, len(texts), 10000):
+                    slots, _ = _slots_np([normalize(t) for t in texts[start:start + 10000]])
+                    counts[i] += np.bincount(slots, minlength=BUCKETS)
+            logp = np.log((counts + alpha) / (counts.sum(axis=1, keepdims=True) + alpha * BUCKETS))
+            return cls(langs, logp.astype(np.float32))
+        rows = []
+        for lang in langs:
+            counts = [0] * BUCKETS
+            for text in samples[lang]:
+                for slot in _slots_py(normalize(text)):
+                    counts[slot] += 1
+            total = sum(counts) + alpha * BUCKETS
+            rows.append(array("f", (math.log((c + alpha) / total) for c in counts)))
+        return cls(langs, rows)
+
+    def save(self, path=MODEL_FILE):
+        np.savez_compressed(path, langs=np.array(self.langs), logp=np.asarray(self.logp, dtype=np.float32),
+                            bits=np.array(BITS))
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with np.load(path) as data:
+            if int(data["bits"]) != BITS:
+                raise ValueError(f"{path} was trained with {int(data['bits'])} hash bits, not {BITS}")
+            return cls([str(l) for l in data["langs"]], data["logp"].astype(np.float32))
+
+    # --- scoring ---
+    def scores_many(self, texts):
+        """[[log-likelihood per language], ...] and n-gram counts, for a batch of texts."""
+        texts = [normalize(t) for t in texts]
+        if np is None:
+            totals, counts = [], []
+            for text in texts:
+                slots = _slots_py(text)
+                totals.append([sum(row[s] for s in slots) for row in self.logp])
+                counts.append(len(slots))
+            return totals, counts
+        slots, owner = _slots_np(texts)
+        totals = np.stack([np.bincount(owner, weights=row[slots], minlength=len(texts)) for row in self.logp], axis=1)
+        return totals, np.bincount(owner, minlength=len(texts))
+
+    def classify_many(self, texts, langs=None):
+        """
+        [(lang, probability)] per text; ("unknown", 0.0) for texts without letters.
+        langs limits the choice (e.g. the languages the recognizers ran).
+        """
+        if not self.langs:
+            return [("unknown", 0.0)] * len(texts)
+        allowed = [i for i, l in enumerate(self.langs) if langs is None or l in langs]
+        totals, counts = self.scores_many(texts)
+        results = []
+        for row, n in zip(totals, counts):
+            if not n or not allowed:
+                results.append(("unknown", 0.0))
+                continue
+            best = max(allowed, key=lambda i: row[i])
+            # Posterior with a flat prior: 1 / sum(exp(other - best))
+            norm = sum(math.exp(row[i] - row[best]) for i in allowed)
+            results.append((self.langs[best], 1.0 / norm))
+        return results
+
+    def classify(self, text, langs=None):
+        return self.classify_many([text], langs)[0]
+
+    def detect_many(self, texts, langs=None):
+        """classify_many(), with short or unsure texts going by script_guess() (probability 0.0)."""
+        results = self.classify_many(texts, langs)
+        for i, (text, (lang, prob)) in enumerate(zip(texts, results)):
+            if lang != "unknown" and (prob < MIN_PROB or ngram_count(text) < MIN_NGRAMS):
+                results[i] = (script_guess(text), 0.0)
+        return results
+
+    def detect(self, text, langs=None):
+        return self.detect_many([text], langs)[0]
+
+    def probability(self, text, lang, langs=None):
+        """P(lang | text) among langs (default: all)."""
+        if lang not in self.langs:
+            return 0.0
+        allowed = [l for l in self.langs if langs is None or l in langs or l == lang]
+        totals, counts = self.scores_many([text])
+        if not counts[0]:
+            return 0.0
+        row = {l: totals[0][self.langs.index(l)] for l in allowed}
+        return 1.0 / sum(math.exp(v - row[lang]) for v in row.values())
+
+def default_model():
+    """The saved model (MODEL_FILE) if there is one, else one trained from SEED_TEXT (a few ms)."""
+    if np is not None and MODEL_FILE and os.path.exists(MODEL_FILE):
+        try:
+            model = LanguageIdentifier.load(MODEL_FILE)
+            print(f"🔤 Language ID model: {MODEL_FILE} ({', '.join(model.langs)})")
+            return model
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not load {MODEL_FILE}, using the built-in model: {e}")
+    return LanguageIdentifier.train({lang: [text] for lang, text in SEED_TEXT.items()})
+
+# Shared instance, built on first use
+_model = None
+
+def model():
+    global _model
+    if _model is None:
+        _model = default_model()
+    return _model
+
+def main():
+    parser = argparse.ArgumentParser(description="Character n-gram language identification")
+    parser.add_argument("text", nargs="*", help="text to classify")
+    parser.add_argument("--train", action="store_true", help="train a model and save it to --out")
+    parser.add_argument("--db", help="also train on the transcripts in this database (labelled by the recognizer)")
+    parser.add_argument("--min-words", type=int, default=3, help="skip shorter transcripts when training")
+    parser.add_argument("--out", default=MODEL_FILE)
+    args = parser.parse_args()
+
+    if args.train:
+        if np is None:
+            parser.error("saving a model needs NumPy")
+        samples = {lang: [text] for lang, text in SEED_TEXT.items()}
+        if args.db:
+            import sqlite3
+            conn = sqlite3.connect(args.db)
+            for lang, text in conn.execute("SELECT language, text FROM transcripts WHERE text IS NOT NULL"):
+                if lang and len(text.split()) >= args.min_words:
+                    samples.setdefault(lang, []).append(text)
+            conn.close()
+        t0 = time.perf_counter()
+        model = LanguageIdentifier.train(samples)
+        model.save(args.out)
+        sizes = ", ".join(f"{lang}: {len(texts)}" for lang, texts in sorted(samples.items()))
+        print(f"✅ Trained on {sizes} texts in {time.perf_counter() - t0:.1f}s -> {args.out}")
+        return 0
+    if not args.text:
+        parser.error("give text to classify, or --train")
+    lang, prob = default_model().detect(" ".join(args.text))
+    print(f"{lang} {prob:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
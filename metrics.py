@@ -0,0 +1,131 @@
+import os, threading
+
+# Prometheus-style metrics, no client library needed.
+# Hot paths observe() into histograms / inc() counters (a lock and a few adds); everything
+# that already lives in a report() somewhere (queue depths, RTF, model sizes...) is read by
+# collectors only when /metrics is scraped.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+def _labels(labels, extra=None):
+    items = sorted(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def _num(v):
+    if isinstance(v, float) and v == float("inf"):
+        return "+Inf"
+    return repr(round(v, 6)) if isinstance(v, float) else str(v)
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {}  # label tuple -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            s = self.series.get(key)
+            if s is None:
+                s = self.series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {k: list(v) for k, v in self.series.items()}
+        for key, s in sorted(series.items()):
+            labels = dict(key)
+            for bound, n in zip(self.buckets, s):
+                lines.append(f"{self.name}_bucket{_labels(labels, ('le', _num(float(bound))))} {n}")
+            lines.append(f"{self.name}_bucket{_labels(labels, ('le', '+Inf'))} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_num(s[-2])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {s[-1]}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def inc(self, n=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + n
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            series = dict(self.series)
+        for key, n in sorted(series.items()):
+            lines.append(f"{self.name}{_labels(dict(key))} {_num(n)}")
+        return lines
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.instruments = {}
+        self.collectors = []
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        with self.lock:
+            return self.instruments.setdefault(name, Histogram(name, help_text, buckets))
+
+    def counter(self, name, help_text):
+        with self.lock:
+            return self.instruments.setdefault(name, Counter(name, help_text))
+
+    def add_collector(self, collect):
+        """collect() -> [(name, type, help, [(labels_dict, value)])], called on every scrape."""
+        self.collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            instruments = list(self.instruments.values())
+        for inst in instruments:
+            lines += inst.render()
+        for collect in self.collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                lines.append(f"# collector {getattr(collect, '__name__', '?')} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_labels(labels)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+def process_memory():
+    """(resident bytes, peak resident bytes); None where the platform doesn't say."""
+    rss = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if os.uname().sysname == "Darwin" else 1024 # bytes on macOS, KB elsewhere
+    except (ImportError, AttributeError):
+        pass
+    return rss, peak
+
+# Singleton instance
+metrics = Metrics()
@@ -0,0 +1,259 @@
+import os, time, threading
+
+# Candidate paths to search for (Priority: Large -> Small)
+MODEL_CANDIDATES = {
+    "en": ["vosk-model-en-us-0.22", "vosk-model-small-en-us-0.15"],
+    "es": ["vosk-model-es-0.42", "vosk-model-small-es-0.42"], 
+    "hi": ["vosk-model-hi-0.22", "vosk-model-small-hi-0.22"]
+}
+
+def find_model_path(base_name):
+    """
+    Handle cases where user extracted 'model/' into 'model/model/' 
+    or just 'model/'.
+    """
+    # 1. Check direct path
+    if os.path.exists(os.path.join(base_name, "conf")):
+        return base_name
+    
+    # 2. Check nested same-name folder
+    nested = os.path.join(base_name, base_name)
+    if os.path.exists(os.path.join(nested, "conf")):
+        return nested
+        
+    # 3. Last ditch: check ANY subfolder
+    if os.path.exists(base_name):
+        for child in os.listdir(base_name):
+            candidate = os.path.join(base_name, child)
+            if os.path.isdir(candidate) and os.path.exists(os.path.join(candidate, "conf")):
+                return candidate
+    return None
+
+def resolve_model_path(lang):
+    """First candidate folder for lang that actually contains a model, or None."""
+    for base_path in MODEL_CANDIDATES.get(lang, []):
+        final_path = find_model_path(base_path)
+        if final_path:
+            return final_path
+    return None
+
+# --- Model registry ---
+# Models are loaded on first use (or when a focus mode asks for them), never at import,
+# so the app starts instantly. With a memory budget each language gets the largest variant
+# that fits its share of the budget, and idle models are unloaded least-recently-used first
+# when a new one needs the room (or after MODEL_IDLE_SEC without users).
+# Sessions acquire() a model for as long as they hold recognizers over it; only models
+# nobody holds can be unloaded.
+
+MODEL_BUDGET_MB = float(os.environ.get("SCRIBE_MODEL_BUDGET_MB", "0"))   # 0 = unlimited
+MODEL_IDLE_SEC = float(os.environ.get("SCRIBE_MODEL_IDLE_SEC", "0"))     # 0 = keep until evicted
+MODEL_PRELOAD = os.environ.get("SCRIBE_PRELOAD", "")                     # "all", "en,es" or "" (first use)
+
+def model_size_mb(path):
+    """On-disk size of a model folder - a good proxy for its resident size."""
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+class ModelRegistry:
+    def __init__(self, candidates=MODEL_CANDIDATES, budget_mb=MODEL_BUDGET_MB, idle_sec=MODEL_IDLE_SEC):
+        self.candidates = candidates
+        self.budget_mb = budget_mb
+        self.idle_sec = idle_sec
+        self.lock = threading.Lock()
+        self.load_locks = {}   # lang -> lock held while that model loads
+        self.paths = None      # lang -> chosen variant folder (resolved once)
+        self.sizes = {}        # path -> MB
+        self.loaded = {}       # lang -> {"model", "path", "mb", "refs", "last_used", "load_sec"}
+        self.reserved = {}     # lang -> MB set aside for a model that is loading right now
+        self.janitor = None
+        self.on_unload = []    # callbacks(lang) after a model is dropped (e.g. the recognizer pool)
+        self.loader = None     # path -> model; None = vosk.Model (benchmark.py swaps in a stub)
+        self.stats = {"loads": 0, "unloads": 0, "evictions": 0, "over_budget": 0}
+
+    # --- resolution ---
+    def _resolve(self):
+        found = {}
+        for lang, names in self.candidates.items():
+            paths = [p for p in (find_model_path(n) for n in names) if p]
+            if paths:
+                found[lang] = paths
+        chosen = {}
+        share = self.budget_mb / len(found) if self.budget_mb and found else None
+        for lang, paths in found.items():
+            if share is None:
+                chosen[lang] = paths[0] # Priority order: Large -> Small
+                continue
+            for path in paths:
+                self.sizes[path] = model_size_mb(path)
+            fitting = [p for p in paths if self.sizes[p] <= share]
+            chosen[lang] = fitting[0] if fitting else min(paths, key=self.sizes.get)
+        return chosen
+
+    def _paths(self):
+        with self.lock:
+            if self.paths is None:
+                self.paths = self._resolve()
+            return self.paths
+
+    def available(self):
+        """Languages that have a model on disk (loaded or not)."""
+        return list(self._paths().keys())
+
+    def path(self, lang):
+        return self._paths().get(lang)
+
+    def rescan(self):
+        with self.lock:
+            self.paths = None
+        return self.available()
+
+    # --- loading ---
+    def acquire(self, lang):
+        """The loaded vosk.Model for lang (loading it if needed). Pair with release()."""
+        path = self.path(lang)
+        if path is None:
+            raise KeyError(f"No model for {lang}")
+        with self.lock:
+            lock = self.load_locks.setdefault(lang, threading.Lock())
+        with lock:
+            with self.lock:
+                entry = self.loaded.get(lang)
+                if entry is not None:
+                    entry["refs"] += 1
+                    entry["last_used"] = time.monotonic()
+                    return entry["model"]
+            try:
+                model, mb, load_sec = self._load(lang, path)
+            except Exception:
+                with self.lock:
+                    self.reserved.pop(lang, None)
+                raise
+            with self.lock:
+                self.reserved.pop(lang, None)
+                self.loaded[lang] = {"model": model, "path": path, "mb": mb, "refs": 1,
+                                     "last_used": time.monotonic(), "load_sec": load_sec}
+        self._ensure_janitor()
+        return model
+
+    def release(self, lang):
+        with self.lock:
+            entry = self.loaded.get(lang)
+            if entry is not None and entry["refs"] > 0:
+                entry["refs"] -= 1
+                entry["last_used"] = time.monotonic()
+
+    def loaded_model(self, lang):
+        """The model for lang if it is loaded right now (no ref taken), else None."""
+        with self.lock:
+            entry = self.loaded.get(lang)
+            return entry["model"] if entry else None
+
+    def _notify_unload(self, langs):
+        for lang in langs:
+            for callback in self.on_unload:
+                callback(lang)
+
+    def _load(self, lang, path):
+        loader = self.loader
+        if loader is None:
+            import vosk
+            loader = vosk.Model
+        mb = self.sizes.get(path) or model_size_mb(path)
+        self.sizes[path] = mb
+        if self.budget_mb:
+            self._make_room(lang, mb)
+        t0 = time.perf_counter()
+        model = loader(path)
+        load_sec = time.perf_counter() - t0
+        with self.lock:
+            self.stats["loads"] += 1
+        print(f"✅ Loaded {lang} model from {path} ({mb:.0f} MB, {load_sec:.1f}s)")
+        return model, mb, load_sec
+
+    def _make_room(self, lang, mb):
+        # Evict idle models, least recently used first, until the new one fits.
+        # The room is reserved under the same lock, so two loads can't both count the same free MB.
+        evicted = []
+        with self.lock:
+            used = sum(e["mb"] for e in self.loaded.values()) + sum(self.reserved.values())
+            idle = sorted((e["last_used"], name) for name, e in self.loaded.items() if e["refs"] == 0)
+            for _, old in idle:
+                if used + mb <= self.budget_mb:
+                    break
+                used -= self.loaded.pop(old)["mb"]
+                evicted.append(old)
+                self.stats["evictions"] += 1
+                print(f"♻️ Evicted idle {old} model to stay within {self.budget_mb:.0f} MB")
+            if used + mb > self.budget_mb:
+                self.stats["over_budget"] += 1
+                print(f"⚠️ Model budget exceeded ({used + mb:.0f} / {self.budget_mb:.0f} MB): every loaded model is in use")
+            self.reserved[lang] = mb
+        self._notify_unload(evicted)
+
+    def unload_idle(self, older_than=None):
+        older_than = self.idle_sec if older_than is None else older_than
+        now = time.monotonic()
+        with self.lock:
+            stale = [lang for lang, e in self.loaded.items()
+                     if e["refs"] == 0 and now - e["last_used"] >= older_than]
+            for lang in stale:
+                del self.loaded[lang]
+                self.stats["unloads"] += 1
+        for lang in stale:
+            print(f"💤 Unloaded idle {lang} model")
+        self._notify_unload(stale)
+        return stale
+
+    def _ensure_janitor(self):
+        if self.idle_sec <= 0 or self.janitor is not None:
+            return
+        def run():
+            while True:
+                time.sleep(min(60.0, self.idle_sec))
+                self.unload_idle()
+        self.janitor = threading.Thread(target=run, name="model-janitor", daemon=True)
+        self.janitor.start()
+
+    def preload(self, langs=MODEL_PRELOAD, background=True, on_loaded=None):
+        """
+        Warm models up ahead of the first session ("all", "en,es" or a list).
+        on_loaded(lang, model) runs while the model is still held.
+        """
+        if isinstance(langs, str):
+            langs = self.available() if langs == "all" else [l for l in langs.split(",") if l]
+        langs = [l for l in langs if self.path(l)]
+
+        def run():
+            for lang in langs:
+                try:
+                    model = self.acquire(lang)
+                    try:
+                        if on_loaded is not None:
+                            on_loaded(lang, model)
+                    finally:
+                        self.release(lang)
+                except Exception as e:
+                    print(f"⚠️ Could not preload {lang}: {e}")
+        if background:
+            threading.Thread(target=run, name="model-preload", daemon=True).start()
+        else:
+            run()
+        return langs
+
+    def report(self):
+        with self.lock:
+            loaded = {lang: {"path": e["path"], "mb": round(e["mb"], 1), "refs": e["refs"],
+                             "idle_sec": round(time.monotonic() - e["last_used"], 1),
+                             "load_sec": round(e["load_sec"], 2)}
+                      for lang, e in self.loaded.items()}
+            return dict(self.stats, budget_mb=self.budget_mb or None, available=self.paths,
+                        loaded=loaded, loading_mb=round(sum(self.reserved.values()), 1), loaded_mb=round(sum(e["mb"] for e in self.loaded.values()), 1))
+
+# Singleton instance
+registry = ModelRegistry()
@@ -0,0 +1,168 @@
+import os, math, time, threading
+from metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # No preprocessing without NumPy: blocks go to the recognizers untouched
+
+# Input conditioning on the decode thread (the sound card callback only copies the buffer).
+# Per block, on a zero-copy int16 view of the queued bytes:
+#   1. polyphase resampling from the device rate to 16 kHz (only when the device can't do 16 kHz)
+#   2. DC offset removal (cheap sound cards sit a few hundred counts off zero)
+#   3. optional first-order high-pass against rumble / handling noise
+#   4. AGC: a quiet microphone is boosted towards TARGET_RMS (at most MAX_GAIN), without
+#      letting peaks clip. Gain drops at once and rises slowly, and only moves while there is
+#      signal, so pauses don't pump the noise floor up.
+# Everything is stateful across blocks, so block edges filter like the middle.
+
+TARGET_RATE = 16000
+PREPROCESS = os.environ.get("SCRIBE_PREPROCESS", "1") != "0"
+AGC_ENABLED = os.environ.get("SCRIBE_AGC", "1") != "0"
+HIGHPASS_HZ = float(os.environ.get("SCRIBE_HIGHPASS_HZ", "0"))   # e.g. 80; 0 = off
+TARGET_RMS = 3000.0      # int16 scale, about -21 dBFS
+MAX_GAIN = float(os.environ.get("SCRIBE_AGC_MAX_GAIN", "8"))
+AGC_GATE_RMS = 100.0     # blocks quieter than this don't move the gain
+AGC_RELEASE = 0.2        # fraction of the way to a higher gain per block
+PEAK_LIMIT = 0.9         # keep boosted peaks under this fraction of full scale
+DC_ADAPT = 0.1           # EMA weight of each block's mean in the DC estimate
+HP_SEGMENT = 256         # max samples per closed-form IIR segment
+
+PREPROCESS_SECONDS = metrics.histogram("scribe_preprocess_seconds", "Input conditioning time per block")
+
+class PolyphaseResampler:
+    """
+    Rational-ratio resampler (rate_in -> rate_out) with a Kaiser-windowed sinc lowpass,
+    evaluated one polyphase branch per output sample. Streams: the filter history and
+    the output phase are carried from block to block.
+    """
+    def __init__(self, rate_in, rate_out=TARGET_RATE, quality=32, beta=6.0):
+        g = math.gcd(int(rate_in), int(rate_out))
+        self.up, self.down = int(rate_out) // g, int(rate_in) // g
+        # Taps per branch grow with the decimation factor so the transition band stays narrow
+        self.taps = max(8, -(-quality * max(self.up, self.down) // self.up))
+        n = self.taps * self.up
+        fc = 0.5 / max(self.up, self.down) * 0.89  # cutoff, cycles per upsampled sample
+        t = np.arange(n) - (n - 1) / 2.0
+        h = 2 * fc * np.sinc(2 * fc * t) * np.kaiser(n, beta) * self.up
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32).copy()  # [phase][tap]
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.pos = 0  # next output, in upsampled samples from the start of the next block
+
+    def process(self, x):
+        n = len(x)
+        buf = np.concatenate((self.history, x))
+        us = np.arange(self.pos, n * self.up, self.down)
+        if len(us):
+            base = us // self.up + (self.taps - 1)
+            idx = base[:, None] - np.arange(self.taps)[None, :]
+            y = np.einsum("ij,ij->i", buf[idx], self.phases[us % self.up])
+            self.pos = int(us[-1]) + self.down - n * self.up
+        else:
+            y = np.zeros(0, dtype=np.float32)
+            self.pos -= n * self.up
+        self.history = buf[len(buf) - (self.taps - 1):]
+        return y
+
+class AudioPreprocessor:
+    def __init__(self, input_rate=TARGET_RATE, agc=AGC_ENABLED, highpass_hz=HIGHPASS_HZ):
+        self.input_rate = int(input_rate)
+        self.enabled = PREPROCESS and np is not None
+        self.agc = agc
+        self.highpass_hz = highpass_hz
+        self.resampler = None
+        if self.input_rate != TARGET_RATE:
+            if np is None:
+                raise RuntimeError(f"Recording at {self.input_rate} Hz needs NumPy for resampling")
+            self.resampler = PolyphaseResampler(self.input_rate)
+        self.gain = 1.0
+        self.dc = 0.0
+        self.hp_a = 0.0
+        self.hp_segment = HP_SEGMENT
+        if highpass_hz > 0:
+            rc = 1.0 / (2 * math.pi * highpass_hz)
+            self.hp_a = rc / (rc + 1.0 / TARGET_RATE)
+            # Short enough that a**-k stays below 1e4 (float64 keeps the rounding far below 1 count)
+            self.hp_segment = max(16, min(HP_SEGMENT, int(math.log(1e4) / -math.log(self.hp_a))))
+        self.hp_x = 0.0  # last input / output sample of the high-pass
+        self.hp_y = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"blocks": 0, "total_sec": 0.0, "max_sec": 0.0, "last_sec": 0.0, "clipped": 0}
+
+    def process(self, data):
+        """int16 PCM bytes at input_rate -> int16 PCM bytes at 16 kHz."""
+        if self.resampler is None and not self.enabled:
+            return data
+        t0 = time.perf_counter()
+        x = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        if self.resampler is not None:
+            x = self.resampler.process(x)
+        if self.enabled and len(x):
+            x = self._remove_dc(x)
+            if self.hp_a:
+                x = self._highpass(x)
+            if self.agc:
+                x = self._agc(x)
+        clipped = int(np.count_nonzero(np.abs(x) > 32767))
+        out = np.clip(np.rint(x), -32768, 32767).astype(np.int16).tobytes()
+
+        elapsed = time.perf_counter() - t0
+        PREPROCESS_SECONDS.observe(elapsed)
+        with self.lock:
+            s = self.stats
+            s["blocks"] += 1
+            s["total_sec"] += elapsed
+            s["last_sec"] = elapsed
+            s["max_sec"] = max(s["max_sec"], elapsed)
+            s["clipped"] += clipped
+        return out
+
+    def _remove_dc(self, x):
+        self.dc += DC_ADAPT * (float(x.mean()) - self.dc)
+        return x - self.dc
+
+    def _highpass(self, x):
+        # y[n] = a * (y[n-1] + x[n] - x[n-1]), solved in closed form per segment:
+        # y[i] = a^(i+1) * (y[-1] + sum_{k<=i} a^-k * d[k])
+        a = self.hp_a
+        out = np.empty(len(x), dtype=np.float32)
+        prev_x, prev_y = self.hp_x, self.hp_y
+        step = self.hp_segment
+        for start in range(0, len(x), step):
+            seg = x[start:start + step].astype(np.float64)
+            d = np.diff(seg, prepend=prev_x)
+            k = np.arange(len(seg))
+            y = a ** (k + 1) * (prev_y + np.cumsum(d * a ** -k))
+            out[start:start + len(seg)] = y
+            prev_x, prev_y = float(seg[-1]), float(y[-1])
+        self.hp_x, self.hp_y = prev_x, prev_y
+        return out
+
+    def _agc(self, x):
+        rms = float(np.sqrt(np.mean(x * x)))
+        peak = float(np.max(np.abs(x)))
+        target = self.gain
+        if rms > AGC_GATE_RMS:
+            target = min(MAX_GAIN, max(1.0, TARGET_RMS / rms))
+        if peak > 0:
+            target = min(target, max(1.0, PEAK_LIMIT * 32767 / peak))
+        if target < self.gain:
+            # Attack: drop at once, so this block's peaks are already safe
+            self.gain = target
+            return x * target
+        new_gain = self.gain + AGC_RELEASE * (target - self.gain)
+        ramp = np.linspace(self.gain, new_gain, len(x), dtype=np.float32)
+        self.gain = new_gain
+        return x * ramp
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+        blocks = s["blocks"]
+        return {"enabled": self.enabled, "input_rate": self.input_rate,
+                "resampling": self.resampler is not None, "agc": self.enabled and self.agc,
+                "highpass_hz": self.highpass_hz if self.enabled and self.hp_a else 0,
+                "gain": round(self.gain, 2), "gain_db": round(20 * math.log10(self.gain), 1),
+                "dc_offset": round(self.dc, 1), "blocks": blocks, "clipped_samples": s["clipped"],
+                "avg_ms": round(s["total_sec"] / blocks * 1000, 3) if blocks else 0.0,
+                "max_ms": round(s["max_sec"] * 1000, 3), "last_ms": round(s["last_sec"] * 1000, 3)}
@@ -0,0 +1,101 @@
+import os, sys, time, threading
+from collections import Counter
+
+# Sampling profiler for a running server (opt-in: SCRIBE_PROFILER=1).
+# A background thread looks at every thread's current stack HZ times a second
+# (sys._current_frames, no tracing hooks), so the cost is the same whatever the code does.
+# Results come out as a top-N table, or as collapsed stacks ("thread;outer;...;inner count")
+# for flamegraph.pl / speedscope.
+
+PROFILER_ENABLED = os.environ.get("SCRIBE_PROFILER", "0") == "1"
+DEFAULT_HZ = 100
+MAX_HZ = 1000
+MAX_SECONDS = 600.0   # a forgotten profiler stops by itself
+MAX_DEPTH = 64
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.stacks = Counter()  # (thread_name, frame, frame, ...) outermost first
+        self.samples = 0
+        self.hz = DEFAULT_HZ
+        self.started = None
+        self.stopped = None
+
+    def start(self, hz=DEFAULT_HZ, seconds=MAX_SECONDS):
+        with self.lock:
+            if self.running:
+                return False
+            self.hz = max(1, min(int(hz), MAX_HZ))
+            self.stacks = Counter()
+            self.samples = 0
+            self.started, self.stopped = time.time(), None
+            self.running = True
+            self.thread = threading.Thread(target=self._run, args=(min(float(seconds), MAX_SECONDS),),
+                                           name="profiler", daemon=True)
+            self.thread.start()
+        print(f"🔬 Profiler sampling at {self.hz} Hz")
+        return True
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return False
+            self.running = False
+        self.thread.join()
+        print(f"🔬 Profiler stopped after {self.samples} samples")
+        return True
+
+    def _run(self, seconds):
+        me = threading.get_ident()
+        interval = 1.0 / self.hz
+        deadline = time.monotonic() + seconds
+        while self.running and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sample = Counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                sample[(names.get(ident, str(ident)),) + tuple(reversed(stack))] += 1
+            with self.lock:
+                self.stacks.update(sample)
+                self.samples += 1
+            time.sleep(interval)
+        with self.lock:
+            self.running = False
+            self.stopped = time.time()
+
+    def collapsed(self):
+        with self.lock:
+            stacks = dict(self.stacks)
+        return "".join(f"{';'.join(s).replace(' ', '_')} {n}\n" for s, n in sorted(stacks.items()))
+
+    def report(self, limit=30, thread=None):
+        """Top functions by self time (leaf) and total time (anywhere on the stack), in samples."""
+        with self.lock:
+            stacks = dict(self.stacks)
+            status = {"running": self.running, "hz": self.hz, "samples": self.samples,
+                      "started": self.started, "stopped": self.stopped}
+        own, total, threads = Counter(), Counter(), Counter()
+        for stack, n in stacks.items():
+            if thread and not stack[0].startswith(thread):
+                continue
+            threads[stack[0]] += n
+            if len(stack) > 1:
+                own[stack[-1]] += n
+            for name in set(stack[1:]):
+                total[name] += n
+        top = lambda c: [{"function": f, "samples": n} for f, n in c.most_common(limit)]
+        return dict(status, threads=dict(threads), self=top(own), total=top(total))
+
+# Singleton instance
+profiler = SamplingProfiler()
@@ -0,0 +1,164 @@
+import os, json, time, threading
+from models import MODEL_PRELOAD, registry
+from vocab_index import vocab
+
+# Pre-built KaldiRecognizers, shared by all sessions.
+# Building a recognizer costs a few ms to a few hundred ms (more for grammar variants, which
+# compile their grammar into a small graph), so sessions check one out when a language joins
+# their decode pool and check it back in when they close or switch grammar. Checked-in
+# recognizers are Reset() and parked, up to POOL_SIZE per (language, grammar).
+# Vosk keeps counting word times from when a recognizer was built (Reset() doesn't rewind
+# them), so every recognizer travels with its "age" - the audio seconds it has consumed -
+# and the decode pool starts its clock from there.
+#
+# Grammar variants ("hunter", "learning") only know the drill words plus [unk], so they
+# decode much faster and can't hallucinate near-misses. They need a model with a dynamic
+# graph (the small vosk models); big models log a warning and decode with the full graph.
+# Keyword spotters (keyword_spotter.py) use the same mechanism with "keywords:<w1>|<w2>"
+# grammars that hold just their target words.
+
+POOL_SIZE = int(os.environ.get("SCRIBE_REC_POOL_SIZE", "4"))   # idle recognizers kept per (lang, grammar)
+WARM_COUNT = int(os.environ.get("SCRIBE_REC_WARM", "1"))       # built as soon as a model is loaded
+WARM_SEC = 0.1  # silence fed to new recognizers so the first real block doesn't pay for lazy init
+
+# Tough words for the hunter drill (the target picker uses them too)
+HUNTER_WORDS = ["algorithm", "heuristic", "neural", "latency", "recursion", "compile", "syntax", "variable", "function", "array"]
+GRAMMARS = ("hunter", "learning")
+KEYWORDS_PREFIX = "keywords:"
+
+def keywords_grammar(words):
+    """Grammar name for a keyword spotter: "keywords:algorithm|neural"."""
+    return KEYWORDS_PREFIX + "|".join(sorted(set(words)))
+
+def grammar_family(name):
+    # Every keyword list is its own grammar, but they share one family in the idle pool
+    return KEYWORDS_PREFIX if name and name.startswith(KEYWORDS_PREFIX) else name
+
+def grammar_phrases(name):
+    """Sorted phrase list for a drill grammar, from the current validated words."""
+    if name and name.startswith(KEYWORDS_PREFIX):
+        return sorted(set(w.lower() for w in name[len(KEYWORDS_PREFIX):].split("|") if w.strip()))
+    if name not in GRAMMARS:
+        raise ValueError(f"Unknown grammar: {name} (use one of {', '.join(GRAMMARS)})")
+    words = vocab.all_words()
+    if name == "hunter":
+        words += HUNTER_WORDS
+    return sorted(set(w.lower() for w in words if w.strip()))
+
+class RecognizerPool:
+    def __init__(self, size=POOL_SIZE, warm=WARM_COUNT):
+        self.size = size
+        self.warm_count = warm
+        self.lock = threading.Lock()
+        self.idle = {}    # (lang, grammar, digest) -> [(rec, age_sec, model)]
+        self.factory = None  # (model, rate[, grammar]) -> recognizer; None = vosk.KaldiRecognizer
+        self.stats = {"checkouts": 0, "hits": 0, "builds": 0, "build_sec": 0.0,
+                      "checkins": 0, "discarded": 0, "warmed": 0}
+        registry.on_unload.append(self.drop)
+
+    def key(self, lang, grammar):
+        """(pool key, grammar JSON or None). The key changes whenever the word list does."""
+        if grammar is None:
+            return (lang, None, None), None
+        phrases = grammar_phrases(grammar)
+        grammar_json = json.dumps(phrases + ["[unk]"], ensure_ascii=False)
+        return (lang, grammar, hash(grammar_json)), grammar_json
+
+    def _build(self, model, grammar_json=None):
+        factory = self.factory
+        if factory is None:
+            import vosk
+            factory = vosk.KaldiRecognizer
+        t0 = time.perf_counter()
+        if grammar_json is None:
+            rec = factory(model, 16000)
+        else:
+            rec = factory(model, 16000, grammar_json)
+        rec.SetWords(True)
+        if hasattr(rec, "SetPartialWords"):
+            rec.SetPartialWords(True) # conf on partials for the early-exit pre-pass
+        rec.AcceptWaveform(b"\0\0" * int(16000 * WARM_SEC))
+        rec.Reset()
+        with self.lock:
+            self.stats["builds"] += 1
+            self.stats["build_sec"] += time.perf_counter() - t0
+        return rec, WARM_SEC
+
+    def checkout(self, lang, grammar=None):
+        """
+        (rec, age_sec, key) for lang, reusing an idle recognizer when there is one.
+        Holds the model in the registry until checkin(). Raises KeyError / ValueError.
+        """
+        key, grammar_json = self.key(lang, grammar)
+        model = registry.acquire(lang)
+        try:
+            with self.lock:
+                self.stats["checkouts"] += 1
+                parked = self.idle.get(key, [])
+                while parked:
+                    rec, age, rec_model = parked.pop()
+                    if rec_model is model: # not from a model that has since been reloaded
+                        self.stats["hits"] += 1
+                        return rec, age, key
+                    self.stats["discarded"] += 1
+            rec, age = self._build(model, grammar_json)
+            return rec, age, key
+        except Exception:
+            registry.release(lang)
+            raise
+
+    def checkin(self, key, rec, age):
+        """Reset rec and park it for the next session (or drop it if the pool is full)."""
+        lang, grammar, _ = key
+        try:
+            rec.Reset()
+            model = registry.loaded_model(lang)
+            with self.lock:
+                self.stats["checkins"] += 1
+                # Grammar recognizers built from an older word list are never handed out again
+                # (nor other keyword lists: hunter targets change all the time)
+                family = grammar_family(grammar)
+                for stale in [k for k in self.idle if k[0] == lang and grammar_family(k[1]) == family and k != key]:
+                    self.stats["discarded"] += len(self.idle.pop(stale))
+                parked = self.idle.setdefault(key, [])
+                if model is not None and len(parked) < self.size:
+                    parked.append((rec, age, model))
+                else:
+                    self.stats["discarded"] += 1
+        finally:
+            registry.release(lang)
+
+    def warm(self, lang, model):
+        """Fill the plain (no grammar) pool for lang up to warm_count. model must be held."""
+        key = (lang, None, None)
+        with self.lock:
+            missing = min(self.warm_count, self.size) - len(self.idle.get(key, []))
+        for _ in range(max(0, missing)):
+            rec, age = self._build(model)
+            with self.lock:
+                self.idle.setdefault(key, []).append((rec, age, model))
+                self.stats["warmed"] += 1
+
+    def preload(self, langs=MODEL_PRELOAD, background=True):
+        """Load models (see ModelRegistry.preload) and pre-build warm_count recognizers each."""
+        return registry.preload(langs, background, on_loaded=self.warm if self.warm_count else None)
+
+    def drop(self, lang):
+        # The registry unloaded lang: let its recognizers go too, so the memory is really freed
+        with self.lock:
+            for key in [k for k in self.idle if k[0] == lang]:
+                self.stats["discarded"] += len(self.idle.pop(key))
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+            idle = {}
+            for (lang, grammar, _), parked in self.idle.items():
+                name = f"{lang}:{grammar_family(grammar).rstrip(':')}" if grammar else lang
+                idle[name] = idle.get(name, 0) + len(parked)
+        s["build_ms_avg"] = round(s.pop("build_sec") / s["builds"] * 1000, 1) if s["builds"] else 0.0
+        s["hit_ratio"] = round(s["hits"] / s["checkouts"], 3) if s["checkouts"] else 0.0
+        return dict(s, size=self.size, warm=self.warm_count, idle=idle)
+
+# Singleton instance
+recognizers = RecognizerPool()
@@ -0,0 +1,715 @@
+import os, re, json, time, queue, random, sqlite3, threading
+from collections import Counter
+from contextlib import contextmanager
+from db_writer import open_wal_connection
+from vocab_index import vocab
+
+# Schema + the transcript write path, shared by the live transcriber and the batch engine.
+
+DB_FILE = os.environ.get("SCRIBE_DB", "transcriptions.db")
+UNKNOWN_SAMPLES = 5  # sample contexts kept per unknown word (a uniform reservoir over all sightings)
+
+def _add_columns(conn, table, columns):
+    # Tiny migration helper: CREATE TABLE IF NOT EXISTS won't touch existing databases
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, col_type in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+def _migrate_unknown_words(conn):
+    # Older databases: one row per sighting (or first sighting only) -> one aggregated row per word
+    rows = conn.execute("SELECT id, word, detected_lang, context, confidence, timestamp FROM unknown_words "
+                        "WHERE samples IS NULL ORDER BY id").fetchall()
+    if not rows:
+        return
+    groups = {}
+    for row in rows:
+        groups.setdefault((row[1], row[2]), []).append(row)
+    updates, extra = [], []
+    for members in groups.values():
+        confs = [m[4] for m in members if m[4] is not None]
+        samples = []
+        for m in members:
+            if m[3] and m[3] not in samples and len(samples) < UNKNOWN_SAMPLES:
+                samples.append(m[3])
+        updates.append((len(members), min(confs) if confs else None, sum(confs) if confs else None,
+                        members[-1][5], json.dumps(samples, ensure_ascii=False), members[0][0]))
+        extra += [(m[0],) for m in members[1:]]
+    with conn:
+        conn.executemany("UPDATE unknown_words SET occurrences=?, min_conf=?, conf_sum=?, last_seen=?, samples=? "
+                         "WHERE id=?", updates)
+        conn.executemany("DELETE FROM unknown_words WHERE id=?", extra)
+    print(f"🗂️ Aggregated {len(rows)} unknown word rows into {len(groups)}")
+
+def init_db(db_file=DB_FILE):
+    # WAL: dashboard reads don't block the writer thread (and vice versa)
+    conn = open_wal_connection(db_file)
+    # Transcripts Table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transcripts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            language TEXT,
+            text TEXT,
+            audio_file TEXT
+        )
+    """)
+    # Word timings (JSON [{word, start, end, conf}]) + segment span, in seconds
+    # from the start of the recording session / source file
+    _add_columns(conn, "transcripts", [("words", "TEXT"), ("start_sec", "REAL"), ("end_sec", "REAL")])
+    # Utterance clip inside audio_file: byte range of the PCM + where it starts on the timeline
+    _add_columns(conn, "transcripts", [("audio_offset", "INTEGER"), ("audio_length", "INTEGER"),
+                                       ("audio_start_sec", "REAL")])
+    # Mean word confidence of the segment (NULL for rows written before it existed)
+    _add_columns(conn, "transcripts", [("confidence", "REAL")])
+    # Live stream the row came from (NULL for batch jobs / older rows)
+    _add_columns(conn, "transcripts", [("session", "TEXT")])
+    # Query paths: newest-first per language, date ranges, confidence filters
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_lang_id ON transcripts (language, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_timestamp ON transcripts (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_confidence ON transcripts (confidence)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_session_id ON transcripts (session, id)")
+    _init_fts(conn)
+    # Unknown Words Table - Feature 3
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS unknown_words (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT,
+            context TEXT,
+            detected_lang TEXT,
+            confidence REAL,
+            status TEXT DEFAULT 'new', 
+            translation TEXT,
+            timestamp TEXT
+        )
+    """)
+    # One row per (word, language), aggregated over every sighting: context / confidence /
+    # timestamp are the first one, the rest is kept up to date by the DB writer
+    _add_columns(conn, "unknown_words", [("occurrences", "INTEGER DEFAULT 1"), ("min_conf", "REAL"),
+                                         ("conf_sum", "REAL"), ("last_seen", "TEXT"), ("samples", "TEXT")])
+    _migrate_unknown_words(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unknown_words_word_lang ON unknown_words (word, detected_lang)")
+    # Ranked pages: most frequent first, per status / language
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unknown_words_rank ON unknown_words (occurrences DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unknown_words_status_rank ON unknown_words (status, occurrences DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unknown_words_lang_rank "
+                 "ON unknown_words (detected_lang, status, occurrences DESC, id DESC)")
+    # Vocabulary Table - Feature 5
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT UNIQUE,
+            language TEXT,
+            added_on TEXT
+        )
+    """)
+    # Validated Words Table - Incremental Learning
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS validated_words (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT UNIQUE,
+            category TEXT,
+            frequency_count INTEGER DEFAULT 1
+        )
+    """)
+    # Feature 4: Keyword Hunter Context Samples
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_word TEXT,
+            full_sentence TEXT,
+            timestamp TEXT
+        )
+    """)
+    # Offline batch jobs: one row per job, one row per file (= resumable checkpoint)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created TEXT,
+            status TEXT DEFAULT 'pending',
+            languages TEXT,
+            total_files INTEGER DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS batch_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER,
+            path TEXT,
+            status TEXT DEFAULT 'pending',
+            progress_sec REAL DEFAULT 0,
+            duration_sec REAL,
+            segments INTEGER DEFAULT 0,
+            error TEXT,
+            updated TEXT,
+            UNIQUE(job_id, path)
+        )
+    """)
+    # Dictionary translations of transcripts (translator.py), one row per target language.
+    # version: dictionary the row was made with, so the backfill redoes rows after an update
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transcript_translations (
+            transcript_id INTEGER,
+            language TEXT,
+            text TEXT,
+            version TEXT,
+            PRIMARY KEY (transcript_id, language)
+        )
+    """)
+    conn.commit()
+    return conn
+
+FTS_ENABLED = False
+
+def _init_fts(conn):
+    """
+    Full-text index over transcripts.text (external content: the text is stored once,
+    the triggers keep the index in step with every insert/update/delete).
+    Falls back to LIKE search if this SQLite build has no FTS5.
+    """
+    global FTS_ENABLED
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='transcripts_fts'").fetchone()
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+                text, content='transcripts', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ FTS5 not available, transcript search falls back to LIKE: {e}")
+        FTS_ENABLED = False
+        return
+    conn.executescript("""
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_ai AFTER INSERT ON transcripts BEGIN
+            INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_ad AFTER DELETE ON transcripts BEGIN
+            INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_au AFTER UPDATE OF text ON transcripts BEGIN
+            INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+    """)
+    if not exists:
+        # First run on an existing database: index the rows we already have
+        conn.execute("INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')")
+        print("🔎 Built full-text index for existing transcripts")
+    FTS_ENABLED = True
+
+# --- Connection pool ---
+# Long-lived connections instead of sqlite3.connect() per request: the pragmas are set
+# once and each connection's statement cache actually gets reused.
+# Readers and writers are pooled separately. With WAL, readers never wait for the decoder's
+# writer thread (or for each other), and the short writes from HTTP routes queue up on
+# busy_timeout instead of failing.
+
+READ_POOL_SIZE = 8
+WRITE_POOL_SIZE = 2
+POOL_WAIT = 2.0     # seconds to wait for a free connection before opening a temporary one
+
+class ConnectionPool:
+    def __init__(self, db_file=DB_FILE, readers=READ_POOL_SIZE, writers=WRITE_POOL_SIZE):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.idle = {True: queue.LifoQueue(), False: queue.LifoQueue()}  # readonly -> idle conns
+        self.limit = {True: readers, False: writers}
+        self.opened = {True: 0, False: 0}
+        self.stats = {"reads": 0, "writes": 0, "overflow": 0, "rollbacks": 0}
+
+    def _acquire(self, readonly):
+        idle = self.idle[readonly]
+        try:
+            return idle.get_nowait(), False
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened[readonly] < self.limit[readonly]:
+                self.opened[readonly] += 1
+                return open_wal_connection(self.db_file, readonly), False
+        try:
+            return idle.get(timeout=POOL_WAIT), False
+        except queue.Empty:
+            # Everyone is busy (e.g. long exports): don't stall the request, use a throwaway
+            with self.lock:
+                self.stats["overflow"] += 1
+            return open_wal_connection(self.db_file, readonly), True
+
+    def _release(self, conn, readonly, temporary):
+        if temporary:
+            conn.close()
+        else:
+            self.idle[readonly].put(conn)
+
+    @contextmanager
+    def read(self):
+        conn, temporary = self._acquire(True)
+        with self.lock:
+            self.stats["reads"] += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback() # don't keep an old WAL snapshot open in the pool
+            self._release(conn, True, temporary)
+
+    @contextmanager
+    def write(self):
+        """One transaction: committed when the block exits, rolled back on error."""
+        conn, temporary = self._acquire(False)
+        with self.lock:
+            self.stats["writes"] += 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            with self.lock:
+                self.stats["rollbacks"] += 1
+            raise
+        finally:
+            self._release(conn, False, temporary)
+
+    def close(self):
+        for idle in self.idle.values():
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        with self.lock:
+            self.opened = {True: 0, False: 0}
+
+    def report(self):
+        with self.lock:
+            return dict(self.stats, readers_open=self.opened[True], writers_open=self.opened[False],
+                        readers_idle=self.idle[True].qsize(), writers_idle=self.idle[False].qsize())
+
+# Singleton instance (the live app; the batch CLI and the DB writer open their own)
+pool = ConnectionPool()
+
+def validated_word_hits(text):
+    """
+    Count validated words in text (case-insensitive exact match, O(1) per word).
+    Returns {validated_word: hits}.
+    """
+    # (Could use loose matching but let's be strict for mastery tracking)
+    hits = Counter()
+    for w in text.lower().split():
+        for val_word in vocab.canonical(w):
+            hits[val_word] += 1
+    return hits
+
+def fuzzy_fix_text(text):
+    """
+    Scan text for words similar to validated_words (85% match) 
+    and replace them.
+    """
+    if not len(vocab):
+        return text
+
+    words = text.split()
+    fixed_words = []
+    
+    for w in words:
+        # Check against validated index (same result as difflib cutoff=0.85, n=1)
+        match = vocab.close_match(w)
+        if match:
+            if match != w:
+                print(f"✨ Fuzzy Fix: Replaced '{w}' with '{match}'")
+            fixed_words.append(match)
+        else:
+            fixed_words.append(w)
+            
+    return " ".join(fixed_words)
+
+def word_timings(words, offset=0.0):
+    """Vosk word results -> [{word, start, end, conf}] shifted by offset seconds."""
+    return [
+        {"word": w["word"], "start": round(w.get("start", 0.0) + offset, 3),
+         "end": round(w.get("end", 0.0) + offset, 3), "conf": round(w.get("conf", 1.0), 3)}
+        for w in words
+    ]
+
+TRANSCRIPT_COLUMNS = ("timestamp", "language", "text", "audio_file", "words", "start_sec", "end_sec",
+                      "audio_offset", "audio_length", "audio_start_sec", "confidence", "session")
+
+def transcript_row(text, lang, ts=None, **fields):
+    """Writer payload for one transcripts row (unknown keys are rejected)."""
+    row = {"timestamp": ts or time.strftime("%Y-%m-%d %H:%M:%S"), "language": lang, "text": text}
+    for key, value in fields.items():
+        if key not in TRANSCRIPT_COLUMNS:
+            raise KeyError(f"Unknown transcripts column: {key}")
+        row[key] = value
+    return row
+
+def segment_span(winner):
+    """(start_sec, end_sec) of a winner on the session / file timeline, or (None, None)."""
+    words = winner["json"].get("result", [])
+    if not words:
+        return None, None
+    offset = winner.get("offset", 0.0)
+    return words[0].get("start", 0.0) + offset, words[-1].get("end", 0.0) + offset
+
+def winner_items(winner, audio_path=None, ts=None, clip=None, session=None):
+    """
+    Turn a scored winner into writer items: the (fuzzy-fixed) transcript plus its
+    low-confidence words. winner["offset"] (optional) shifts recognizer word times
+    onto the session / file timeline. clip = (path, offset, length, start_sec) from
+    the ClipRecorder, if the utterance audio was stored.
+    """
+    ts = ts or time.strftime("%Y-%m-%d %H:%M:%S")
+    words = word_timings(winner["json"].get("result", []), winner.get("offset", 0.0))
+    fields = {"audio_file": audio_path,
+              "words": json.dumps(words, ensure_ascii=False) if words else None,
+              "start_sec": words[0]["start"] if words else None,
+              "end_sec": words[-1]["end"] if words else None,
+              "confidence": round(sum(w["conf"] for w in words) / len(words), 3) if words else None}
+    if session:
+        fields["session"] = session
+    if clip:
+        fields.update(audio_file=clip[0], audio_offset=clip[1], audio_length=clip[2], audio_start_sec=clip[3])
+    # Apply Fuzzy Auto-Correction here (cached index, cheap) so the text pushed to
+    # live clients is exactly the text that lands in the database
+    items = [("transcript", transcript_row(fuzzy_fix_text(winner["text"]), winner["lang"], ts, **fields))]
+    for w_obj in winner["json"].get("result", []):
+        word = w_obj["word"]
+        conf = w_obj.get("conf", 1.0)
+        if word == "[unk]":
+            continue # out-of-grammar speech in a drill session, not a word to learn
+        if conf < 0.6 or word == "<unk>":
+            # For unknown words, we pass the winner details
+            items.append(("unknown", word, winner["text"], winner["lang"], conf, ts))
+    return items
+
+def _apply_item(db, item, freq, unknowns, events):
+    kind = item[0]
+    if kind == "transcript":
+        row = item[1]
+        # (text was already fuzzy-fixed by the producer)
+        # Update Mastery stats (summed, written once per batch)
+        freq.update(validated_word_hits(row["text"]))
+
+        columns = [c for c in TRANSCRIPT_COLUMNS if c in row]
+        db.execute(
+            f"INSERT INTO transcripts ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [row[c] for c in columns]
+        )
+    elif kind == "unknown":
+        # Aggregated per batch, written once at the end (_upsert_unknown_words)
+        unknowns.append(item[1:])
+    elif kind == "context_sample":
+        # A keyword spotter hit (Hunter) with the sentence it was heard in
+        _, word, sentence, ts = item
+        db.execute("INSERT INTO context_samples (target_word, full_sentence, timestamp) VALUES (?, ?, ?)",
+                   (word, sentence, ts))
+        freq[word] += 1
+        events.append(("context_sample", {"word": word, "text": sentence, "timestamp": ts}))
+    elif kind == "batch_file":
+        # A whole offline file: its segments and its 'done' checkpoint commit together,
+        # so a resumed job never duplicates or loses a file.
+        _, job_id, path, duration_sec, sub_items = item
+        for sub in sub_items:
+            _apply_item(db, sub, freq, unknowns, events)
+        segments = sum(1 for sub in sub_items if sub[0] == "transcript")
+        db.execute(
+            "UPDATE batch_files SET status='done', progress_sec=?, duration_sec=?, segments=?, error=NULL, updated=? "
+            "WHERE job_id=? AND path=?",
+            (duration_sec, duration_sec, segments, time.strftime("%Y-%m-%d %H:%M:%S"), job_id, path)
+        )
+    else:
+        raise ValueError(f"Unknown write item: {kind}")
+
+UNKNOWN_UPSERT = """
+    INSERT INTO unknown_words (word, context, detected_lang, confidence, timestamp,
+                               occurrences, min_conf, conf_sum, last_seen, samples)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (word, detected_lang) DO UPDATE SET
+        occurrences = occurrences + excluded.occurrences,
+        min_conf = min(coalesce(min_conf, excluded.min_conf), excluded.min_conf),
+        conf_sum = coalesce(conf_sum, 0) + excluded.conf_sum,
+        last_seen = max(coalesce(last_seen, ''), excluded.last_seen),
+        samples = excluded.samples
+"""
+
+def _upsert_unknown_words(db, unknowns, events):
+    """
+    unknowns: [(word, context, lang, confidence, ts)] from one writer batch.
+    One read of the words' current counts / samples, then one upsert per distinct (word, lang)
+    however often it came up; the sample contexts are a reservoir (every sighting has the
+    same chance of being kept).
+    """
+    groups = {}
+    for word, context, lang, confidence, ts in unknowns:
+        groups.setdefault((word, lang), []).append((context, confidence, ts))
+    words = sorted({word for word, _ in groups})
+    existing = {}
+    for i in range(0, len(words), 500): # stay under SQLite's variable limit
+        chunk = words[i:i + 500]
+        rows = db.execute("SELECT word, detected_lang, occurrences, samples FROM unknown_words "
+                          f"WHERE word IN ({','.join('?' * len(chunk))})", chunk)
+        existing.update(((r[0], r[1]), (r[2] or 0, r[3])) for r in rows)
+
+    params = []
+    for (word, lang), sightings in groups.items():
+        seen, samples = existing.get((word, lang), (0, None))
+        samples = json.loads(samples) if samples else []
+        for context, _, _ in sightings:
+            seen += 1
+            if not context or context in samples:
+                continue
+            if len(samples) < UNKNOWN_SAMPLES:
+                samples.append(context)
+            else:
+                slot = random.randrange(seen)
+                if slot < UNKNOWN_SAMPLES:
+                    samples[slot] = context
+        confs = [c for _, c, _ in sightings]
+        first_context, first_conf, first_ts = sightings[0]
+        params.append((word, first_context, lang, first_conf, first_ts, len(sightings), min(confs), sum(confs),
+                       max(ts for _, _, ts in sightings), json.dumps(samples, ensure_ascii=False)))
+        if (word, lang) not in existing:
+            print(f"❓ Saved unknown/low-conf word: '{word}' ({lang})")
+            events.append(("unknown_word", {"word": word, "context": first_context, "lang": lang,
+                                            "conf": first_conf, "status": "new", "timestamp": first_ts,
+                                            "occurrences": len(sightings)}))
+    db.executemany(UNKNOWN_UPSERT, params)
+
+def apply_write_batch(db, items):
+    """
+    Runs on the DB writer thread; everything here lands in ONE transaction.
+    Returns the (kind, data) events to publish once the transaction has committed.
+    """
+    # Picks up words validator.py added from another process
+    vocab.refresh_if_stale(db)
+    freq = Counter()
+    unknowns = []
+    events = []
+    for item in items:
+        _apply_item(db, item, freq, unknowns, events)
+    if unknowns:
+        _upsert_unknown_words(db, unknowns, events)
+
+    if freq:
+        db.executemany("UPDATE validated_words SET frequency_count = frequency_count + ? WHERE word = ?",
+                       [(n, w) for w, n in freq.items()])
+    return events
+
+# --- Transcript queries (dashboard, search API, exports) ---
+# Keyset pagination: pages are "rows with id < cursor", newest first, so page 1000 costs
+# the same as page 1 (no OFFSET scan) and rows arriving meanwhile don't shift the pages.
+
+QUERY_COLUMNS = ("id", "timestamp", "language", "text", "audio_file", "words", "start_sec", "end_sec",
+                 "audio_offset", "audio_length", "audio_start_sec", "confidence", "session")
+MAX_PAGE_SIZE = 500
+_FTS_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+
+def fts_query(q):
+    """
+    User input -> safe FTS5 MATCH expression: "quoted text" stays a phrase, every other
+    word must appear, a trailing * means prefix ("algo*"). Operators are not exposed.
+    """
+    terms = []
+    for phrase, word in _FTS_TOKEN.findall(q or ""):
+        text = (phrase or word).replace('"', "")
+        prefix = bool(word) and text.endswith("*")
+        text = text.rstrip("*").strip()
+        if text:
+            terms.append(f'"{text}"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+def like_escape(text):
+    """Literal text for a LIKE pattern (with ESCAPE '\\'): "50%" must not match "500"."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _day_bound(value, end=False):
+    # "2024-05-01" as an upper bound means the whole day
+    if value and len(value) == 10 and end:
+        return value + " 23:59:59"
+    return value
+
+def transcript_dict(row):
+    item = dict(zip(QUERY_COLUMNS, row))
+    item["words"] = json.loads(item["words"]) if item["words"] else []
+    return item
+
+def query_transcripts(conn, q=None, lang=None, since=None, until=None, min_conf=None, max_conf=None,
+                      audio_file=None, session=None, before_id=None, after_id=None, oldest_first=False, limit=50):
+    """
+    One page of transcripts, newest first (or oldest first). Returns (items, next_cursor);
+    pass next_cursor back as before_id (after_id when oldest_first) for the next page
+    (None = no more rows).
+    """
+    limit = max(1, min(int(limit or 50), MAX_PAGE_SIZE))
+    where, params = [], []
+    cols = ", ".join(f"t.{c}" for c in QUERY_COLUMNS)
+    if q and q.strip():
+        if FTS_ENABLED:
+            match = fts_query(q)
+            if not match:
+                return [], None
+            sql = f"SELECT {cols} FROM transcripts_fts f JOIN transcripts t ON t.id = f.rowid"
+            where.append("transcripts_fts MATCH ?")
+            params.append(match)
+        else:
+            sql = f"SELECT {cols} FROM transcripts t"
+            for phrase, word in _FTS_TOKEN.findall(q):
+                where.append("t.text LIKE ? ESCAPE '\\'")
+                params.append(f"%{like_escape((phrase or word).rstrip('*'))}%")
+    else:
+        sql = f"SELECT {cols} FROM transcripts t"
+
+    if lang and lang != "all":
+        where.append("t.language = ?")
+        params.append(lang)
+    if since:
+        where.append("t.timestamp >= ?")
+        params.append(_day_bound(since))
+    if until:
+        where.append("t.timestamp <= ?")
+        params.append(_day_bound(until, end=True))
+    if min_conf is not None:
+        where.append("t.confidence >= ?")
+        params.append(float(min_conf))
+    if max_conf is not None:
+        where.append("t.confidence <= ?")
+        params.append(float(max_conf))
+    if audio_file:
+        where.append("t.audio_file = ?")
+        params.append(audio_file)
+    if session:
+        where.append("t.session = ?")
+        params.append(session)
+    if before_id:
+        where.append("t.id < ?")
+        params.append(int(before_id))
+    if after_id:
+        where.append("t.id > ?")
+        params.append(int(after_id))
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY t.id {'ASC' if oldest_first else 'DESC'} LIMIT ?"
+    params.append(limit)
+
+    items = [transcript_dict(r) for r in conn.execute(sql, params)]
+    next_cursor = items[-1]["id"] if len(items) == limit else None
+    return items, next_cursor
+
+def iter_transcripts(conn, chunk=MAX_PAGE_SIZE, oldest_first=False, **filters):
+    """Every matching row (newest first by default), read one page at a time (for exports: memory stays flat)."""
+    cursor = None
+    while True:
+        key = "after_id" if oldest_first else "before_id"
+        page, cursor = query_transcripts(conn, oldest_first=oldest_first, limit=chunk,
+                                         **{key: cursor}, **filters)
+        yield from page
+        if cursor is None:
+            return
+
+# --- Learning / Hunter queries (used by the HTTP routes and validator.py) ---
+def add_validated_words(conn, words, category):
+    conn.executemany("INSERT OR IGNORE INTO validated_words (word, category) VALUES (?, ?)",
+                     [(w, category) for w in words])
+
+def learned_words(conn):
+    rows = conn.execute("SELECT id, word, category, frequency_count FROM validated_words ORDER BY frequency_count DESC")
+    return [{"id": r[0], "word": r[1], "category": r[2], "count": r[3]} for r in rows]
+
+def random_validated_words(conn, n=5):
+    return [r[0] for r in conn.execute("SELECT word FROM validated_words ORDER BY RANDOM() LIMIT ?", (n,))]
+
+def save_context_sample(conn, word, sentence, ts=None):
+    ts = ts or time.strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("INSERT INTO context_samples (target_word, full_sentence, timestamp) VALUES (?, ?, ?)",
+                 (word, sentence, ts))
+    # Also increment frequency if it exists in validated
+    conn.execute("UPDATE validated_words SET frequency_count = frequency_count + 1 WHERE word = ?", (word,))
+
+UNKNOWN_STATUSES = ("new", "validated", "rejected")
+
+def parse_unknown_cursor(cursor):
+    """"<occurrences>:<id>" (next_cursor of the previous page) -> (occurrences, id). Raises ValueError."""
+    occurrences, _, row_id = str(cursor).partition(":")
+    return int(occurrences), int(row_id)
+
+def list_unknown_words(conn, status=None, lang=None, cursor=None, limit=100):
+    """
+    One page of unknown words, most frequent first. Returns (items, next_cursor).
+    Keyset pagination on (occurrences, id) over the rank indexes: every page costs the same.
+    """
+    if status is not None and status not in UNKNOWN_STATUSES:
+        raise ValueError(f"Unknown status: {status} (use {', '.join(UNKNOWN_STATUSES)})")
+    limit = max(1, min(int(limit or 100), MAX_PAGE_SIZE))
+    where, params = [], []
+    if lang:
+        where.append("detected_lang = ?")
+        params.append(lang)
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if cursor:
+        where.append("(occurrences, id) < (?, ?)")
+        params += parse_unknown_cursor(cursor)
+    rows = conn.execute(
+        "SELECT id, word, context, detected_lang, confidence, status, translation, timestamp, "
+        "occurrences, min_conf, conf_sum, last_seen, samples FROM unknown_words "
+        + (f"WHERE {' AND '.join(where)} " if where else "")
+        + "ORDER BY occurrences DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+    items = [{"id": r[0], "word": r[1], "context": r[2], "lang": r[3], "conf": r[4],
+              "status": r[5], "translation": r[6], "timestamp": r[7],
+              "occurrences": r[8], "min_conf": r[9],
+              "mean_conf": round(r[10] / r[8], 3) if r[10] is not None and r[8] else r[4],
+              "last_seen": r[11] or r[7], "samples": json.loads(r[12]) if r[12] else []}
+             for r in rows[:limit]]
+    next_cursor = f"{items[-1]['occurrences']}:{items[-1]['id']}" if len(rows) > limit else None
+    return items, next_cursor
+
+def unknown_word_counts(conn, lang=None):
+    """{status: distinct words} (index-only scans)."""
+    if lang:
+        rows = conn.execute("SELECT status, COUNT(*) FROM unknown_words WHERE detected_lang = ? GROUP BY status", (lang,))
+    else:
+        rows = conn.execute("SELECT status, COUNT(*) FROM unknown_words GROUP BY status")
+    return dict(rows.fetchall())
+
+def pending_unknown_words(conn, limit=None):
+    """(id, word, detected_lang) of the unknown words waiting for validation, most frequent first."""
+    return conn.execute("SELECT id, word, detected_lang FROM unknown_words WHERE status='new' "
+                        "ORDER BY occurrences DESC, id DESC LIMIT ?", (-1 if limit is None else limit,)).fetchall()
+
+# --- Translations (translator.py) ---
+def transcript_texts(conn, ids):
+    """{id: (text, language)} for the given transcript ids."""
+    ids = list(ids)
+    found = {}
+    for i in range(0, len(ids), 500): # stay under SQLite's variable limit
+        chunk = ids[i:i + 500]
+        rows = conn.execute(f"SELECT id, text, language FROM transcripts WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((r[0], (r[1], r[2])) for r in rows)
+    return found
+
+def stored_translations(conn, ids, lang, version):
+    """{transcript_id: text} of up-to-date translations into lang."""
+    ids = list(ids)
+    found = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = conn.execute(f"SELECT transcript_id, text FROM transcript_translations WHERE language = ? AND version = ? "
+                            f"AND transcript_id IN ({','.join('?' * len(chunk))})", [lang, version] + chunk)
+        found.update(rows)
+    return found
+
+def untranslated_transcripts(conn, lang, version, after_id=0, limit=500):
+    """(id, text, language) of rows with no up-to-date translation into lang, oldest first (keyset paged)."""
+    return conn.execute("""
+        SELECT t.id, t.text, t.language FROM transcripts t
+        LEFT JOIN transcript_translations tr ON tr.transcript_id = t.id AND tr.language = ?
+        WHERE t.id > ? AND (tr.version IS NULL OR tr.version != ?)
+        ORDER BY t.id LIMIT ?
+    """, (lang, after_id, version, limit)).fetchall()
+
+def save_translations(conn, rows, version):
+    """rows: (transcript_id, language, text)."""
+    conn.executemany("INSERT OR REPLACE INTO transcript_translations (transcript_id, language, text, version) "
+                     "VALUES (?, ?, ?, ?)", [(tid, lang, text, version) for tid, lang, text in rows])
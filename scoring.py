@@ -0,0 +1,78 @@
+import os
+import langid
+
+# Multi-language scoring shared by the live loop and the batch engine.
+
+# IMPROVEMENT: Linguistic Verification (Stop Words)
+# Small models hallucinate. Valid text usually contains common words.
+COMMON_WORDS = {
+    "en": {"the", "is", "to", "and", "a", "of", "in", "it", "you", "that"},
+    "es": {"el", "la", "de", "que", "y", "en", "un", "una", "es", "por"},
+    "hi": {"है", "में", "से", "का", "की", "और", "एक", "हैं", "को", "पर"}
+}
+
+# Close calls: when the runner-up scores within CLOSE_RATIO of the leader, the text itself
+# gets a vote - up to TEXT_BONUS points for "this reads like <lang>" (langid.py, ~10 us/text).
+# Only when every candidate has langid.MIN_NGRAMS to go on: on "yes" or "hello" it's a coin toss.
+TEXT_CHECK = os.environ.get("SCRIBE_LANGID_CHECK", "1") != "0"
+CLOSE_RATIO = 0.8
+TEXT_BONUS = 20.0
+
+def score_result(lang, res, min_conf=None):
+    """
+    Score one recognizer result: (len(text) * avg_conf) + 20 per stop word.
+    Returns a candidate dict, or None if there is no text / it falls under min_conf.
+    """
+    text = res.get("text", "").strip()
+    if not text:
+        return None
+
+    words = res.get("result", [])
+    avg_conf = 0.0
+    if words:
+        avg_conf = sum(w.get("conf", 1.0) for w in words) / len(words)
+    elif min_conf is not None:
+        return None
+    if min_conf is not None and avg_conf < min_conf:
+        return None # Hard threshold for noise
+
+    # 1. Base Score: Confidence * Length
+    base_score = len(text) * avg_conf
+
+    # 2. Linguistic Bonus: Check for stop words
+    # If the model finds "the" or "hai", it is VERY likely correct.
+    # Give massive bonus.
+    bonus = 0
+    text_words = set(text.lower().split())
+    matches = text_words.intersection(COMMON_WORDS.get(lang, set()))
+    if matches:
+        bonus = len(matches) * 20.0 # +20 points per stop word!
+
+    return {
+        "lang": lang,
+        "text": text,
+        "score": base_score + bonus,
+        "json": res
+    }
+
+def pick_winner(results, min_conf=None):
+    """results: {lang: (is_final, res_dict)} from the decode pool."""
+    candidates = []
+    for lang, (is_final, res) in results.items():
+        if not is_final or not res:
+            continue
+        cand = score_result(lang, res, min_conf)
+        if cand:
+            candidates.append(cand)
+    if not candidates:
+        return None
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    if (TEXT_CHECK and len(candidates) > 1 and candidates[1]["score"] >= CLOSE_RATIO * candidates[0]["score"]
+            and all(langid.ngram_count(c["text"]) >= langid.MIN_NGRAMS for c in candidates)):
+        langs = [c["lang"] for c in candidates]
+        model = langid.model()
+        for cand in candidates:
+            cand["text_prob"] = round(model.probability(cand["text"], cand["lang"], langs), 3)
+            cand["score"] += TEXT_BONUS * cand["text_prob"]
+        candidates.sort(key=lambda x: x["score"], reverse=True)
+    return candidates[0]
@@ -0,0 +1,76 @@
+import sys, json, time, wave, argparse
+import urllib.request, urllib.error
+
+# Fake microphone: streams a WAV file into a "push" session over HTTP, in small frames,
+# at real-time speed (or as fast as the server accepts with --fast).
+# Handy for running the server headless (SCRIBE_MIC=0) and for load tests:
+#
+#   python stream_client.py meeting.wav --session room-2 --lang auto
+#   for i in 1 2 3 4; do python stream_client.py test.wav --session load-$i --fast & done
+
+def post(url, body=b"", content_type="application/octet-stream"):
+    req = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.loads(resp.read() or b"{}"), resp.headers
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}"), e.headers
+
+def post_json(url, data):
+    return post(url, json.dumps(data).encode(), "application/json")
+
+def stream_file(path, server, session, lang="auto", frame_ms=100, fast=False):
+    status, body, _ = post_json(f"{server}/record/start", {"session": session, "source": "push", "lang": lang})
+    if status != 200:
+        print(f"❌ Could not start session: {body}")
+        return False
+
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            print("❌ Only 16-bit WAV files are supported by this client")
+            return False
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        frames_per_chunk = max(1, rate * frame_ms // 1000)
+        url = f"{server}/api/sessions/{session}/audio?rate={rate}&channels={channels}&format=s16le"
+        print(f"📡 Streaming {path} ({rate} Hz, {channels} ch) to session '{session}'")
+
+        t0 = time.monotonic()
+        sent_sec = 0.0
+        while True:
+            data = wf.readframes(frames_per_chunk)
+            if not data:
+                break
+            while True:
+                status, body, headers = post(url, data)
+                if status != 429:
+                    break
+                # Backpressure: the decoder is behind, try again shortly
+                time.sleep(float(headers.get("Retry-After", 1)))
+            if status != 200:
+                print(f"❌ Upload failed: {body}")
+                break
+            sent_sec += len(data) / 2 / channels / rate
+            if not fast:
+                ahead = sent_sec - (time.monotonic() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    post_json(f"{server}/record/stop", {"session": session})
+    elapsed = time.monotonic() - t0
+    print(f"✅ Sent {sent_sec:.1f}s of audio in {elapsed:.1f}s")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a WAV file to the transcriber like a live microphone")
+    parser.add_argument("wav")
+    parser.add_argument("--server", default="http://localhost:5000")
+    parser.add_argument("--session", default="fake-mic")
+    parser.add_argument("--lang", default="auto")
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--fast", action="store_true", help="don't pace to real time")
+    args = parser.parse_args()
+    ok = stream_file(args.wav, args.server.rstrip("/"), args.session, args.lang, args.frame_ms, args.fast)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import re
+from exports import _subtitles, BYTES_PER_SEC
+from clip_recorder import HEADER_BYTES
+
+def row(text, words=(), audio_file=None, offset_sec=None, length_sec=None, start_sec=None):
+    return {"text": text, "timestamp": "2024-05-01 09:30:00", "audio_file": audio_file,
+            "words": [{"word": w, "start": s, "end": e, "conf": 1.0} for w, s, e in words],
+            "audio_offset": None if offset_sec is None else HEADER_BYTES + int(offset_sec * BYTES_PER_SEC),
+            "audio_length": None if length_sec is None else int(length_sec * BYTES_PER_SEC),
+            "audio_start_sec": start_sec}
+
+def cue_times(srt):
+    def sec(clock):
+        h, m, s = clock.replace(",", ".").split(":")
+        return int(h) * 3600 + int(m) * 60 + float(s)
+    return [(sec(a), sec(b)) for a, b in re.findall(r"(\S+) --> (\S+)", srt)]
+
+def test_session_containers_play_back_to_back():
+    a, b = "audio_clips/default_20240501_093000_123_1_001.wav", "audio_clips/default_20240501_094500_456_2_001.wav"
+    rows = [
+        row("hello world", [("hello", 10.3, 10.8), ("world", 11.0, 11.5)], a, 0.0, 2.0, 10.0),
+        row("second one", [("second", 20.2, 20.5), ("one", 20.6, 20.9)], a, 2.0, 1.5, 20.0),
+        # Next run: a new container whose offsets start from the header again
+        row("new run", [("new", 0.6, 0.8), ("run", 0.8, 1.0)], b, 0.0, 1.0, 0.5),
+        row("no timings"),
+        row("clip only", (), b, 1.0, 2.0, 3.0),
+    ]
+    srt = "".join(_subtitles(rows))
+    times = cue_times(srt)
+    assert [round(start, 3) for start, _ in times] == [0.3, 2.2, 3.6, 4.0, 5.0]
+    starts = [start for start, _ in times]
+    assert starts == sorted(starts)
+    assert all(end >= start for start, end in times)
+    assert srt.startswith("1\n") and "\n5\n" in srt
+
+def test_overlapping_rows_never_step_back():
+    rows = [row("first", [("first", 5.0, 6.0)]), row("earlier clock", [("earlier", 1.0, 1.5), ("clock", 1.5, 2.0)])]
+    times = cue_times("".join(_subtitles(rows, vtt=True)))
+    assert times == [(5.0, 6.0), (6.0, 7.0)]
@@ -0,0 +1,39 @@
+import queue, threading, time
+import pytest
+from input_buffer import InputBuffer, parse_policy
+
+def test_overrun_drops_oldest():
+    buf = InputBuffer(block_sec=0.25, max_sec=1.0)  # 4 blocks
+    for i in range(6):
+        buf.put(i)
+    assert buf.qsize() == 4
+    assert [buf.get(timeout=0) for _ in range(4)] == [2, 3, 4, 5]
+    assert buf.dropped() == 2
+    report = buf.report()
+    assert report["overruns"] == 2 and report["blocks"] == 6
+    assert report["dropped_sec"] == 0.5 and report["capacity_sec"] == 1.0
+
+def test_trim_keeps_newest():
+    buf = InputBuffer(block_sec=0.5, max_sec=30)
+    for i in range(10):
+        buf.put(i)
+    assert buf.backlog_sec() == 5.0
+    assert buf.trim(2.0) == 6
+    assert buf.backlog_sec() == 2.0
+    assert buf.get(timeout=0) == 6
+    assert buf.trim(10.0) == 0
+    assert buf.dropped() == 6
+
+def test_get_times_out_and_wakes_up():
+    buf = InputBuffer(block_sec=0.1)
+    with pytest.raises(queue.Empty):
+        buf.get(timeout=0.05)
+    threading.Timer(0.05, buf.put, args=(b"x",)).start()
+    t0 = time.monotonic()
+    assert buf.get(timeout=2) == b"x"
+    assert time.monotonic() - t0 < 1
+
+def test_parse_policy():
+    assert parse_policy(" leading, drop_oldest ,") == {"leading", "drop_oldest"}
+    with pytest.raises(ValueError):
+        parse_policy("leading,fast")
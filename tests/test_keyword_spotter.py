@@ -0,0 +1,50 @@
+import pytest
+from keyword_spotter import KeywordSpotter, normalize_keywords, SENTENCE_SLACK_SEC
+
+def words(*items):
+    return [{"word": w, "start": s, "end": e, "conf": c} for w, s, e, c in items]
+
+def partial(*items):
+    return {"partial": " ".join(i[0] for i in items), "partial_result": words(*items)}
+
+def test_partial_hit_reported_once_per_segment():
+    kws = KeywordSpotter(["algorithm", "neural network"], "en")
+    hits = kws.scan(False, partial(("[unk]", 0.0, 0.4, 1.0), ("algorithm", 0.5, 1.1, 0.9)), offset=10.0, now_sec=11.3)
+    assert hits == [{"word": "algorithm", "start": 10.5, "end": 11.1, "conf": 0.9, "delay_sec": 0.2}]
+    # The next partial of the same segment re-decodes the same word: not a new hit
+    assert kws.scan(False, partial(("[unk]", 0.0, 0.4, 1.0), ("algorithm", 0.5, 1.1, 0.9)), 10.0, 11.5) == []
+    # A second occurrence is
+    again = kws.scan(False, partial(("algorithm", 0.5, 1.1, 0.9), ("algorithm", 1.6, 2.0, 0.8)), 10.0, 12.1)
+    assert [h["start"] for h in again] == [11.6]
+    # After the final result a new segment starts counting from zero
+    assert kws.scan(True, {"text": "algorithm algorithm", "result": words(("algorithm", 0.5, 1.1, 0.9),
+                                                                          ("algorithm", 1.6, 2.0, 0.8))}, 10.0, 12.2) == []
+    assert len(kws.scan(False, partial(("algorithm", 0.1, 0.6, 0.9)), 12.2, 13.0)) == 1
+    assert kws.report()["hits"] == 3
+
+def test_phrase_and_confidence():
+    kws = KeywordSpotter(["neural network"], "en", min_conf=0.5)
+    assert kws.scan(False, partial(("neural", 0.0, 0.3, 0.9), ("[unk]", 0.3, 0.5, 1.0)), 0.0, 0.6) == []
+    assert kws.scan(False, partial(("neural", 0.0, 0.3, 0.9), ("network", 0.3, 0.7, 0.4)), 0.0, 0.8) == []
+    hit, = kws.scan(False, partial(("neural", 0.0, 0.3, 0.9), ("network", 0.3, 0.7, 0.6)), 0.0, 0.9)
+    assert hit["word"] == "neural network" and hit["conf"] == 0.6 and hit["end"] == 0.7
+
+def test_without_word_times_the_hit_is_now():
+    kws = KeywordSpotter(["algorithm"], "en")
+    hit, = kws.scan(False, {"partial": "algorithm"}, offset=5.0, now_sec=7.5)
+    assert hit["start"] == hit["end"] == 7.5 and hit["delay_sec"] == 0.0
+
+def test_take_pending_by_sentence():
+    kws = KeywordSpotter(["algorithm"], "en")
+    kws.scan(True, {"result": words(("algorithm", 1.0, 1.5, 1.0))}, 0.0, 2.0)
+    kws.scan(True, {"result": words(("algorithm", 9.0, 9.5, 1.0))}, 0.0, 10.0)
+    assert [h["start"] for h in kws.take_pending(until_sec=4.0 - SENTENCE_SLACK_SEC)] == [1.0]
+    assert [h["start"] for h in kws.take_pending()] == [9.0]
+    assert kws.report()["written"] == 2 and kws.report()["pending"] == 0
+
+def test_normalize_keywords():
+    assert normalize_keywords(["Neural ", "neural", "sort  Algorithm", ""]) == ["neural", "sort algorithm"]
+    assert normalize_keywords("hello") == ["hello"]
+    for bad in (["a|b"], ["[unk]"], [1], ["w%d" % i for i in range(21)]):
+        with pytest.raises(ValueError):
+            normalize_keywords(bad)
@@ -0,0 +1,38 @@
+import pytest
+import langid
+from translator import SimpleTranslator
+from scoring import pick_winner
+
+@pytest.fixture(scope="module")
+def model():
+    return langid.model()
+
+@pytest.mark.parametrize("text, lang", [
+    ("hello", "en"), ("yes", "en"), ("no", "en"), ("okay", "en"), ("thank you", "en"),
+    ("good morning", "en"), ("see you later", "en"),
+    ("sí", "es"), ("¿qué tal?", "es"), ("gracias", "es"), ("buenos días", "es"), ("que tal el dia", "es"),
+    ("नमस्ते", "hi"), ("धन्यवाद", "hi"), ("आप कैसे हैं", "hi"),
+])
+def test_detect_short_texts(model, text, lang):
+    assert model.detect(text)[0] == lang
+
+def test_detect_many_matches_detect(model):
+    texts = ["hello", "gracias", "नमस्ते", "", "the meeting starts at nine"]
+    assert model.detect_many(texts) == [model.detect(t) for t in texts]
+    assert model.detect("")[0] == "unknown"
+
+def test_ngram_count(model):
+    for text in ["hello", "¿qué tal?", "नमस्ते", "", "a b"]:
+        assert langid.ngram_count(text) == int(model.scores_many([text])[1][0])
+
+def test_translate_short_english():
+    t = SimpleTranslator()
+    assert t.detect_language("hello") == "en"
+    assert t.translate("hello", "es") == "hola"
+
+def test_no_text_vote_on_short_results():
+    # "yes" scored as Spanish text would flip this close call
+    results = {"en": (True, {"text": "yes", "result": [{"word": "yes", "conf": 1.0}]}),
+               "es": (True, {"text": "yes", "result": [{"word": "yes", "conf": 0.9}]})}
+    winner = pick_winner(results)
+    assert winner["lang"] == "en" and "text_prob" not in winner
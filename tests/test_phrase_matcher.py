@@ -0,0 +1,36 @@
+import random
+from translator import PhraseMatcher
+
+def brute_force(entries, toks):
+    """Left to right: the longest entry starting here, else move on one word."""
+    found, i = [], 0
+    while i < len(toks):
+        lengths = [n for n in range(len(toks) - i, 0, -1) if tuple(toks[i:i + n]) in entries]
+        if lengths:
+            found.append((i, i + lengths[0], entries[tuple(toks[i:i + lengths[0]])]))
+            i += lengths[0]
+        else:
+            i += 1
+    return found
+
+def test_longest_wins():
+    m = PhraseMatcher({("good",): "buen", ("good", "morning"): "buenos días", ("morning",): "mañana"})
+    assert m.matches("good morning good".split()) == [(0, 2, "buenos días"), (2, 3, "buen")]
+    assert len(m) == 3
+
+def test_leftmost_wins_over_longer_later_match():
+    m = PhraseMatcher({("a", "b"): "AB", ("b", "c", "d"): "BCD"})
+    assert m.matches(list("abcd")) == [(0, 2, "AB")]
+    assert m.matches(list("xbcd")) == [(1, 4, "BCD")]
+
+def test_matches_brute_force():
+    rng = random.Random(21)
+    vocab = list("abcde")
+    for _ in range(200):
+        entries = {}
+        for _ in range(rng.randint(1, 12)):
+            phrase = tuple(rng.choice(vocab) for _ in range(rng.randint(1, 4)))
+            entries[phrase] = "".join(phrase).upper()
+        m = PhraseMatcher(entries)
+        toks = [rng.choice(vocab) for _ in range(rng.randint(0, 30))]
+        assert m.matches(toks) == brute_force(entries, toks), (entries, toks)
@@ -0,0 +1,73 @@
+import json, sqlite3
+import pytest
+import repository as R
+
+@pytest.fixture
+def conn(tmp_path):
+    c = R.init_db(str(tmp_path / "t.db"))
+    yield c
+    c.close()
+
+def write(conn, *unknowns):
+    with conn:
+        return R.apply_write_batch(conn, [("unknown",) + u for u in unknowns])
+
+def test_upsert_aggregates_per_word_and_lang(conn):
+    events = write(conn, ("foo", "a foo", "en", 0.4, "2024-01-01 10:00:00"),
+                   ("foo", "b foo", "en", 0.2, "2024-01-01 10:00:05"),
+                   ("foo", "un foo", "es", 0.3, "2024-01-01 10:00:06"))
+    assert sorted(e[1]["lang"] for e in events if e[0] == "unknown_word") == ["en", "es"]
+    # Seen before: counted, not announced again
+    assert write(conn, ("foo", "c foo", "en", 0.6, "2024-01-02 09:00:00")) == []
+
+    items, cursor = R.list_unknown_words(conn, lang="en")
+    assert cursor is None and len(items) == 1
+    foo = items[0]
+    assert foo["occurrences"] == 3 and foo["min_conf"] == 0.2 and foo["mean_conf"] == 0.4
+    assert foo["last_seen"] == "2024-01-02 09:00:00" and foo["context"] == "a foo"
+    assert foo["samples"] == ["a foo", "b foo", "c foo"]
+    assert R.unknown_word_counts(conn) == {"new": 2}
+
+def test_samples_stay_bounded(conn):
+    for i in range(40):
+        write(conn, ("bar", f"sentence {i}", "en", 0.5, "2024-01-01 10:00:00"))
+    bar, = R.list_unknown_words(conn)[0]
+    assert bar["occurrences"] == 40
+    assert len(bar["samples"]) == R.UNKNOWN_SAMPLES == len(set(bar["samples"]))
+
+def test_pages_most_frequent_first(conn):
+    for i in range(7):
+        write(conn, *[(f"w{i}", None, "en", 0.5, "2024-01-01 10:00:00")] * (i % 3 + 1))
+    seen, cursor = [], None
+    while True:
+        items, cursor = R.list_unknown_words(conn, cursor=cursor, limit=3)
+        seen += [(w["occurrences"], w["id"]) for w in items]
+        if cursor is None:
+            break
+    assert len(seen) == 7 and seen == sorted(seen, reverse=True)
+    assert [r[1] for r in R.pending_unknown_words(conn, limit=2)] == ["w5", "w2"]
+    with pytest.raises(ValueError):
+        R.list_unknown_words(conn, status="maybe")
+
+def test_migrates_one_row_per_sighting(tmp_path):
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE unknown_words (id INTEGER PRIMARY KEY AUTOINCREMENT, word TEXT, context TEXT, "
+                "detected_lang TEXT, confidence REAL, status TEXT DEFAULT 'new', translation TEXT, timestamp TEXT)")
+    old.executemany("INSERT INTO unknown_words (word, context, detected_lang, confidence, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    [("foo", "one foo", "en", 0.5, "2024-01-01"), ("bar", "a bar", "en", 0.3, "2024-01-02"),
+                     ("foo", "two foo", "en", 0.1, "2024-01-03"), ("foo", "one foo", "en", None, "2024-01-04")])
+    old.commit()
+    old.close()
+
+    conn = R.init_db(path)
+    rows = conn.execute("SELECT id, word, occurrences, min_conf, conf_sum, last_seen, samples FROM unknown_words "
+                        "ORDER BY id").fetchall()
+    assert [r[:6] for r in rows] == [(1, "foo", 3, 0.1, 0.6, "2024-01-04"), (2, "bar", 1, 0.3, 0.3, "2024-01-02")]
+    assert json.loads(rows[0][6]) == ["one foo", "two foo"]
+    # Migrated rows take upserts like new ones, and a second start changes nothing
+    write(conn, ("foo", "three foo", "en", 0.9, "2024-01-05"))
+    conn.close()
+    conn = R.init_db(path)
+    assert conn.execute("SELECT occurrences FROM unknown_words WHERE word='foo'").fetchone() == (4,)
+    conn.close()
@@ -0,0 +1,41 @@
+import random, string
+from difflib import get_close_matches
+import pytest
+from vocab_index import VocabIndex
+
+def random_words(rng, n):
+    return ["".join(rng.choice("abcdeilnorst") for _ in range(rng.randint(1, 10))) for _ in range(n)]
+
+def mutate(rng, word):
+    chars = list(word)
+    for _ in range(rng.randint(0, 2)):
+        op = rng.choice("ids")
+        i = rng.randrange(len(chars) + 1)
+        if op == "i":
+            chars.insert(i, rng.choice(string.ascii_lowercase))
+        elif chars and i < len(chars):
+            if op == "d":
+                del chars[i]
+            else:
+                chars[i] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+@pytest.mark.parametrize("cutoff", [0.6, 0.85, 0.95])
+def test_close_match_same_as_difflib(cutoff):
+    rng = random.Random(cutoff)
+    words = random_words(rng, 300)
+    index = VocabIndex(cutoff)
+    index.load(words)
+    queries = [mutate(rng, rng.choice(words)) for _ in range(400)] + random_words(rng, 100) + [""]
+    for q in queries:
+        expected = get_close_matches(q, list(set(words)), n=1, cutoff=cutoff)
+        assert index.close_match(q) == (expected[0] if expected else None), q
+
+def test_add_and_exact_lookups():
+    index = VocabIndex()
+    index.load(["Python", "latency"])
+    index.add("Heuristic")
+    assert "Heuristic" in index and len(index) == 3
+    assert index.canonical("python") == ["Python"]
+    assert index.close_match("Heuristik") == "Heuristic"
+    assert index.close_match("zzzz") is None
@@ -1,449 +1,799 @@
-import os, queue, json, sqlite3, time, threading, wave, difflib
-import sounddevice as sd
-import vosk
-
-# Candidate paths to search for (Priority: Large -> Small)
-MODEL_CANDIDATES = {
-    "en": ["vosk-model-en-us-0.22", "vosk-model-small-en-us-0.15"],
-    "es": ["vosk-model-es-0.42", "vosk-model-small-es-0.42"], 
-    "hi": ["vosk-model-hi-0.22", "vosk-model-small-hi-0.22"]
-}
-
-recognizers = {}
-active_models = []
-recording_active = False 
-target_languages = [] # Empty means "Auto" (All)
-validated_vocab = []  # List of learned words
-
-def set_target_language(lang):
-    """
-    lang: 'auto', 'en', 'es', 'hi'
-    """
-    global target_languages
-    if lang == "auto" or lang not in recognizers:
-        target_languages = [] # Use all
-        print("🎯 Focus Mode: AUTO (All Languages)")
-    else:
-        target_languages = [lang]
-        print(f"🎯 Focus Mode: {lang.upper()} Only")
+import os, re, queue, json, time, threading, atexit
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    sd = None # Headless box (no PortAudio): push/HTTP sessions only, no local microphone
+from decode_pool import DecodePool
+from early_exit import LanguageGate, score_partial
+from vad import EnergyVAD
+from input_buffer import InputBuffer, CATCHUP_SEC, CATCHUP_POLICY
+from preprocess import AudioPreprocessor, TARGET_RATE, np
+from clip_recorder import ClipRecorder
+from db_writer import DBWriter
+from vocab_index import vocab
+from events import hub
+from metrics import metrics, process_memory
+from models import registry
+from recognizer_pool import GRAMMARS, recognizers
+from keyword_spotter import KeywordSpotter, normalize_keywords
+from scoring import COMMON_WORDS, score_result, pick_winner
+from repository import (DB_FILE, pool, init_db, apply_write_batch, winner_items, transcript_row, segment_span,
+                        word_timings, fuzzy_fix_text)
+
+# Models come from the registry: loaded on first use, shared read-only by every session
+
+# Decode workers: "thread" (recognizers over the shared models) or "process" (own model copy per worker, no GIL)
+DECODE_MODE = os.environ.get("SCRIBE_DECODE_MODE", "thread")
+
+# AUTO mode early-exit: lock onto the clearly-leading language for the rest of the utterance
+EARLY_EXIT = os.environ.get("SCRIBE_EARLY_EXIT", "1") != "0"
+
+# Low-latency mode (opt-in): push PartialResult of the leading language to /events.
+# Cadence can't beat one input block (BLOCK_SIZE / 16000 sec), so lower both for snappier partials.
+BLOCK_SIZE = int(os.environ.get("SCRIBE_BLOCK_SIZE", "8000"))
+PARTIAL_INTERVAL = float(os.environ.get("SCRIBE_PARTIAL_INTERVAL", "0.3"))
+PARTIALS_DEFAULT = os.environ.get("SCRIBE_PARTIALS", "0") == "1"
+# Voice-activity detection between the input queue and the recognizers
+VAD_ENABLED = os.environ.get("SCRIBE_VAD", "1") != "0"
+VAD_POLICY = os.environ.get("SCRIBE_VAD_POLICY", "compress")
+
+# Sessions: one per audio stream (a local input device, or audio pushed in by a client)
+DEFAULT_SESSION = "default"
+MAX_SESSIONS = int(os.environ.get("SCRIBE_MAX_SESSIONS", "32"))
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+PUSH_IDLE_SEC = float(os.environ.get("SCRIBE_PUSH_IDLE_SEC", "600")) # close abandoned client sessions
+# Device sample rate: "" = 16 kHz, falling back to the device's own rate (resampled) if it
+# refuses; "native" = always the device's own rate; or a number
+INPUT_RATE = os.environ.get("SCRIBE_INPUT_RATE", "")
 
-def find_model_path(base_name):
-    """
-    Handle cases where user extracted 'model/' into 'model/model/' 
-    or just 'model/'.
-    """
-    # 1. Check direct path
-    if os.path.exists(os.path.join(base_name, "conf")):
-        return base_name
-    
-    # 2. Check nested same-name folder
-    nested = os.path.join(base_name, base_name)
-    if os.path.exists(os.path.join(nested, "conf")):
-        return nested
-        
-    # 3. Last ditch: check ANY subfolder
-    if os.path.exists(base_name):
-        for child in os.listdir(base_name):
-            candidate = os.path.join(base_name, child)
-            if os.path.isdir(candidate) and os.path.exists(os.path.join(candidate, "conf")):
-                return candidate
-    return None
-
-print("🔄 Loading models...")
-for lang, candidates in MODEL_CANDIDATES.items():
-    # Try each candidate until one works
-    loaded = False
-    for base_path in candidates:
-        final_path = find_model_path(base_path)
-        if final_path:
-            try:
-                model = vosk.Model(final_path)
-                
-                # Fetch validated words for injection
-                # Note: Vosk grammar restricts recognition to these words if provided. 
-                # To purely prioritization we might need a mix, but per requirements we inject them.
-                # However, to prevent breaking general dictation, we only use grammar if specifically requested or if logic allows.
-                # For now, we will Load them but only Apply if we have a strategy. 
-                # Requirement: "Pass this list to the KaldiRecognizer constructor"
-                
-                # We do this logic in start_transcriber because we need DB access potentially, 
-                # but DB is init later. Let's move this init or do a distinct step.
-                # Actually, standard flow: Init Model -> Init Rec.
-                # We will hold off Rec creation until start_transcriber or do it here with empty list and update later? 
-                # No, Rec is created once.
-                
-                # Let's assume we want to support general + validated. 
-                # Vosk doesn't easily support "General + List" via grammar. 
-                # So we will rely heavily on Fuzzy Auto-Correction for the "Learning" part
-                # AND pass the list to Rec which might just be ignored if not formatted as grammar 
-                # OR we implement it as "Dynamic Vocabulary Injection" meaning we construct a grammar of [validated_words + "unk"?]
-                
-                # For this implementation, I will behave as standard:
-                # Create Rec WITHOUT grammar for general dictation.
-                # If the user wants specific vocab support, they would need a custom model.
-                # BUT the requirement says "Pass this list...".
-                # I will adhere to the requirement by creating a GLOBAL vocab list and using it if populated.
-                
-                rec = vosk.KaldiRecognizer(model, 16000)
-                rec.SetWords(True) 
-                recognizers[lang] = rec
-                active_models.append(lang)
-                print(f"✅ Loaded {lang} model from {final_path}")
-                loaded = True
-                break # Stop searching for this language
-            except Exception as e:
-                print(f"⚠️ Found {base_path} but failed to load: {e}")
-        
-    if not loaded:
-        print(f"⚠️ No valid model found for {lang}. (Checked: {candidates})")
-        
-if not recognizers:
-    print("❌ No models matched! automatic speech recognition will not work.")
-
-DB_FILE = "transcriptions.db"
 AUDIO_DIR = "audio_clips"
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
-q = queue.Queue()
-
-def set_recording_state(state):
-    global recording_active
-    recording_active = state
-    print(f"🔴 Recording State Changed: {state}")
-    return recording_active
-
-def init_db():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    # Transcripts Table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS transcripts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            language TEXT,
-            text TEXT,
-            audio_file TEXT
-        )
-    """)
-    # Unknown Words Table - Feature 3
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS unknown_words (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word TEXT,
-            context TEXT,
-            detected_lang TEXT,
-            confidence REAL,
-            status TEXT DEFAULT 'new', 
-            translation TEXT,
-            timestamp TEXT
-        )
-    """)
-    # Vocabulary Table - Feature 5
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word TEXT UNIQUE,
-            language TEXT,
-            added_on TEXT
-        )
-    """)
-    # Validated Words Table - Incremental Learning
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS validated_words (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            word TEXT UNIQUE,
-            category TEXT,
-            frequency_count INTEGER DEFAULT 1
-        )
-    """)
-    # Feature 4: Keyword Hunter Context Samples
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS context_samples (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            target_word TEXT,
-            full_sentence TEXT,
-            timestamp TEXT
-        )
-    """)
-    conn.commit()
-    return conn
-
-conn = init_db()
+init_db().close()
 
 def save_transcript(text, lang, audio_path=None):
-    # Apply Fuzzy Auto-Correction
-    text = fuzzy_fix_text(text)
-    
-    # Update Mastery stats
-    update_word_frequency(text)
-    
+    # Queued: mastery stats and the INSERT happen on the DB writer thread
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    conn.execute(
-        "INSERT INTO transcripts (timestamp, language, text, audio_file) VALUES (?, ?, ?, ?)",
-        (ts, lang, text, audio_path)
-    )
-    conn.commit()
+    queue_item(("transcript", transcript_row(fuzzy_fix_text(text), lang, ts, audio_file=audio_path)))
 
 def save_unknown_word(word, context, lang, confidence):
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    # Check if word already exists to avoid duplicates
-    cursor = conn.execute("SELECT id FROM unknown_words WHERE word = ? AND detected_lang = ?", (word, lang))
-    if not cursor.fetchone():
-        conn.execute(
-            "INSERT INTO unknown_words (word, context, detected_lang, confidence, timestamp) VALUES (?, ?, ?, ?, ?)",
-            (word, context, lang, confidence, ts)
-        )
-        conn.commit()
-        print(f"❓ Saved unknown/low-conf word: '{word}' ({lang})")
-
-def update_word_frequency(text):
+    queue_item(("unknown", word, context, lang, confidence, ts))
+
+def save_context_sample(word, sentence, ts=None):
+    queue_item(("context_sample", word, sentence, ts or time.strftime("%Y-%m-%d %H:%M:%S")))
+
+def queue_item(item):
+    if item[0] == "transcript":
+        # Push to live dashboards right away; the DB row follows within one writer batch
+        event = dict(item[1])
+        event["words"] = json.loads(event["words"]) if event.get("words") else []
+        hub.publish("transcript", event)
+    db_writer.put(item)
+
+def publish_committed(events):
+    # Unknown words are only announced once the writer knows they are really new
+    for kind, data in events or ():
+        hub.publish(kind, data)
+
+db_writer = DBWriter(DB_FILE, apply_write_batch, on_commit=publish_committed)
+
+class TranscriptionSession:
     """
-    Increment frequency_count for any validated words found in the text.
+    One audio stream with its own recognizers (over the shared models), input queue,
+    focus language, VAD, clip container and decode thread.
+    source: "mic"  - a local input device (device=None is the system default), or
+            "push" - the audio arrives through feed().
     """
-    validated = fetch_validated_words()
-    if not validated:
-        return
+    def __init__(self, session_id, source="mic", device=None):
+        self.id = session_id
+        self.source = source
+        self.device = device
+        self.recording_active = False
+        self.target_languages = [] # Empty means "Auto" (All)
+        self.partials_enabled = PARTIALS_DEFAULT
+        self.q = InputBuffer(BLOCK_SIZE / 16000) # bounded: oldest audio goes first when decoding can't keep up
+        self.input_stats = {"overflows": 0, "status_flags": 0} # PortAudio callback status
+        self.preprocessor = AudioPreprocessor(TARGET_RATE) # mic: replaced once the device rate is known
+        self.pending = bytearray()  # push: audio waiting to fill a whole BLOCK_SIZE block
+        self.converter = None       # push: ingest.StreamConverter for the client's format
+        self.input_lock = threading.Lock()
+        self.language_gate = LanguageGate(COMMON_WORDS)
+        self.vad = EnergyVAD(policy=VAD_POLICY)
+        # Full utterance audio, appended to one WAV container per recording run
+        self.clip_recorder = ClipRecorder(AUDIO_DIR)
+        self.stream_sec = 0.0     # audio seconds consumed since the stream opened (session timeline)
+        self.last_partial = {"at": 0.0, "text": ""}
+        self.last_winner_lang = None
+        # Catch-up mode: degrade decoding while the backlog is over catchup_sec (0 = never)
+        self.catchup_sec = CATCHUP_SEC
+        self.catchup_policy = set(CATCHUP_POLICY)
+        self.catching_up = False
+        self.catchup_since = None
+        self.catchup_paused = set() # AUTO languages skipped while catching up
+        self.catchup_stats = {"episodes": 0, "seconds": 0.0}
+        self.seen_dropped = 0
+        self.created = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.last_active = time.monotonic()
+        self.closing = False
+        self.stream = None
+        self.thread = None
+        self.exit_lock = threading.Lock()
+        self.thread_done = False
+        self.release_on_exit = False  # close() timed out: the thread cleans up after itself
 
-    words = text.lower().split()
-    for w in words:
-        # Simple case-insensitive exact match
-        # (Could use loose matching but let's be strict for mastery tracking)
-        # Check if 'w' matches any validated word
-        # Inefficient loop but okay for small vocabs. 
-        # Better: Set intersection.
-        for val_word in validated:
-            if w == val_word.lower():
-                conn.execute("UPDATE validated_words SET frequency_count = frequency_count + 1 WHERE word = ?", (val_word,))
-    
-    conn.commit()
-
-def fetch_validated_words():
-    """Fetch words from validated_words table."""
-    try:
-        cursor = conn.execute("SELECT word FROM validated_words")
-        words = [row[0] for row in cursor.fetchall()]
+        # Languages join the decode pool the first time they are needed, with a recognizer
+        # checked out of the shared pool (thread mode) - grammar: None, "hunter" or "learning"
+        self.decode_pool = DecodePool(DECODE_MODE)
+        self.rec_keys = {}        # lang -> recognizer pool key of the checked-out recognizer
+        self.grammar = None       # wanted
+        self.decode_grammar = None  # what the current recognizers were built with
+        # Keyword spotting (Hunter): (words, lang) wanted, and the spotter decoding them
+        self.keywords = ([], None)
+        self.spotter = None
+
+    def start(self):
+        if self.source == "mic":
+            try:
+                self.open_input()
+            except Exception:
+                self.decode_pool.close()
+                raise
+        self.thread = threading.Thread(target=self._thread_main, name=f"session-{self.id}", daemon=True)
+        self.thread.start()
+        print(f"🎤 [{self.id}] Listening ({self.source}{'' if self.device is None else f' device {self.device}'})... "
+              f"Available Languages: {registry.available()} (decode: {DECODE_MODE}, VAD: {VAD_ENABLED})")
+
+    def open_input(self):
+        """Open the input device at 16 kHz if it can, else at its own rate (resampled on our side)."""
+        if sd is None:
+            raise RuntimeError("sounddevice is not available (pip install sounddevice, and PortAudio)")
+        native = lambda: int(sd.query_devices(self.device, "input")["default_samplerate"])
+        rate = native() if INPUT_RATE == "native" else int(INPUT_RATE or TARGET_RATE)
+        try:
+            self.preprocessor = AudioPreprocessor(rate)
+            self.stream = self._open_stream(rate)
+        except Exception as e:
+            if INPUT_RATE or np is None or native() == rate:
+                raise
+            rate = native()
+            print(f"🔁 [{self.id}] Device refused {TARGET_RATE} Hz ({e}), recording at {rate} Hz and resampling")
+            self.preprocessor = AudioPreprocessor(rate)
+            self.stream = self._open_stream(rate)
+
+    def _open_stream(self, rate):
+        # Same block duration at any rate
+        stream = sd.RawInputStream(samplerate=rate, blocksize=BLOCK_SIZE * rate // TARGET_RATE, device=self.device,
+                                   dtype="int16", channels=1, callback=self.audio_callback)
+        stream.start()
+        return stream
+
+    def close(self, timeout=10.0):
+        # Finalize whatever is queued, then release the device and the decode workers
+        self.recording_active = False
+        self.closing = True
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+        with self.exit_lock:
+            # Still decoding its backlog: pulling the recognizers out from under it would crash it
+            self.release_on_exit = self.thread is not None and not self.thread_done
+        if self.release_on_exit:
+            print(f"⏳ [{self.id}] Still finishing after {timeout:.0f}s, it will release its decoders when done")
+            return
+        self.release_decoders()
+        print(f"👋 [{self.id}] Session closed")
+
+    def release_decoders(self):
+        self.release_recognizers()
+        self.decode_pool.close()
+
+    def _thread_main(self):
+        try:
+            self._run()
+        finally:
+            with self.exit_lock:
+                self.thread_done = True
+                release = self.release_on_exit
+            if release:
+                self.release_decoders()
+                print(f"👋 [{self.id}] Session closed (late)")
+
+    # --- controls ---
+    def set_target_language(self, lang):
+        """
+        lang: 'auto', 'en', 'es', 'hi'
+        """
+        available = registry.available()
+        if lang == "auto" or lang not in available:
+            self.target_languages = [] # Use all
+            print(f"🎯 [{self.id}] Focus Mode: AUTO (All Languages)")
+        else:
+            self.target_languages = [lang]
+            print(f"🎯 [{self.id}] Focus Mode: {lang.upper()} Only")
+        # Start loading now, so the model is (nearly) warm when the first audio arrives
+        if DECODE_MODE == "thread":
+            recognizers.preload(self.target_languages or available)
+
+    def set_grammar(self, grammar):
+        """
+        None (full vocabulary) or a drill grammar ("hunter", "learning"). Takes effect at the
+        start of the next recording run. Raises ValueError.
+        """
+        if grammar is not None and grammar not in GRAMMARS:
+            raise ValueError(f"Unknown grammar: {grammar} (use one of {', '.join(GRAMMARS)})")
+        if grammar != self.grammar:
+            if grammar and DECODE_MODE != "thread":
+                print(f"⚠️ [{self.id}] Grammar drills need SCRIBE_DECODE_MODE=thread, using the full vocabulary")
+            else:
+                print(f"📖 [{self.id}] Grammar: {grammar or 'full vocabulary'}")
+        self.grammar = grammar
+        return grammar
+
+    def set_keywords(self, words, lang=None):
+        """
+        Words to spot while recording ([] = off), in lang (default: the focus language, else
+        English). Takes effect at the start of the next recording run. Raises ValueError.
+        """
+        words = normalize_keywords(words or [])
+        lang = lang or (self.target_languages[0] if len(self.target_languages) == 1 else "en")
+        if words and lang not in registry.available():
+            raise ValueError(f"No model for keyword language: {lang}")
+        if words and DECODE_MODE != "thread":
+            print(f"⚠️ [{self.id}] Keyword spotting needs SCRIBE_DECODE_MODE=thread, spotting is off")
+            words = []
+        if (words, lang if words else None) != self.keywords:
+            print(f"🎯 [{self.id}] Keywords: {', '.join(words) if words else 'off'}")
+        self.keywords = (words, lang) if words else ([], None)
         return words
-    except:
-        return []
 
-def fuzzy_fix_text(text):
-    """
-    Scan text for words similar to validated_words (85% match) 
-    and replace them.
-    """
-    validated = fetch_validated_words()
-    if not validated:
-        return text
-
-    words = text.split()
-    fixed_words = []
-    
-    for w in words:
-        # Check against validated list
-        matches = difflib.get_close_matches(w, validated, n=1, cutoff=0.85)
-        if matches:
-            print(f"✨ Fuzzy Fix: Replaced '{w}' with '{matches[0]}'")
-            fixed_words.append(matches[0])
+    def set_partial_streaming(self, enabled):
+        self.partials_enabled = bool(enabled)
+        print(f"⚡ [{self.id}] Partial streaming: {'ON' if self.partials_enabled else 'OFF'}")
+        return self.partials_enabled
+
+    def set_recording_state(self, state):
+        if not state:
+            self.flush_input()
+        self.recording_active = state
+        self.last_active = time.monotonic()
+        print(f"🔴 [{self.id}] Recording State Changed: {state}")
+        return self.recording_active
+
+    # --- audio in ---
+    def audio_callback(self, indata, frames, time, status):
+        if status:
+            # PortAudio flags trouble here; input_overflow means audio was lost before we saw it
+            self.input_stats["status_flags"] += 1
+            if getattr(status, "input_overflow", False):
+                self.input_stats["overflows"] += 1
+        if self.recording_active:
+            # The only copy: PortAudio reuses this buffer after we return. Gain, DC removal and
+            # resampling run on the decode thread (preprocess.py), so we never drop frames here.
+            self.q.put(bytes(indata))
+
+    def feed(self, data):
+        """
+        Push 16 kHz int16 mono PCM into a "push" session. Ignored while not recording.
+        Clients send small frames; they are regrouped into BLOCK_SIZE blocks like the mic's,
+        so per-block decode overhead doesn't explode.
+        """
+        if not self.recording_active:
+            return False
+        self.last_active = time.monotonic()
+        block_bytes = BLOCK_SIZE * 2
+        with self.input_lock:
+            self.pending += data
+            while len(self.pending) >= block_bytes:
+                self.q.put(bytes(self.pending[:block_bytes]))
+                del self.pending[:block_bytes]
+        return True
+
+    def flush_input(self):
+        # The tail end of a pushed stream (less than one block)
+        with self.input_lock:
+            if self.pending:
+                self.q.put(bytes(self.pending))
+                self.pending = bytearray()
+
+    def queued_sec(self):
+        """Audio waiting for the decoder, in seconds (the ingest backpressure signal)."""
+        return self.q.backlog_sec()
+
+    def update_catchup(self):
+        """Enter / leave catch-up mode from the current backlog. Returns whether it is on."""
+        backlog = self.q.backlog_sec()
+        if not self.catching_up and self.catchup_sec and backlog > self.catchup_sec:
+            self.catching_up = True
+            self.catchup_since = time.monotonic()
+            self.catchup_stats["episodes"] += 1
+            print(f"🐢 [{self.id}] Catch-up mode: {backlog:.1f}s behind ({', '.join(sorted(self.catchup_policy)) or 'report only'})")
+            hub.publish("catchup", {"session": self.id, "active": True, "backlog_sec": round(backlog, 2)})
+        elif self.catching_up and (not self.catchup_sec or backlog <= self.catchup_sec / 2):
+            self.catching_up = False
+            self.catchup_stats["seconds"] += time.monotonic() - self.catchup_since
+            print(f"🐇 [{self.id}] Caught up ({backlog:.1f}s behind)")
+            hub.publish("catchup", {"session": self.id, "active": False, "backlog_sec": round(backlog, 2)})
+        return self.catching_up
+
+    def wake_catchup_paused(self):
+        # Languages skipped while catching up missed audio: they rejoin clean, at an utterance boundary
+        if self.catchup_paused and not self.catching_up:
+            self.decode_pool.reset(sorted(self.catchup_paused))
+            self.catchup_paused = set()
+
+    # --- decoding ---
+    def commit_winner(self, winner):
+        # Cut the whole utterance (first word -> last word) out of the ring buffer
+        clip = None
+        start_sec, end_sec = segment_span(winner)
+        if start_sec is not None:
+            clip = self.clip_recorder.save_segment(self.id, start_sec, end_sec)
+        for item in winner_items(winner, clip=clip, session=self.id):
+            queue_item(item)
+        self.flush_keywords(winner)
+
+    def ensure_language(self, lang):
+        """Add lang to this session's decode pool (loading the model on first use)."""
+        if lang in self.decode_pool.workers:
+            return True
+        path = registry.path(lang)
+        if path is None:
+            return False
+        if DECODE_MODE == "thread":
+            try:
+                rec, age, key = recognizers.checkout(lang, self.decode_grammar)
+            except Exception as e:
+                print(f"⚠️ [{self.id}] Could not load {lang} model: {e}")
+                return False
+            self.rec_keys[lang] = key
+            self.decode_pool.add(lang, rec=rec, model_path=path, clock=age)
         else:
-            fixed_words.append(w)
-            
-    return " ".join(fixed_words)
-
-def save_audio_chunk(raw_data, lang):
-    ts = time.strftime("%Y%m%d_%H%M%S")
-    filename = f"{lang}_{ts}.wav"
-    filepath = os.path.join(AUDIO_DIR, filename)
-    with wave.open(filepath, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(16000)
-        wf.writeframes(raw_data)
-    return filepath
-
-def audio_callback(indata, frames, time, status):
-    if status:
-        pass 
-    if recording_active:
-        # Optimization: Boost volume slightly if too quiet (Simple Normalization)
-        # vosk-small models struggle with low volume.
-        # This is a naive boost (multiplying amplitude).
-        # We process 'indata' as numpy array if we had numpy, but here it's bytes/buffer.
-        # We'll just pass it through because manipulating raw bytes in Python is slow/complex without numpy.
-        # Instead, relying on user to speak up or OS microphone gain.
-        # However, we CAN ensure we don't drop frames.
-        q.put(bytes(indata))
-
-def transcribe_loop():
-    with sd.RawInputStream(samplerate=16000, blocksize=8000,
-                           dtype="int16", channels=1,
-                           callback=audio_callback):
-        print(f"🎤 Listening... Active Languages: {active_models}")
-        
+            # Process workers load their own copy from the path
+            try:
+                self.decode_pool.add(lang, model_path=path)
+            except Exception as e:
+                print(f"⚠️ [{self.id}] Could not start the {lang} decode process: {e}")
+                return False
+        return True
+
+    def release_recognizers(self):
+        """Hand this session's recognizers back to the pool (they rejoin on next use)."""
+        for lang, key in list(self.rec_keys.items()):
+            rec, clock = self.decode_pool.remove(lang)
+            if rec is not None:
+                recognizers.checkin(key, rec, clock)
+        self.rec_keys = {}
+        if self.spotter is not None:
+            self.flush_keywords()
+            self.spotter.detach(self.decode_pool)
+            self.spotter = None
+
+    def update_spotter(self):
+        """Swap the keyword spotter for the wanted words (between recording runs)."""
+        words, lang = self.keywords
+        if self.spotter is not None and (self.spotter.words, self.spotter.lang) == (words, lang):
+            return
+        if self.spotter is not None:
+            self.flush_keywords()
+            self.spotter.detach(self.decode_pool)
+            self.spotter = None
+        if words:
+            spotter = KeywordSpotter(words, lang)
+            try:
+                spotter.attach(self.decode_pool)
+            except Exception as e:
+                print(f"⚠️ [{self.id}] Could not start keyword spotting: {e}")
+                return
+            self.spotter = spotter
+
+    def spot_keywords(self, results):
+        """Take the spotter's result out of a decode pool result and announce its hits."""
+        spotter = self.spotter
+        if spotter is None or spotter.key not in results:
+            return
+        is_final, res = results.pop(spotter.key)
+        offset = self.stream_sec - self.decode_pool.clock(spotter.key)
+        text = (res or {}).get("text" if is_final else "partial", "")
+        for hit in spotter.scan(is_final, res, offset, self.stream_sec):
+            print(f"🎯 [{self.id}] Keyword '{hit['word']}' at {hit['start']:.2f}s "
+                  f"(conf {hit['conf']:.2f}, {hit['delay_sec'] * 1000:.0f} ms after it was said)")
+            hub.publish("keyword", dict(hit, session=self.id, lang=spotter.lang, text=text,
+                                        timestamp=time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    def flush_keywords(self, winner=None):
+        """Write the pending hits to context_samples, with the sentence just committed."""
+        if self.spotter is None:
+            return
+        end_sec = segment_span(winner)[1] if winner else None
+        sentence = winner["text"] if winner else self.last_partial["text"]
+        for hit in self.spotter.take_pending(end_sec):
+            save_context_sample(hit["word"], sentence or hit["word"])
+
+    def grammar_outdated(self):
+        if DECODE_MODE != "thread":
+            return False
+        if self.grammar != self.decode_grammar:
+            return True
+        # Drill grammars follow validated_words: rebuild when the word list changed
+        return self.grammar is not None and any(key != recognizers.key(lang, self.grammar)[0]
+                                                for lang, key in self.rec_keys.items())
+
+    def active_languages(self):
+        # FOCUS MODE: Only iterate over target languages if set
+        langs = self.target_languages if self.target_languages else registry.available()
+        return [l for l in langs if self.ensure_language(l)]
+
+    def leading_language(self, langs, partials=None):
+        if self.language_gate.locked_lang in langs:
+            return self.language_gate.locked_lang
+        if len(langs) == 1:
+            return langs[0]
+        if partials:
+            return max(partials, key=lambda l: score_partial(l, partials[l] or {}, COMMON_WORDS)[0])
+        if self.last_winner_lang in langs:
+            return self.last_winner_lang
+        return langs[0] if langs else None
+
+    def emit_partial(self, langs, partials=None):
+        """Publish the leading language's hypothesis, at most every PARTIAL_INTERVAL sec."""
+        now = time.monotonic()
+        if now - self.last_partial["at"] < PARTIAL_INTERVAL:
+            return
+        lead = self.leading_language(langs, partials)
+        if lead is None:
+            return
+        if partials and lead in partials:
+            res = partials[lead]
+        else:
+            res = self.decode_pool.partial([lead]).get(lead, (False, None))[1]
+        text = (res or {}).get("partial", "").strip()
+        if not text or text == self.last_partial["text"]:
+            return
+        self.last_partial["at"] = now
+        self.last_partial["text"] = text
+        offset = self.stream_sec - self.decode_pool.clock(lead)
+        hub.publish("partial", {"session": self.id, "language": lead, "text": text,
+                                "words": word_timings(res.get("partial_result", []), offset)})
+
+    def gate_enabled(self, langs):
+        return EARLY_EXIT and not self.target_languages and len(langs) > 1
+
+    def finish_utterance(self, min_conf=None, label="FINAL"):
+        """
+        Finalize the active recognizers (stop button or VAD boundary) and commit the winner.
+        """
+        langs = self.active_languages()
+        if self.language_gate.locked_lang in langs:
+            langs = [self.language_gate.locked_lang]
+        langs = [l for l in langs if l not in self.catchup_paused] or langs
+
+        # Pick Winner for Final Fragment
+        results = self.decode_pool.finalize(langs + ([self.spotter.key] if self.spotter else []))
+        self.spot_keywords(results)
+        winner = pick_winner(results, min_conf=min_conf)
+        if winner:
+            winner["offset"] = self.stream_sec - self.decode_pool.clock(winner["lang"])
+            print(f"[{self.id}] [{winner['lang'].upper()}] {label}: {winner['text']} (Score: {winner['score']:.2f})")
+            self.commit_winner(winner)
+            self.last_winner_lang = winner["lang"]
+        else:
+            self.flush_keywords() # nothing to commit: the hits keep what context there is
+        self.last_partial["text"] = ""
+
+        paused = self.language_gate.end_utterance()
+        if paused:
+            self.decode_pool.reset(paused)
+        self.wake_catchup_paused()
+
+    def process_block(self, data):
+        chunk_sec = len(data) / 2 / 16000
+
+        # --- PROCESSING LOGIC ---
+        langs = self.active_languages()
+        if self.catching_up and "leading" in self.catchup_policy and len(langs) > 1:
+            lead = self.leading_language(langs)
+            self.catchup_paused.update(l for l in langs if l != lead)
+        if self.catchup_paused:
+            langs = [l for l in langs if l not in self.catchup_paused] or langs
+        use_gate = self.gate_enabled(langs)
+        if use_gate:
+            langs = self.language_gate.langs_for_chunk(langs)
+
+        # All active recognizers (and the keyword spotter) decode this block at the same time
+        scan = [self.spotter.key] if self.spotter else []
+        results = self.decode_pool.accept(langs + scan, data, scan=scan)
+        self.spot_keywords(results)
+        winner = pick_winner(results, min_conf=0.6)
+        partials = None
+        if any(is_final for is_final, _ in results.values()):
+            self.wake_catchup_paused()
+
+        if use_gate:
+            if any(is_final for is_final, _ in results.values()):
+                # Silence boundary: wake the paused languages up with a clean state
+                paused = self.language_gate.end_utterance()
+                if paused:
+                    self.decode_pool.reset(paused)
+            elif self.language_gate.wants_partials():
+                partials = {l: res for l, (_, res) in self.decode_pool.partial(langs).items()}
+                locked = self.language_gate.observe(partials, chunk_sec)
+                if locked:
+                    print(f"⚡ [{self.id}] Early exit: {locked.upper()} leads, pausing others until silence")
+
+        if winner:
+            best_lang = winner["lang"]
+            winner["offset"] = self.stream_sec - self.decode_pool.clock(best_lang)
+            print(f"[{self.id}] [{best_lang.upper()}] {winner['text']}  (Score: {winner['score']:.2f})")
+            self.commit_winner(winner)
+            self.last_winner_lang = best_lang
+            self.last_partial["text"] = ""
+        elif self.partials_enabled:
+            self.emit_partial(langs, partials)
+
+    def _run(self):
         # Track previous state to detect "Edge Trigger" of stopping
         was_recording = False
-        
+
         while True:
             # If we are NOT recording and queue is empty, just wait (sleep) to save CPU
-            if not recording_active and q.empty():
+            if not self.recording_active and self.q.empty():
                 if was_recording:
                     # Just transitioned from Recording -> Paused
                     # Flush any partial results from recognizers
-                    print("🛑 Stopping... processing final fragments.")
-                    
-                    final_candidates = []
-                    
-                    for lang, rec in recognizers.items():
-                        if target_languages and lang not in target_languages: continue
-                        
-                        final_json = json.loads(rec.FinalResult())
-                        text = final_json.get("text", "").strip()
-                        
-                        if text:
-                            # Calculate Score for Final Fragment
-                            words = final_json.get("result", [])
-                            avg_conf = 0.0
-                            if words:
-                                avg_conf = sum(w.get("conf", 1.0) for w in words) / len(words)
-                            
-                            # Base Score
-                            base_score = len(text) * avg_conf
-                            
-                            # Linguistic Bonus (Same as main loop)
-                            bonus = 0
-                            text_words = set(text.lower().split())
-                            matches = text_words.intersection(COMMON_WORDS.get(lang, set()))
-                            if matches:
-                                bonus = len(matches) * 20.0 
-                            
-                            final_score = base_score + bonus
-                            
-                            final_candidates.append({
-                                "lang": lang,
-                                "text": text,
-                                "score": final_score,
-                                "json": final_json
-                            })
-
-                    # Pick Winner for Final Fragment
-                    if final_candidates:
-                        final_candidates.sort(key=lambda x: x["score"], reverse=True)
-                        winner = final_candidates[0]
-                        print(f"[{winner['lang'].upper()}] FINAL: {winner['text']} (Score: {winner['score']:.2f})")
-                        save_transcript(winner['text'], winner['lang'])
-                        
-                        if "result" in winner['json']:
-                            for w_obj in winner['json']['result']:
-                                word = w_obj["word"]
-                                conf = w_obj.get("conf", 1.0)
-                                if conf < 0.6 or word == "<unk>":
-                                    # For unknown words, we pass the winner details
-                                    save_unknown_word(word, winner['text'], winner['lang'], conf)
+                    print(f"🛑 [{self.id}] Stopping... processing final fragments.")
+                    self.update_catchup() # the backlog is gone
+                    self.finish_utterance()
+                    self.vad.reset()
+
+                    # Make sure the session is on disk before we go idle
+                    self.clip_recorder.end_session()
+                    db_writer.flush()
 
                     was_recording = False
-                
-                time.sleep(0.5) 
+
+                if self.closing:
+                    return
+                time.sleep(0.2)
                 continue
-            
+
+            # Overload: past catchup_sec the decoder degrades (and maybe drops the backlog)
+            if self.update_catchup() and "drop_oldest" in self.catchup_policy:
+                self.q.trim(self.catchup_sec / 2)
+            dropped = self.q.dropped()
+            if dropped != self.seen_dropped:
+                self.seen_dropped = dropped
+                if was_recording:
+                    # Audio is missing from here: close the utterance rather than glue words across the gap
+                    self.finish_utterance()
+                    self.vad.reset()
+
             # If we are recording OR there is data left in the queue, process it.
             try:
-                data = q.get(timeout=0.5) 
+                data = self.q.get(timeout=0.5)
             except queue.Empty:
                 continue
+            # AGC / DC / high-pass / resampling -> 16 kHz int16
+            data = self.preprocessor.process(data)
+            if not data:
+                continue
+
+            if not was_recording:
+                if self.grammar_outdated():
+                    # Between runs nothing is mid-utterance, so the recognizers can be swapped
+                    self.release_recognizers()
+                    self.decode_grammar = self.grammar
+                self.update_spotter()
+                self.clip_recorder.start_session(self.id)
+            was_recording = True
+            self.clip_recorder.feed(self.stream_sec, data)
+            self.stream_sec += len(data) / 2 / 16000
+
+            # VAD: silent blocks never reach the recognizers
+            skip_silence = self.catching_up and "skip_silence" in self.catchup_policy
+            if VAD_ENABLED or skip_silence:
+                blocks, utterance_ended = self.vad.process(data, "drop" if skip_silence else None)
+            else:
+                blocks, utterance_ended = [data], False
 
-            was_recording = True 
-            
-            # --- PROCESSING LOGIC ---
-            best_lang = None
-            best_text = ""
-            best_score = -100000.0
-            best_result_json = None
-            
-            candidates = []
-            
-            # IMPROVEMENT: Linguistic Verification (Stop Words)
-            # Small models hallucinate. Valid text usually contains common words.
-            COMMON_WORDS = {
-                "en": {"the", "is", "to", "and", "a", "of", "in", "it", "you", "that"},
-                "es": {"el", "la", "de", "que", "y", "en", "un", "una", "es", "por"},
-                "hi": {"है", "में", "से", "का", "की", "और", "एक", "हैं", "को", "पर"}
-            }
-            
-            # FOCUS MODE: Only iterate over target languages if set
-            langs_to_check = target_languages if target_languages else recognizers.keys()
-            
-            for lang in langs_to_check:
-                if lang not in recognizers: continue
-                rec = recognizers[lang]
-                
-                if rec.AcceptWaveform(data):
-                    res_str = rec.Result()
-                    res = json.loads(res_str)
-                    text = res.get("text", "").strip()
-                    if text:
-                        words = res.get("result", [])
-                        if words:
-                            # 1. Base Score: Confidence * Length
-                            avg_conf = sum(w.get("conf", 1.0) for w in words) / len(words)
-                            if avg_conf < 0.6: continue # Hard threshold for noise
-                            
-                            base_score = len(text) * avg_conf
-                            
-                            # 2. Linguistic Bonus: Check for stop words
-                            # If the model finds "the" or "hai", it is VERY likely correct.
-                            # Give massive bonus.
-                            bonus = 0
-                            text_words = set(text.lower().split())
-                            matches = text_words.intersection(COMMON_WORDS.get(lang, set()))
-                            if matches:
-                                bonus = len(matches) * 20.0 # +20 points per stop word!
-                            
-                            final_score = base_score + bonus
-                            
-                            candidates.append({
-                                "lang": lang, 
-                                "text": text, 
-                                "score": final_score, 
-                                "json": res
-                            })
-            
-            if candidates:
-                candidates.sort(key=lambda x: x["score"], reverse=True)
-                winner = candidates[0]
-                
-                best_lang = winner["lang"]
-                best_text = winner["text"]
-                # ... rest of saving logic ...
-                best_json = winner["json"]
-                
-                audio_path = save_audio_chunk(data, best_lang)
-                print(f"[{best_lang.upper()}] {best_text}  (Score: {winner['score']:.2f})")
-                save_transcript(best_text, best_lang, audio_path)
-                
-                if "result" in best_json:
-                    for w_obj in best_json["result"]:
-                        word = w_obj["word"]
-                        conf = w_obj.get("conf", 1.0)
-                        if conf < 0.6 or word == "<unk>":
-                            save_unknown_word(word, best_text, best_lang, conf)
+            for block in blocks:
+                self.process_block(block)
+
+            if utterance_ended:
+                # Don't wait for the recognizers' own endpointing
+                self.finish_utterance(min_conf=0.6)
+
+    def summary(self):
+        return {"id": self.id, "source": self.source, "device": self.device, "created": self.created,
+                "recording": self.recording_active, "focus": self.target_languages or "auto",
+                "grammar": self.decode_grammar, "keywords": self.spotter.words if self.spotter else [],
+                "partials": self.partials_enabled, "stream_sec": round(self.stream_sec, 2),
+                "queued_blocks": self.q.qsize(), "input_overflows": self.input_stats["overflows"],
+                "catching_up": self.catching_up}
+
+    def report(self):
+        stats = self.decode_pool.latency_report()
+        stats["session"] = self.summary()
+        stats["early_exit"] = dict(self.language_gate.report(), enabled=EARLY_EXIT)
+        stats["vad"] = dict(self.vad.report(), enabled=VAD_ENABLED)
+        stats["preprocess"] = self.preprocessor.report()
+        catchup_sec = self.catchup_stats["seconds"]
+        if self.catching_up:
+            catchup_sec += time.monotonic() - self.catchup_since
+        stats["input"] = dict(self.q.report(), overflows=self.input_stats["overflows"],
+                              catchup={"active": self.catching_up, "threshold_sec": self.catchup_sec,
+                                       "policy": sorted(self.catchup_policy), "episodes": self.catchup_stats["episodes"],
+                                       "seconds": round(catchup_sec, 2), "paused": sorted(self.catchup_paused)})
+        stats["clips"] = self.clip_recorder.report()
+        if self.spotter is not None:
+            stats["keywords"] = self.spotter.report()
+        return stats
+
+class SessionManager:
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.reaper = None
+
+    def get(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def open(self, session_id=DEFAULT_SESSION, source="mic", device=None):
+        """The running session with this id, or a new one. Raises ValueError / RuntimeError."""
+        if not SESSION_ID_RE.match(session_id or ""):
+            raise ValueError("Session id must be 1-64 letters, digits, '-' or '_'")
+        if source not in ("mic", "push"):
+            raise ValueError(f"Unknown audio source: {source}")
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                return session
+            if not registry.available():
+                raise RuntimeError("No models found")
+            if len(self.sessions) >= self.max_sessions:
+                raise RuntimeError(f"Too many sessions (max {self.max_sessions})")
+            session = TranscriptionSession(session_id, source, device)
+            session.start()
+            self.sessions[session_id] = session
+            if source == "push" and self.reaper is None:
+                self.reaper = threading.Thread(target=self._reap, name="session-reaper", daemon=True)
+                self.reaper.start()
+            return session
+
+    def _reap(self):
+        # Browser tabs just go away: close push sessions nobody has used for PUSH_IDLE_SEC
+        while True:
+            time.sleep(30)
+            now = time.monotonic()
+            with self.lock:
+                idle = [s.id for s in self.sessions.values()
+                        if s.source == "push" and now - s.last_active > PUSH_IDLE_SEC]
+            for session_id in idle:
+                print(f"💤 [{session_id}] Idle for {PUSH_IDLE_SEC:.0f}s, closing")
+                self.close(session_id)
+
+    def close(self, session_id, timeout=10.0):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close(timeout)
+        return True
+
+    def close_all(self):
+        with self.lock:
+            ids = list(self.sessions)
+        for session_id in ids:
+            self.close(session_id)
+
+    def list(self):
+        with self.lock:
+            return [s.summary() for s in self.sessions.values()]
+
+# Singleton instance
+sessions = SessionManager()
+
+def get_decode_stats(session_id=None):
+    session = sessions.get(session_id or DEFAULT_SESSION)
+    if session is None:
+        stats = {"mode": DECODE_MODE, "languages": {}}
+    else:
+        stats = session.report()
+    stats["db_writer"] = db_writer.report()
+    stats["db_pool"] = pool.report()
+    stats["models"] = registry.report()
+    stats["recognizers"] = recognizers.report()
+    stats["sessions"] = sessions.list()
+    return stats
+
+def collect_metrics():
+    """Gauges for /metrics, read from the same reports /api/decode/stats shows."""
+    with sessions.lock:
+        live = list(sessions.sessions.values())
+    families = {}
+    def add(name, kind, help_text, labels, value):
+        families.setdefault(name, (name, kind, help_text, []))[3].append((labels, value))
+
+    for s in live:
+        sid = {"session": s.id}
+        add("scribe_session_recording", "gauge", "1 while the session is recording", sid, int(s.recording_active))
+        add("scribe_session_queue_blocks", "gauge", "Input blocks waiting for the decoder", sid, s.q.qsize())
+        add("scribe_session_queue_seconds", "gauge", "Audio waiting for the decoder", sid, s.queued_sec())
+        add("scribe_session_audio_seconds_total", "counter", "Audio consumed by the session", sid, s.stream_sec)
+        add("scribe_session_catching_up", "gauge", "1 while the session is in catch-up mode", sid, int(s.catching_up))
+        add("scribe_input_dropped_seconds_total", "counter", "Queued audio dropped (buffer full or catch-up trim)", sid,
+            s.q.dropped() * s.q.block_sec)
+        add("scribe_input_overflows_total", "counter", "Device buffer overflows (audio lost)", sid, s.input_stats["overflows"])
+        add("scribe_input_status_flags_total", "counter", "Audio callbacks that reported any status flag", sid,
+            s.input_stats["status_flags"])
+        for lang, d in s.decode_pool.latency_report()["languages"].items():
+            add("scribe_decode_rtf", "gauge", "Decode time / audio time", dict(sid, lang=lang), d["rtf"])
+        add("scribe_vad_skipped_ratio", "gauge", "Share of blocks the VAD kept from the recognizers", sid,
+            s.vad.report()["skipped_ratio"])
+        add("scribe_agc_gain", "gauge", "Current input gain", sid, s.preprocessor.gain)
+        add("scribe_clip_pending_writes", "gauge", "Segments waiting to be written to WAV", sid, s.clip_recorder.q.qsize())
+
+    w = db_writer.report()
+    add("scribe_db_writer_pending", "gauge", "Items queued for the DB writer", {}, w["pending"])
+    add("scribe_db_writer_dropped_total", "counter", "Items dropped because the writer queue was full", {}, w["dropped"])
+    add("scribe_db_writer_errors_total", "counter", "Failed DB writer batches", {}, w["errors"])
+    add("scribe_db_writer_failed_items_total", "counter", "Items dropped after failing on their own", {}, w["failed_items"])
+    p = pool.report()
+    add("scribe_db_pool_open", "gauge", "Open pooled SQLite connections", {"kind": "read"}, p["readers_open"])
+    add("scribe_db_pool_open", "gauge", "Open pooled SQLite connections", {"kind": "write"}, p["writers_open"])
+
+    m = registry.report()
+    for lang, e in m["loaded"].items():
+        add("scribe_model_loaded_bytes", "gauge", "Size of each loaded model (on disk)", {"lang": lang}, int(e["mb"] * 1024 * 1024))
+        add("scribe_model_refs", "gauge", "Sessions holding each model", {"lang": lang}, e["refs"])
+    add("scribe_model_budget_bytes", "gauge", "Model memory budget (0 = unlimited)", {}, int((m["budget_mb"] or 0) * 1024 * 1024))
+    add("scribe_model_evictions_total", "counter", "Models unloaded to stay within the budget", {}, m["evictions"])
+    r = recognizers.report()
+    for key, n in r["idle"].items():
+        add("scribe_recognizers_idle", "gauge", "Pre-built recognizers waiting in the pool", {"pool": key}, n)
+    add("scribe_recognizer_checkouts_total", "counter", "Recognizers handed to sessions", {}, r["checkouts"])
+    add("scribe_recognizer_builds_total", "counter", "Recognizers built (pool misses and warm-up)", {}, r["builds"])
+
+    e = hub.report()
+    add("scribe_events_clients", "gauge", "Connected /events clients", {}, e["clients"])
+    add("scribe_events_dropped_total", "counter", "Events dropped for slow clients", {}, e["dropped"])
+    rss, peak = process_memory()
+    add("scribe_process_resident_bytes", "gauge", "Resident memory of the server process", {}, rss)
+    add("scribe_process_peak_resident_bytes", "gauge", "Peak resident memory of the server process", {}, peak)
+    return list(families.values())
+
+metrics.add_collector(collect_metrics)
 
 def start_transcriber():
-    global recognizers
-    
-    # Reload recognizers with Vocabulary Injection if possible
-    # (Simplified: Just ensuring models are loaded. 
-    #  Real injection requires re-init of KaldiRecognizer with grammar string)
-    
-    validated = fetch_validated_words()
-    if validated and recognizers:
-        print(f"💉 Injecting Vocabulary: {len(validated)} words.")
-        # Re-initialize recognizers with grammar? 
-        # WARNING: This restricts vocab. We will SKIP restricting grammar 
-        # to keep clear general transcription, as 'prioritize' isn't supported 
-        # easily without custom graph. 
-        # WE RELY ON FUZZY FIX for the 'Correction' requirement.
-        pass
-
-    if not recognizers:
-        print("❌ Cannot start transcriber: No models loaded.")
+    with pool.read() as conn:
+        vocab.load_from_db(conn)
+    if len(vocab) and registry.available():
+        print(f"💉 Injecting Vocabulary: {len(vocab)} words.")
+        # A grammar restricts the vocabulary, so general transcription stays on the full
+        # graph and RELIES ON FUZZY FIX for corrections. Only the drills (set_grammar)
+        # decode with grammar recognizers built from these words.
+
+    if not registry.available():
+        print("❌ No models matched! automatic speech recognition will not work.")
+        return
+    # Warm models up in the background; requests don't wait for this
+    # (process decode workers load their own copies instead)
+    preloading = recognizers.preload() if DECODE_MODE == "thread" else []
+    if preloading:
+        print(f"🔄 Loading models in the background: {preloading}")
+
+    db_writer.start()
+    atexit.register(sessions.close_all)
+
+    # The server's own microphone, as before (more sessions are opened via /record/start).
+    # Headless boxes: SCRIBE_MIC=0 and stream audio in over HTTP/WebSocket instead.
+    if os.environ.get("SCRIBE_MIC", "1") == "0":
         return
-    t = threading.Thread(target=transcribe_loop, daemon=True)
-    t.start()
+    try:
+        sessions.open(DEFAULT_SESSION, source="mic")
+    except Exception as e:
+        print(f"⚠️ Could not open the local microphone: {e}")
@@ -1,10 +1,93 @@
-import re
+import os, re, csv, hashlib, threading, time
+from collections import OrderedDict
+import langid
+
+# Offline dictionary translator.
+# Entries (single words and phrases alike) are compiled per language pair into one token-level
+# Aho-Corasick automaton, so a sentence is translated in a single pass over its words however
+# big the dictionary gets; overlapping entries resolve leftmost-longest ("good morning" wins
+# over "good" + "morning"), anything unknown is kept as it is.
+# The built-in entries below are a demo; DICT_FILE (tab separated: source, target language,
+# translation; '#' comments) extends or overrides them and can hold tens of thousands of rows.
+# EN -> ES/HI uses the entries directly, ES/HI -> EN the same entries inverted.
+# Recent results are kept in an LRU cache; the Backfill job translates the transcripts table.
+
+DICT_FILE = os.environ.get("SCRIBE_DICTIONARY", "dictionary.tsv")
+CACHE_SIZE = int(os.environ.get("SCRIBE_TRANSLATE_CACHE", "4096"))
+BACKFILL_BATCH = 500
+
+WORD_RE = re.compile(r"[\w\u0900-\u097F']+")  # \w alone splits Devanagari at its vowel signs
+SPACES_RE = re.compile(r" {2,}")
+
+def tokens(text):
+    return [m.group().lower() for m in WORD_RE.finditer(text)]
+
+class PhraseMatcher:
+    """Aho-Corasick over word tokens: {phrase tokens: replacement} -> leftmost-longest matches."""
+    def __init__(self, entries):
+        self.goto = [{}]        # node -> {token: node}
+        self.fail = [0]
+        self.out = [None]       # node -> (length, replacement) when a phrase ends here
+        self.dict_link = [0]    # node -> nearest node on the fail chain that has an output
+        for phrase, replacement in entries.items():
+            node = 0
+            for tok in phrase:
+                nxt = self.goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(None)
+                    self.dict_link.append(0)
+                node = nxt
+            self.out[node] = (len(phrase), replacement)
+        # Breadth-first: fail links point to the longest proper suffix that is also a prefix
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for tok, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(tok, 0)
+                self.fail[child] = target if target != child else 0
+                self.dict_link[child] = target if self.out[target] else self.dict_link[target]
+                queue.append(child)
+
+    def __len__(self):
+        return sum(1 for o in self.out if o)
+
+    def matches(self, toks):
+        """[(start, end, replacement)], non-overlapping, leftmost-longest."""
+        longest = {}  # start -> (length, replacement)
+        node = 0
+        for i, tok in enumerate(toks):
+            while node and tok not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(tok, 0)
+            hit = node if self.out[node] else self.dict_link[node]
+            while hit:
+                length, replacement = self.out[hit]
+                start = i - length + 1
+                if length > longest.get(start, (0,))[0]:
+                    longest[start] = (length, replacement)
+                hit = self.dict_link[hit]
+        found, i = [], 0
+        while i < len(toks):
+            if i in longest:
+                length, replacement = longest[i]
+                found.append((i, i + length, replacement))
+                i += length
+            else:
+                i += 1
+        return found
 
 class SimpleTranslator:
-    def __init__(self):
+    def __init__(self, dict_file=DICT_FILE, cache_size=CACHE_SIZE):
+        self.dict_file = dict_file
+        self.cache_size = cache_size
         # A simple offline dictionary for demonstration.
         # Format: {source_word: {target_lang: target_word}}
-        # This is a naive word-by-word replacement + some phrases for a school project level offline demo.
         self.dictionary = {
             "hello": {"es": "hola", "hi": "नमस्ते"},
             "world": {"es": "mundo", "hi": "दुनिया"},
@@ -33,64 +116,173 @@ class SimpleTranslator:
             "my name is": {"es": "Mi nombre es", "hi": "मेरा नाम है"},
             "i am fine": {"es": "Estoy bien", "hi": "मैं ठीक हूँ"},
         }
+        self.lock = threading.Lock()
+        self.matchers = {}   # (source, target) -> PhraseMatcher, built on first use
+        self.cache = OrderedDict()
+        self.stats = {"translations": 0, "cache_hits": 0, "loaded_entries": 0}
+        self.version = None
+        self.load()
+
+    def load(self):
+        """(Re)read DICT_FILE on top of the built-in entries. Returns how many rows it had."""
+        loaded = 0
+        if self.dict_file and os.path.exists(self.dict_file):
+            with open(self.dict_file, encoding="utf-8", newline="") as f:
+                for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                    if len(row) < 3 or not row[0].strip() or row[0].startswith("#"):
+                        continue
+                    source, lang, target = row[0].strip().lower(), row[1].strip(), row[2].strip()
+                    table = self.phrases if len(tokens(source)) > 1 else self.dictionary
+                    table.setdefault(source, {})[lang] = target
+                    loaded += 1
+            print(f"📖 Loaded {loaded} dictionary entries from {self.dict_file}")
+        digest = hashlib.sha1()
+        for table in (self.dictionary, self.phrases):
+            for source in sorted(table):
+                digest.update(repr((source, sorted(table[source].items()))).encode("utf-8"))
+        with self.lock:
+            self.matchers = {}
+            self.cache.clear()
+            self.stats["loaded_entries"] = loaded
+            self.version = digest.hexdigest()[:12]
+        return loaded
+
+    def _matcher(self, source, target):
+        key = (source, target)
+        with self.lock:
+            matcher = self.matchers.get(key)
+        if matcher is not None:
+            return matcher
+        entries = {}
+        for table in (self.phrases, self.dictionary):
+            for phrase, trans in table.items():
+                if source == "en" and target in trans:
+                    entries[tuple(tokens(phrase))] = trans[target]
+                elif target == "en" and trans.get(source):
+                    # Inverted: the first English entry for a translation wins
+                    entries.setdefault(tuple(tokens(trans[source])), phrase)
+        matcher = PhraseMatcher({k: v for k, v in entries.items() if k})
+        with self.lock:
+            self.matchers[key] = matcher
+        return matcher
 
     def detect_language(self, text):
-        """
-        Simple heuristic detection based on character ranges.
-        """
-        text = text.strip()
-        if not text:
-            return "unknown"
-
-        # Check for Hindi (Devanagari block)
-        if re.search(r'[\u0900-\u097F]', text):
-            return "hi"
-        
-        # Check for Spanish-ish signals (accents) if not Hindi
-        # Note: This is weak, but 'ñ' or '¿' are strong indicators.
-        if re.search(r'[áéíóúñ¿¡]', text.lower()):
-            return "es"
-            
-        # Default to English if ASCII and no other strong signals
-        # (Real detection needs n-grams, but this is 100% offline/dependency-free)
-        return "en"
-
-    def translate(self, text, target_lang):
-        """
-        Translate text to target_lang.
-        Supports: EN -> ES, EN -> HI. 
-        For ES/HI -> EN, we'd need reverse mappings (omitted for brevity unless requested).
-        """
+        """Character n-gram language ID (langid.py): unaccented Spanish is still Spanish."""
+        lang, _ = langid.model().detect(text)
+        return lang
+
+    def translate(self, text, target_lang, source_lang=None):
+        """Translate text to target_lang (EN <-> ES/HI). source_lang: None = detect."""
+        return self.translate_detected(text, target_lang, source_lang)[0]
+
+    def translate_detected(self, text, target_lang, source_lang=None):
+        """(translation, source language)."""
         if not text or not target_lang:
-            return ""
+            return "", source_lang or "unknown"
+        key = (text, target_lang, source_lang)
+        with self.lock:
+            self.stats["translations"] += 1
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return hit
+        result = self._translate(text, target_lang, source_lang or self.detect_language(text))
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def translate_many(self, texts, target_lang, source_lang=None):
+        """[(translation, source language)] for a batch of texts (repeats come from the cache)."""
+        sources = [source_lang] * len(texts)
+        if source_lang is None:
+            # One vectorized language-ID pass for the whole batch
+            sources = [lang for lang, _ in langid.model().detect_many(texts)]
+        return [self.translate_detected(t, target_lang, s) for t, s in zip(texts, sources)]
 
-        detected = self.detect_language(text)
+    def _translate(self, text, target_lang, detected):
         if detected == target_lang:
-            return text # Same lang
-
-        text_lower = text.lower().strip()
-        
-        # 1. Try exact phrase match
-        for phrase, trans in self.phrases.items():
-            if phrase in text_lower:
-                if target_lang in trans:
-                    return trans[target_lang]
-
-        # 2. Word-by-word (Naive)
-        # Only works well for EN -> Others
-        words = text.split()
-        translated_words = []
-        
-        for w in words:
-            # Strip punctuation
-            clean_w = re.sub(r'[^\w\s]', '', w.lower())
-            
-            if clean_w in self.dictionary and target_lang in self.dictionary[clean_w]:
-                translated_words.append(self.dictionary[clean_w][target_lang])
-            else:
-                translated_words.append(w) # Keep original if unknown
+            return text, detected # Same lang
+        if "en" not in (detected, target_lang):
+            return text, detected # No ES <-> HI entries
+
+        spans = [m.span() for m in WORD_RE.finditer(text)]
+        toks = [text[a:b].lower() for a, b in spans]
+        out, pos = [], 0
+        for start, end, replacement in self._matcher(detected, target_lang).matches(toks):
+            gap = text[pos:spans[start][0]]
+            if target_lang == "en":
+                gap = gap.rstrip("¿¡") # Spanish opening marks have no English counterpart
+            out.append(gap)
+            out.append(replacement)
+            pos = spans[end - 1][1]
+            # "how are you?" -> "¿Cómo estás?" and not "¿Cómo estás??"
+            if replacement and text[pos:pos + 1] == replacement[-1] and not replacement[-1].isalnum():
+                pos += 1
+        out.append(text[pos:])
+        return SPACES_RE.sub(" ", "".join(out)).strip(), detected
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+            cached = len(self.cache)
+            matchers = {f"{a}->{b}": len(m) for (a, b), m in self.matchers.items()}
+        s["cache_hit_ratio"] = round(s["cache_hits"] / s["translations"], 3) if s["translations"] else 0.0
+        return dict(s, version=self.version, words=len(self.dictionary), phrases=len(self.phrases),
+                    cached=cached, cache_size=self.cache_size, matchers=matchers, backfill=backfill.report())
+
+class Backfill:
+    """Background job: translate every transcript that has no up-to-date translation yet."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.state = {"status": "idle"}
+
+    def start(self, langs, batch=BACKFILL_BATCH):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return False
+            self.state = {"status": "running", "langs": list(langs), "translated": 0, "last_id": 0,
+                          "started": time.strftime("%Y-%m-%d %H:%M:%S"), "error": None}
+            self.thread = threading.Thread(target=self._run, args=(list(langs), batch),
+                                           name="translate-backfill", daemon=True)
+            self.thread.start()
+        return True
+
+    def _run(self, langs, batch):
+        from repository import pool, untranslated_transcripts, save_translations
+        t0 = time.perf_counter()
+        try:
+            for lang in langs:
+                version = translator.version
+                last_id = 0
+                while True:
+                    # Keyset paging, one short write per page: live inserts never wait long
+                    with pool.read() as conn:
+                        rows = untranslated_transcripts(conn, lang, version, last_id, batch)
+                    if not rows:
+                        break
+                    done = [(tid, lang, translator.translate(text or "", lang, source))
+                            for tid, text, source in rows]
+                    with pool.write() as conn:
+                        save_translations(conn, done, version)
+                    last_id = rows[-1][0]
+                    with self.lock:
+                        self.state["translated"] += len(done)
+                        self.state["last_id"] = last_id
+            status, error = "done", None
+        except Exception as e:
+            status, error = "failed", str(e)
+        with self.lock:
+            self.state.update(status=status, error=error, seconds=round(time.perf_counter() - t0, 2))
+        print(f"🌐 Translation backfill {status}: {self.state['translated']} rows" + (f" ({error})" if error else ""))
 
-        return " ".join(translated_words)
+    def report(self):
+        with self.lock:
+            return dict(self.state)
 
-# Singleton instance
+# Singleton instances
 translator = SimpleTranslator()
+backfill = Backfill()
@@ -0,0 +1,144 @@
+import math, threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # Pure-Python path below is fine for 16 kHz mono (a few ms per 0.5 s block)
+
+# Voice-activity detection in front of the recognizers.
+# Every input block is split into FRAME_MS frames and each frame is classed as speech when
+# its RMS energy clears an adaptive noise floor (or, for quiet fricatives like "s"/"f",
+# when it is a bit above the floor AND has a high zero-crossing rate).
+# Silent blocks are dropped (or, with "compress", only the first one after speech is kept
+# so the recognizers still see a short pause), and a speech -> silence transition that
+# outlasts the hangover is reported as an utterance boundary so the decoder can finalize
+# immediately instead of waiting for its own endpointer.
+
+FRAME_MS = 30
+MIN_RMS = 150.0          # int16 scale; anything quieter is never speech
+SPEECH_RATIO = 3.0       # speech if rms > noise_floor * ratio
+FRICATIVE_RATIO = 1.5    # ...or rms > noise_floor * this with a high zero-crossing rate
+FRICATIVE_ZCR = 0.25     # crossings per sample
+HANGOVER_MS = 400        # keep treating audio as speech this long after the last speech frame
+NOISE_ADAPT = 0.05       # EMA weight for the noise floor (silent frames only)
+
+class EnergyVAD:
+    def __init__(self, sample_rate=16000, policy="compress"):
+        if policy not in ("drop", "compress"):
+            raise ValueError(f"Unknown VAD policy: {policy}")
+        self.sample_rate = sample_rate
+        self.policy = policy
+        self.frame_len = int(sample_rate * FRAME_MS / 1000)
+        self.noise_floor = MIN_RMS / 2
+        self.in_speech = False
+        self.silence_ms = 0.0
+        self.preroll = None       # last dropped block, fed in front of the next speech block
+        self.kept_pause = True    # nothing to "pause" before the first utterance
+        self.lock = threading.Lock()
+        self.stats = {"blocks": 0, "speech_blocks": 0, "skipped_blocks": 0,
+                      "frames": 0, "speech_frames": 0, "skipped_sec": 0.0, "utterances": 0}
+
+    def _frame_features(self, data):
+        """(rms, zcr) for each frame of int16 PCM."""
+        n = self.frame_len
+        if np is not None:
+            samples = np.frombuffer(data, dtype=np.int16)
+            usable = len(samples) // n * n
+            if usable == 0:
+                return []
+            frames = samples[:usable].reshape(-1, n).astype(np.float32)
+            rms = np.sqrt(np.mean(frames * frames, axis=1))
+            signs = np.signbit(frames)
+            zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / n
+            return list(zip(rms.tolist(), zcr.tolist()))
+
+        samples = array("h", data)
+        features = []
+        for start in range(0, len(samples) - n + 1, n):
+            frame = samples[start:start + n]
+            energy = sum(s * s for s in frame)
+            crossings = sum(1 for a, b in zip(frame, frame[1:]) if (a < 0) != (b < 0))
+            features.append((math.sqrt(energy / n), crossings / n))
+        return features
+
+    def _is_speech(self, rms, zcr):
+        floor = self.noise_floor
+        if rms < MIN_RMS:
+            speech = False
+        elif rms > floor * SPEECH_RATIO:
+            speech = True
+        else:
+            speech = rms > floor * FRICATIVE_RATIO and zcr > FRICATIVE_ZCR
+        if not speech:
+            self.noise_floor = max(MIN_RMS / 4, (1 - NOISE_ADAPT) * floor + NOISE_ADAPT * rms)
+        return speech
+
+    def process(self, data, policy=None):
+        """
+        Returns (blocks_to_decode, utterance_ended).
+        blocks_to_decode is a list (possibly empty; may include the pre-roll block).
+        policy overrides self.policy for this block (catch-up mode drops every silent block).
+        """
+        policy = policy or self.policy
+        features = self._frame_features(data)
+        block_ms = len(data) / 2 / self.sample_rate * 1000
+        frame_ms = self.frame_len / self.sample_rate * 1000
+
+        speech_frames = 0
+        for rms, zcr in features:
+            if self._is_speech(rms, zcr):
+                speech_frames += 1
+                self.silence_ms = 0.0
+            else:
+                self.silence_ms += frame_ms
+
+        out, ended = [], False
+        if speech_frames:
+            if not self.in_speech and self.preroll is not None:
+                out.append(self.preroll) # catch the onset that was just under the threshold
+            self.in_speech = True
+            self.kept_pause = False
+            self.preroll = None
+            out.append(data)
+        elif self.in_speech and self.silence_ms < HANGOVER_MS:
+            out.append(data) # hangover: short pauses inside a sentence
+        else:
+            if self.in_speech:
+                self.in_speech = False
+                ended = True
+            if policy == "compress" and not self.kept_pause:
+                # One silent block so the decoder still sees a natural pause
+                self.kept_pause = True
+                out.append(data)
+            else:
+                self.preroll = data
+
+        with self.lock:
+            s = self.stats
+            s["blocks"] += 1
+            s["frames"] += len(features)
+            s["speech_frames"] += speech_frames
+            if out:
+                s["speech_blocks"] += 1
+            else:
+                s["skipped_blocks"] += 1
+                s["skipped_sec"] += block_ms / 1000
+            if ended:
+                s["utterances"] += 1
+        return out, ended
+
+    def reset(self):
+        self.in_speech = False
+        self.silence_ms = 0.0
+        self.preroll = None
+        self.kept_pause = True
+
+    def report(self):
+        with self.lock:
+            s = dict(self.stats)
+        s["skipped_ratio"] = round(s["skipped_blocks"] / s["blocks"], 3) if s["blocks"] else 0.0
+        s["skipped_sec"] = round(s["skipped_sec"], 2)
+        s["noise_floor"] = round(self.noise_floor, 1)
+        s["policy"] = self.policy
+        return s
@@ -1,81 +1,300 @@
-import sqlite3
-import requests
-import time
+import os, sys, time, threading, argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vocab_index import vocab
+from repository import pool, add_validated_words, pending_unknown_words
 
-DB_FILE = "transcriptions.db"
+# Validation of unknown_words, as one background job (the HTTP routes only start it and poll).
+#   - every distinct (word, lang) is looked up once, most frequent first: case variants share a
+#     lookup, and results are cached for the life of the process (rejected words are marked, not retried)
+#   - lookups run CONCURRENCY at a time, with RETRIES (exponential backoff) for transient
+#     failures; backends that call out (rate_limited) share a RATE limit, local ones run flat out
+#   - results are written WRITE_BATCH at a time with executemany, in short transactions
+# Where the answers come from is a backend (SCRIBE_VALIDATOR):
+#   "heuristic"              - offline: alphabetic words longer than 2 letters are accepted
+#   "dictionary:words.tsv"   - a local word list (word [TAB lang [TAB meaning]] per line)
+#   "https://host/{lang}/{word}" - an HTTP dictionary service: 200 = valid, 404 = not a word
+#
+#   python validator.py                        # validate everything pending, print progress
+#   python validator.py --backend dictionary:/usr/share/dict/words
 
-def check_internet():
+BACKEND = os.environ.get("SCRIBE_VALIDATOR", "heuristic")
+CONCURRENCY = int(os.environ.get("SCRIBE_VALIDATE_CONCURRENCY", "8"))
+RATE = float(os.environ.get("SCRIBE_VALIDATE_RATE", "10"))  # lookups per second, 0 = unlimited
+RETRIES = 3
+BACKOFF_SEC = 0.5
+HTTP_TIMEOUT = 5.0
+WRITE_BATCH = 200
+
+class TransientError(Exception):
+    """Lookup failed in a way worth retrying (timeout, 429, 5xx...)."""
+
+class HeuristicBackend:
+    name = "heuristic"
+    rate_limited = False
+
+    def probe(self):
+        return True
+
+    def lookup(self, word, lang):
+        valid = len(word) > 2 and word.isalpha()
+        return {"valid": valid, "translation": None, "correction": word}
+
+class DictionaryBackend:
+    """Local word list: "word", "word<TAB>lang" or "word<TAB>lang<TAB>meaning" per line."""
+    rate_limited = False
+
+    def __init__(self, path):
+        self.name = f"dictionary:{path}"
+        self.entries = {}  # (word, lang or None) -> meaning
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if not parts[0].strip() or parts[0].startswith("#"):
+                    continue
+                lang = parts[1].strip() if len(parts) > 1 and parts[1].strip() else None
+                meaning = parts[2].strip() if len(parts) > 2 else None
+                self.entries[(parts[0].strip().lower(), lang)] = meaning
+
+    def probe(self):
+        return True
+
+    def lookup(self, word, lang):
+        key = word.lower()
+        if (key, lang) in self.entries:
+            return {"valid": True, "translation": self.entries[(key, lang)], "correction": word}
+        if (key, None) in self.entries:
+            return {"valid": True, "translation": self.entries[(key, None)], "correction": word}
+        return {"valid": False, "translation": None, "correction": word}
+
+class HttpBackend:
+    """GET url_template.format(word=..., lang=...) on one pooled session."""
+    rate_limited = True
+
+    def __init__(self, url_template, concurrency=CONCURRENCY, timeout=HTTP_TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.name = url_template
+        self.url_template = url_template
+        self.timeout = timeout
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency) # keep-alive for every worker
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def probe(self):
+        # Can we reach the service itself? (not some unrelated host)
+        url = self.url_template.format(word="test", lang="en")
+        try:
+            self.session.head(url, timeout=min(self.timeout, 3.0))
+            return True
+        except self.requests.RequestException:
+            return False
+
+    def lookup(self, word, lang):
+        url = self.url_template.format(word=self.requests.utils.quote(word), lang=lang or "en")
+        try:
+            resp = self.session.get(url, timeout=self.timeout)
+        except self.requests.RequestException as e:
+            raise TransientError(str(e))
+        if resp.status_code == 404:
+            return {"valid": False, "translation": None, "correction": word}
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise TransientError(f"HTTP {resp.status_code}")
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code} for {word}")
+        return {"valid": True, "translation": _meaning(resp), "correction": word}
+
+def _meaning(resp):
+    """First definition from a dictionaryapi.dev-style JSON answer, else the start of the body."""
     try:
-        # Fast check against a reliable host
-        requests.get("https://www.google.com", timeout=3)
+        data = resp.json()
+        meanings = data[0]["meanings"] if isinstance(data, list) else data.get("meanings", [])
+        return meanings[0]["definitions"][0]["definition"]
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return resp.text[:200] or None
+
+def make_backend(spec=BACKEND):
+    if spec == "heuristic":
+        return HeuristicBackend()
+    if spec.startswith("dictionary:"):
+        return DictionaryBackend(spec.split(":", 1)[1])
+    if spec.startswith(("http://", "https://")):
+        return HttpBackend(spec)
+    raise ValueError(f"Unknown validator backend: {spec} (heuristic, dictionary:<file> or an http(s) URL template)")
+
+class RateLimiter:
+    """At most rate acquisitions per second across all threads (0 = no limit)."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+class ValidationEngine:
+    def __init__(self, backend=None, concurrency=CONCURRENCY, rate=RATE, retries=RETRIES):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.cache = {}  # (backend name, word lower, lang) -> result
+        self.lock = threading.Lock()
+        self.thread = None
+        self.state = {"status": "idle"}
+
+    def get_backend(self):
+        if self.backend is None:
+            self.backend = make_backend()
+        return self.backend
+
+    def _lookup(self, word, lang):
+        backend = self.backend
+        for attempt in range(self.retries + 1):
+            if getattr(backend, "rate_limited", True): # only remote services need sparing
+                self.limiter.acquire()
+            try:
+                return backend.lookup(word, lang)
+            except TransientError:
+                if attempt == self.retries:
+                    raise
+                with self.lock:
+                    self.state["retries"] += 1
+                time.sleep(BACKOFF_SEC * 2 ** attempt)
+
+    def start(self):
+        """Validate everything pending in a background thread. False if a job is already running."""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return False
+            self.state = {"status": "running", "backend": None, "pending": 0, "words": 0, "done": 0,
+                          "cache_hits": 0, "validated": 0, "rejected": 0, "errors": 0, "retries": 0,
+                          "started": time.strftime("%Y-%m-%d %H:%M:%S"), "message": None}
+            self.thread = threading.Thread(target=self.run, name="validator", daemon=True)
+            self.thread.start()
         return True
-    except:
-        return False
-
-def fetch_meaning_online(word, lang):
-    """
-    Mock function to fetch meaning/correctness.
-    In a real app, this would call OpenAI, Google Translate, or separate Dictionary API.
-    Since we don't have paid keys, we will simulate or use free endpoints if possible.
-    """
-    # Simple Mock Logic for demonstration
-    # If the word is real but low confidence, we 'validate' it.
-    
-    # 1. Google Translate (Unofficial/Free approach often breaks, so we fallback to mock)
-    # We will just simulate a success response for now to demonstrate the flow.
-    
-    return {
-        "valid": True,
-        "translation": f"[Validated] Meaning of {word}",
-        "correction": word # assuming it was correct
-    }
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            status, message = self._run()
+        except Exception as e:
+            status, message = "failed", str(e)
+        with self.lock:
+            self.state.update(status=status, message=message, seconds=round(time.perf_counter() - t0, 2))
+            s = dict(self.state)
+        print(f"🌍 Validation {status}: {s['validated']} validated, {s['rejected']} rejected, "
+              f"{s['errors']} errors" + (f" ({message})" if message else ""))
+        return s
+
+    def _run(self):
+        backend = self.get_backend()
+        with pool.read() as conn:
+            rows = pending_unknown_words(conn)
+        # One lookup per distinct (word, lang); every row with that word gets the answer
+        groups = {}
+        for row_id, word, lang in rows:
+            groups.setdefault((word.lower(), lang), []).append((row_id, word))
+        with self.lock:
+            self.state.update(backend=backend.name, pending=len(rows), words=len(groups))
+        if not groups:
+            return "done", None
+        if not backend.probe():
+            return "offline", f"{backend.name} is not reachable"
+        print(f"🌍 Validating {len(groups)} words ({len(rows)} rows) with {backend.name}...")
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="validate") as executor:
+            futures = {}
+            for key, members in groups.items():
+                cached = self.cache.get((backend.name,) + key)
+                if cached is not None:
+                    results.append((key, members, cached))
+                    with self.lock:
+                        self.state["cache_hits"] += 1
+                else:
+                    futures[executor.submit(self._lookup, members[0][1], key[1])] = (key, members)
+            for fut in as_completed(futures):
+                key, members = futures[fut]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    with self.lock:
+                        self.state["errors"] += 1
+                        self.state["message"] = f"{members[0][1]}: {e}"
+                    continue
+                self.cache[(backend.name,) + key] = result
+                results.append((key, members, result))
+                if len(results) >= WRITE_BATCH:
+                    self._write(results)
+                    results = []
+        self._write(results)
+        return "done", None
+
+    def _write(self, results):
+        """One short transaction per batch: the live DB writer never waits on a lookup."""
+        if not results:
+            return
+        validated, rejected, learned = [], [], []
+        today = time.strftime("%Y-%m-%d")
+        for (_, lang), members, result in results:
+            if result["valid"]:
+                validated += [(result["translation"], row_id) for row_id, _ in members]
+                learned.append((result.get("correction") or members[0][1], lang))
+            else:
+                rejected += [(row_id,) for row_id, _ in members]
+        with pool.write() as conn:
+            conn.executemany("UPDATE unknown_words SET status='validated', translation=? WHERE id=?", validated)
+            conn.executemany("UPDATE unknown_words SET status='rejected' WHERE id=?", rejected)
+            # Feature 5: learned words go to the vocabulary table and the fuzzy-fix / mastery vocabulary
+            conn.executemany("INSERT OR IGNORE INTO vocabulary (word, language, added_on) VALUES (?, ?, ?)",
+                             [(word, lang, today) for word, lang in learned])
+            add_validated_words(conn, [word for word, _ in learned], 'auto_learned')
+        # Same process (e.g. the app): update the index now.
+        # A separate process picks it up via vocab.refresh_if_stale().
+        for word, _ in learned:
+            vocab.add(word)
+        with self.lock:
+            self.state["done"] += len(results)
+            self.state["validated"] += len(validated)
+            self.state["rejected"] += len(rejected)
+
+    def report(self):
+        with self.lock:
+            return dict(self.state, cached=len(self.cache))
+
+# Singleton instance
+engine = ValidationEngine()
 
 def validate_pending_words():
-    if not check_internet():
-        print("⚠️ No internet connection. Skipping validation.")
-        return 0
-
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Get new words
-    cursor.execute("SELECT id, word, detected_lang FROM unknown_words WHERE status='new'")
-    rows = cursor.fetchall()
-    
-    validated_count = 0
-    
-    print(f"🌍 Internet connected. Validating {len(rows)} words...")
-    
-    for row in rows:
-        row_id, word, lang = row
-        
-        # Simulate API call
-        result = fetch_meaning_online(word, lang)
-        
-        if result["valid"]:
-            # Update Unknown Words Table
-            cursor.execute("""
-                UPDATE unknown_words 
-                SET status='validated', translation=? 
-                WHERE id=?
-            """, (result["translation"], row_id))
-            
-            # Feature 5: Update Vocabulary (Incremental Learning)
-            # Add to vocabulary table so we know it's a "learned" word
-            try:
-                cursor.execute("""
-                    INSERT INTO vocabulary (word, language, added_on) 
-                    VALUES (?, ?, ?)
-                """, (word, lang, time.strftime("%Y-%m-%d")))
-            except sqlite3.IntegrityError:
-                pass # Already learned
-                
-            validated_count += 1
-            print(f"✅ Validated: {word}")
-            
-    conn.commit()
-    conn.close()
-    return validated_count
+    """Run a validation job and wait for it; returns how many rows were validated."""
+    engine.start()
+    engine.thread.join()
+    return engine.report()["validated"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate pending unknown words")
+    parser.add_argument("--backend", default=BACKEND, help="heuristic, dictionary:<file> or an http(s) URL template with {word} and {lang}")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=RATE, help="lookups per second (0 = unlimited)")
+    args = parser.parse_args()
+    engine.backend = make_backend(args.backend)
+    engine.concurrency = args.concurrency
+    engine.limiter = RateLimiter(args.rate)
+    engine.start()
+    while engine.thread.is_alive():
+        engine.thread.join(2.0)
+        s = engine.report()
+        print(f"   {s['done']}/{s['words']} words, {s['validated']} validated, {s['rejected']} rejected")
+    return 0 if engine.report()["status"] == "done" else 1
 
 if __name__ == "__main__":
-    validate_pending_words()
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import threading, time
+from collections import Counter
+from difflib import SequenceMatcher
+
+# In-memory index over validated_words, shared by the transcriber, app routes and validator.
+#   - exact lookups are O(1) (case-sensitive set + lowercase map for mastery counting)
+#   - close_match() returns exactly what difflib.get_close_matches(word, vocab, n=1, cutoff)
+#     would, but only scores words whose LENGTH can possibly reach the cutoff
+#     (ratio = 2*M/(la+lb) <= 2*min(la,lb)/(la+lb)) AND that share enough character
+#     bigrams, then memoizes per token.
+#     Bigram bound: M matched chars in K matching blocks share >= M-K bigrams, and K-1 can't
+#     exceed the unmatched chars u = la+lb-2M, so ratio >= c needs
+#     shared >= (1.5c - 1)(la+lb) - 1. Nothing that could reach the cutoff is ever skipped.
+# Writers call add() when they insert a word; other processes (validator.py run from the
+# shell) are picked up by refresh_if_stale(), which compares COUNT/MAX(id) every few seconds.
+
+CUTOFF = 0.85
+STALE_CHECK_SEC = 5.0
+MATCH_CACHE_SIZE = 20000
+
+def bigrams(word):
+    return Counter(word[i:i + 2] for i in range(len(word) - 1))
+
+def _index_word(by_length, postings, word):
+    la = len(word)
+    by_length.setdefault(la, []).append(word)
+    grams = postings.setdefault(la, {})
+    for g, n in bigrams(word).items():
+        grams.setdefault(g, []).append((word, n))
+
+class VocabIndex:
+    def __init__(self, cutoff=CUTOFF):
+        self.cutoff = cutoff
+        self.lock = threading.Lock()
+        self.words = set()
+        self.by_lower = {}
+        self.by_length = {}
+        self.postings = {}  # length -> bigram -> [(word, count)]
+        self.match_cache = {}
+        self.loaded = False
+        self.db_signature = None
+        self.last_check = 0.0
+
+    # --- building ---
+    def load(self, words, signature=None):
+        words = set(w for w in words if w)
+        by_lower, by_length, postings = {}, {}, {}
+        for w in words:
+            by_lower.setdefault(w.lower(), []).append(w)
+            _index_word(by_length, postings, w)
+        with self.lock:
+            self.words = words
+            self.by_lower = by_lower
+            self.by_length = by_length
+            self.postings = postings
+            self.match_cache = {}
+            self.loaded = True
+            self.db_signature = signature
+            self.last_check = time.monotonic()
+
+    def load_from_db(self, db):
+        try:
+            words = [row[0] for row in db.execute("SELECT word FROM validated_words")]
+            self.load(words, self._signature(db))
+        except Exception as e:
+            print(f"⚠️ Could not load validated words: {e}")
+            self.load([])
+
+    def _signature(self, db):
+        return tuple(db.execute("SELECT COUNT(*), MAX(id) FROM validated_words").fetchone())
+
+    def refresh_if_stale(self, db):
+        """Reload if another process changed validated_words. Cheap; rate-limited."""
+        now = time.monotonic()
+        if not self.loaded:
+            self.load_from_db(db)
+            return
+        if now - self.last_check < STALE_CHECK_SEC:
+            return
+        self.last_check = now
+        try:
+            sig = self._signature(db)
+        except Exception:
+            return
+        if sig != self.db_signature:
+            self.load_from_db(db)
+
+    def add(self, word):
+        """Incremental update after a route/validator inserted a word."""
+        if not word:
+            return
+        with self.lock:
+            if word in self.words:
+                return
+            self.words.add(word)
+            self.by_lower.setdefault(word.lower(), []).append(word)
+            _index_word(self.by_length, self.postings, word)
+            # Any cached token could now match the new word
+            self.match_cache = {}
+
+    # --- queries ---
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def all_words(self):
+        with self.lock:
+            return list(self.words)
+
+    def canonical(self, lower_word):
+        """Validated spellings that equal lower_word case-insensitively."""
+        return self.by_lower.get(lower_word, ())
+
+    def close_match(self, word):
+        """Same result as difflib.get_close_matches(word, vocab, n=1, cutoff)[0], or None."""
+        cached = self.match_cache.get(word, False)
+        if cached is not False:
+            return cached
+
+        with self.lock:
+            if word in self.words:
+                best = word # ratio 1.0 only happens for the identical string
+            else:
+                best = self._scan(word)
+
+        cache = self.match_cache
+        if len(cache) >= MATCH_CACHE_SIZE:
+            cache.clear()
+        cache[word] = best
+        return best
+
+    def _scan(self, word):
+        cutoff = self.cutoff
+        lb = len(word)
+        if lb == 0:
+            return None
+        query_grams = bigrams(word)
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        best = None
+        for la, bucket in self.by_length.items():
+            total = la + lb
+            # Upper bound of ratio for this length pair (same float math as difflib)
+            if 2.0 * min(la, lb) / total < cutoff:
+                continue
+
+            need = (1.5 * cutoff - 1.0) * total - 1.0 - 1e-9
+            if need > 0:
+                shared = Counter()
+                grams = self.postings.get(la, {})
+                for g, qn in query_grams.items():
+                    for x, n in grams.get(g, ()):
+                        shared[x] += min(qn, n)
+                candidates = [x for x, n in shared.items() if n >= need]
+            else:
+                candidates = bucket
+
+            for x in candidates:
+                s.set_seq1(x)
+                if s.quick_ratio() >= cutoff:
+                    r = s.ratio()
+                    if r >= cutoff and (best is None or (r, x) > best):
+                        best = (r, x)
+        return best[1] if best else None
+
+# Singleton instance
+vocab = VocabIndex()